@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import generate_program
+from src.batch import BatchOptions, process_files
+
+# files/sec of the multi-file front end for increasing worker counts
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    options = BatchOptions(use_cache=False)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for seed in range(files):
+            path = os.path.join(directory, f"{seed:05d}.mnk")
+            with open(path, "w") as file:
+                file.write(generate_program(lines, seed))
+            paths.append(path)
+        baseline = 0.0
+        cpus = os.cpu_count() or 1
+        for jobs in sorted({1, 2, cpus // 2, cpus} - {0}):
+            start = time.perf_counter()
+            results = list(process_files(paths, options, jobs))
+            elapsed = time.perf_counter() - start
+            assert [result.path for result in results] == paths
+            baseline = baseline or elapsed
+            print(
+                f"jobs {jobs:>3}: {files / elapsed:8.1f} files/sec "
+                f"({baseline / elapsed:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import pickle
+import sys
+import time
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from benchmarks.generator import generate_program
+from src import binary_ast
+from src.lexer import Lexer
+from src.parser import Parser
+
+# size and dump/load times of `binary_ast` against pickle and re-parsing the
+# source, all with the collector on as it is by default
+
+ROUNDS = 3
+
+
+def best(function: Callable[[], Any]) -> tuple[float, Any]:
+    fastest = float("inf")
+    result = None
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        result = function()
+        fastest = min(fastest, time.process_time() - start)
+    return fastest, result
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    source = generate_program(lines)
+    program = Parser(Lexer(source)).parse_program()
+    sys.setrecursionlimit(100_000)
+    for name, dumps, loads in [
+        (
+            "pickle",
+            lambda: pickle.dumps(program, pickle.HIGHEST_PROTOCOL),
+            pickle.loads,
+        ),
+        ("binary", lambda: binary_ast.dumps(program), binary_ast.loads),
+    ]:
+        dump_time, data = best(dumps)
+        load_time, loaded = best(partial(loads, data))
+        assert loaded == program
+        del loaded
+        print(
+            f"{name}: {len(data) / 1e6:6.1f} MB, dumps {dump_time:.2f}s, "
+            f"loads {load_time:.2f}s"
+        )
+    parse_time, _ = best(lambda: Parser(Lexer(source)).parse_program())
+    print(f"parse: {len(source) / 1e6:6.1f} MB, {parse_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
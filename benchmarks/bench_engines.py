@@ -0,0 +1,69 @@
+import sys
+import time
+
+from benchmarks.generator import generate_program
+from src.ast import Program
+from src.evaluator import Evaluator
+from src.lexer import Lexer
+from src.parser import Parser
+from src.transpiler import CODE_CACHE, Transpiler
+from src.vm import VM
+
+ROUNDS = 3
+
+
+def parse(source: str) -> Program:
+    return Parser(Lexer(source)).parse_program()
+
+
+def best_of(run) -> float:  # type: ignore
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    program = parse(generate_program(statements))
+    expected = Evaluator().eval_program(program)
+    assert expected == VM().execute(program.statements)
+    assert expected == Transpiler().execute(program.statements)
+
+    tree = best_of(lambda: Evaluator().eval_program(program))
+    vm = best_of(lambda: VM().execute(program.statements))
+
+    def transpile_cold():  # type: ignore
+        CODE_CACHE.clear()
+        Transpiler().execute(program.statements)
+
+    py_cold = best_of(transpile_cold)
+    py = best_of(lambda: Transpiler().execute(program.statements))
+    print(f"end to end (resolve/compile + run), {len(program.statements)} statements")
+    print(f"  tree: {tree:.3f}s")
+    print(f"  vm:   {vm:.3f}s ({tree / vm:.2f}x)")
+    print(f"  py:   {py_cold:.3f}s ({tree / py_cold:.2f}x)")
+    print(f"  py, code cached: {py:.3f}s ({tree / py:.2f}x)")
+
+    # execution alone: resolve and compile once, then time re-running
+    evaluator = Evaluator()
+    evaluator.eval_program(program)
+    machine = VM()
+    bytecode = machine.compiler.compile(program.statements)
+    machine.run(bytecode)
+    transpiler = Transpiler()
+    batch = transpiler.compile(program.statements)
+    transpiler.run(batch)
+    tree_run = best_of(lambda: evaluator.eval_program(program))
+    vm_run = best_of(lambda: machine.run(bytecode))
+    py_run = best_of(lambda: transpiler.run(batch))
+    print("execution only")
+    print(f"  tree: {tree_run:.3f}s")
+    print(f"  vm:   {vm_run:.3f}s ({tree_run / vm_run:.2f}x)")
+    print(f"  py:   {py_run:.3f}s ({tree_run / py_run:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
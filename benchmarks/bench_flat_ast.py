@@ -0,0 +1,75 @@
+import sys
+import time
+import tracemalloc
+
+from benchmarks.generator import generate_program
+from src.ast import Program
+from src.flat_ast import FlatAST
+from src.lexer import Lexer
+from src.parser import Parser
+from src.visitor import iter_nodes
+
+ROUNDS = 3
+
+
+def build_tree(source: str) -> Program:
+    return Parser(Lexer(source)).parse_program()
+
+
+def build_flat(source: str) -> FlatAST:
+    return FlatAST.parse(source)
+
+
+def count_tree(program: Program) -> int:
+    # the program itself is not a node
+    return sum(1 for _ in iter_nodes(program)) - 1
+
+
+def count_flat(ast: FlatAST) -> int:
+    return sum(1 for _ in ast.walk())
+
+
+def best_of(run, *args) -> float:  # type: ignore
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained_bytes(source: str, build) -> int:  # type: ignore
+    tracemalloc.start()
+    ast = build(source)  # noqa: F841
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    source = generate_program(statements)
+    program = build_tree(source)
+    ast = build_flat(source)
+    assert ast.to_program() == program
+    assert count_tree(program) == count_flat(ast) == len(ast)
+    print(f"input: {len(source):,} characters, {len(ast):,} nodes")
+
+    tree_build = best_of(build_tree, source)
+    flat_build = best_of(build_flat, source)
+    print(f"build:    tree {tree_build:.3f}s, flat {flat_build:.3f}s", end=" ")
+    print(f"({tree_build / flat_build:.1f}x)")
+    tree_walk = best_of(count_tree, program)
+    flat_walk = best_of(count_flat, ast)
+    print(f"traverse: tree {tree_walk:.3f}s, flat {flat_walk:.3f}s", end=" ")
+    print(f"({tree_walk / flat_walk:.1f}x)")
+    tree_bytes = retained_bytes(source, build_tree)
+    flat_bytes = retained_bytes(source, build_flat)
+    print(
+        f"memory:   tree {tree_bytes / 1e6:.1f} MB, flat {flat_bytes / 1e6:.1f} MB "
+        f"({tree_bytes / flat_bytes:.1f}x smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import sys
+import time
+import tracemalloc
+
+from src.lexer import Lexer
+from src.parallel_lexer import tokenize_parallel
+from src.token import Token, TokenStream, TokenType
+
+SNIPPET = """let five = 5;
+let ten = 10;
+let add = fn(x, y) {
+  x + y;
+};
+let result = add(five, ten);
+!-/*5;
+5 < 10 > 5;
+if (5 < 10) { return true; } else { return false; }
+10 == 10;
+10 != 9;
+"foobar";
+"""
+
+
+def lex_sequential(source: str, ascii: bool = True) -> list[Token]:
+    lexer = Lexer(source)
+    # without the ASCII fast path, as on non-ASCII input
+    lexer.ascii = lexer.ascii and ascii
+    tokens: list[Token] = []
+    token = lexer.next_token()
+    while token.type != TokenType.EOF:
+        tokens.append(token)
+        token = lexer.next_token()
+    tokens.append(token)
+    return tokens
+
+
+def lex_characters(source: str) -> list[Token]:
+    return lex_sequential(source, ascii=False)
+
+
+def lex_bulk(source: str) -> list[Token]:
+    return Lexer(source).tokenize()
+
+
+def lex_stream(source: str) -> TokenStream:
+    return Lexer(source).tokenize_stream()
+
+
+ROUNDS = 3
+
+
+def measure(name: str, source: str, lex) -> float:  # type: ignore
+    elapsed = float("inf")
+    tokens: list[Token] | TokenStream = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        tokens = lex(source)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    rate = len(tokens) / elapsed
+    print(
+        f"{name:>12}: {len(tokens):>9} tokens in {elapsed:8.3f}s ({rate:,.0f} tokens/sec)"
+    )
+    return rate
+
+
+def retained_bytes(source: str, lex) -> int:  # type: ignore
+    tracemalloc.start()
+    tokens = lex(source)  # noqa: F841
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    source = SNIPPET * repeat
+    print(f"input: {len(source):,} characters")
+    assert lex_sequential(source) == lex_bulk(source) == list(lex_stream(source))
+    assert lex_characters(source) == lex_sequential(source)
+    characters = measure("characters", source, lex_characters)
+    sequential = measure("next_token", source, lex_sequential)
+    bulk = measure("tokenize", source, lex_bulk)
+    stream = measure("stream", source, lex_stream)
+    # sequential below `parallel_lexer.MIN_CHUNK` characters per CPU
+    parallel = measure("parallel", source, tokenize_parallel)
+    print(
+        f"speedup over per-character lexing: next_token "
+        f"{sequential / characters:.1f}x, tokenize {bulk / characters:.1f}x, "
+        f"stream {stream / characters:.1f}x, parallel {parallel / characters:.1f}x"
+    )
+    tokens_bytes = retained_bytes(source, lex_bulk)
+    stream_bytes = retained_bytes(source, lex_stream)
+    print(
+        f"memory: tokens {tokens_bytes:,} bytes, stream {stream_bytes:,} bytes"
+        f" ({tokens_bytes / stream_bytes:.1f}x smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import generate_program
+from src.server import STATS_COMMAND, Server, ServerStats, connect, worker_pool
+
+# Load generator for the evaluation server: `clients` concurrent sessions
+# each send `snippets` lines of a generated program, one at a time, and the
+# latency of every reply is measured from the client's side. Without an
+# address a server is started in this process on a temporary Unix socket.
+#
+#   python -m benchmarks.bench_server [clients] [snippets] [address]
+
+
+async def session(address: str, snippets: list[str], stats: ServerStats) -> None:
+    reader, writer = await connect(address)
+    try:
+        for snippet in snippets:
+            start = time.perf_counter()
+            writer.write(snippet.encode() + b"\n")
+            await writer.drain()
+            reply = await reader.readline()
+            stats.record(time.perf_counter() - start, reply.startswith(b"error: "))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def server_stats(address: str) -> dict[str, object]:
+    reader, writer = await connect(address)
+    writer.write(STATS_COMMAND.encode() + b"\n")
+    stats = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return stats
+
+
+async def load(address: str, clients: int, snippets: int) -> None:
+    programs = [
+        generate_program(snippets, seed).splitlines() for seed in range(clients)
+    ]
+    stats = ServerStats()
+    await asyncio.gather(*(session(address, lines, stats) for lines in programs))
+    report = stats.to_json()
+    print(
+        f"{clients} clients x {snippets} snippets: "
+        f"{report['requests_per_second']} requests/sec, {report['errors']} errors"
+    )
+    print(f"client latency (ms): {report['latency_ms']}")
+    print(f"server: {await server_stats(address)}")
+
+
+async def main_async(clients: int, snippets: int, address: str | None) -> None:
+    if address is not None:
+        await load(address, clients, snippets)
+        return
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        worker_pool() as workers,
+    ):
+        address = os.path.join(directory, "server.sock")
+        async with await Server("tree", workers).start(address):
+            await load(address, clients, snippets)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    snippets = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    address = sys.argv[3] if len(sys.argv) > 3 else None
+    asyncio.run(main_async(clients, snippets, address))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+import time
+
+from benchmarks.generator import generate_program
+from src.lexer import Lexer
+from src.parser import Parser, parse_many
+
+# per-snippet parse latency of a fresh lexer and parser per snippet, as
+# `main.get_ast` does, against one session reset in between (`parse_many`)
+
+ROUNDS = 5
+
+
+def best_of(run) -> float:  # type: ignore
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        run()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    snippets = generate_program(count).splitlines()
+
+    def fresh():  # type: ignore
+        for snippet in snippets:
+            Parser(Lexer(snippet)).parse_program()
+
+    def session():  # type: ignore
+        for _ in parse_many(snippets):
+            pass
+
+    print(f"{len(snippets)} snippets, microseconds per snippet")
+    for name, run in [("fresh", fresh), ("parse_many", session)]:
+        print(f"  {name}: {best_of(run) / len(snippets) * 1e6:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import random
+import string
+
+# Seeded generator of synthetic Monkey programs. Every program parses, and
+# unless `strings` is set it also evaluates without errors, so the same
+# inputs drive the lexer, parser and engine benchmarks.
+
+KEYWORDS = {"fn", "let", "true", "false", "if", "else", "return"}
+
+
+def make_names(rng: random.Random, count: int) -> list[str]:
+    names: set[str] = set()
+    while len(names) < count:
+        name = "".join(rng.choices(string.ascii_lowercase + "_", k=rng.randint(3, 10)))
+        if name[0] != "_" and name not in KEYWORDS:
+            names.add(name)
+    return sorted(names)
+
+
+class ProgramGenerator:
+    def __init__(self, seed: int = 0, names: int = 64, strings: bool = False) -> None:
+        self.rng = random.Random(seed)
+        self.names = make_names(self.rng, names)
+        self.defined: list[str] = []
+        self.strings = strings
+
+    def operand(self) -> str:
+        rng = self.rng
+        if self.defined and rng.random() < 0.6:
+            return rng.choice(self.defined)
+        return str(rng.randint(0, 999))
+
+    def let_chain(self) -> str:
+        # `let` reading earlier bindings; division by k + 1 keeps values small
+        rng = self.rng
+        name = rng.choice(self.names)
+        k = rng.randint(1, 9)
+        value = (
+            f"({self.operand()} * {k} + {self.operand()} - {self.operand()}) / {k + 1}"
+        )
+        self.defined.append(name)
+        return f"let {name} = {value};"
+
+    def deep_expression(self, depth: int) -> str:
+        rng = self.rng
+        expression = self.operand()
+        for _ in range(depth):
+            operator = rng.choice(["+", "-", "+", "-", "*"])
+            operand = self.operand() if operator != "*" else str(rng.randint(1, 3))
+            if rng.random() < 0.5:
+                expression = f"({expression} {operator} {operand})"
+            else:
+                expression = f"({operand} {operator} {expression})"
+            if rng.random() < 0.1:
+                expression = f"-{expression}"
+        return f"{expression};"
+
+    def comparison(self) -> str:
+        return (
+            f"{self.operand()} < {self.operand()} == "
+            f"!({self.operand()} > {self.operand()});"
+        )
+
+    def string_literal(self) -> str:
+        rng = self.rng
+        words = rng.choices(self.names, k=rng.randint(20, 400))
+        return f'"{" ".join(words)}";'
+
+    def statement(self) -> str:
+        rng = self.rng
+        roll = rng.random()
+        if not self.defined or roll < 0.45:
+            return self.let_chain()
+        if roll < 0.7:
+            return self.deep_expression(rng.randint(3, 40))
+        if self.strings and roll < 0.8:
+            return self.string_literal()
+        return self.comparison()
+
+    def lines(self, count: int) -> list[str]:
+        return [self.statement() for _ in range(count)]
+
+
+def generate_program(lines: int, seed: int = 0, strings: bool = False) -> str:
+    return "\n".join(ProgramGenerator(seed, strings=strings).lines(lines)) + "\n"
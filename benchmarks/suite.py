@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_flat_ast import count_tree
+from benchmarks.generator import generate_program
+from src.ast import Program
+from src.incremental import TokenListReader
+from src.lexer import Lexer
+from src.parser import Parser
+
+# Front-end benchmark suite. For every input size it measures lexer
+# tokens/sec, parser nodes/sec, peak memory of lexing + parsing and the wall
+# time of `python -m src.main` on a file, and writes the results as JSON:
+#
+#   python -m benchmarks.suite --sizes 1000 10000 --output new.json
+#   python -m benchmarks.suite --compare old.json new.json
+
+DEFAULT_SIZES = [1_000, 10_000, 50_000]
+ROUNDS = 3
+# metrics where a bigger number is better
+HIGHER_IS_BETTER = {"lexer_tokens_per_sec", "parser_nodes_per_sec"}
+
+
+def best_of(rounds: int, run) -> float:  # type: ignore
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(source: str) -> int:
+    tracemalloc.start()
+    program = Parser(Lexer(source)).parse_program()  # noqa: F841
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main_seconds(source: str, rounds: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.mnk")
+        with open(path, "w") as file:
+            file.write(source)
+        command = [sys.executable, "-m", "src.main", "--no-cache", path]
+        return best_of(
+            rounds,
+            lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True),
+        )
+
+
+def measure(lines: int, seed: int, rounds: int) -> dict[str, float | int]:
+    # the lexer input also has large string literals, which cannot be parsed
+    lexer_source = generate_program(lines, seed, strings=True)
+    tokens = Lexer(lexer_source).tokenize()
+    lex_time = best_of(rounds, lambda: Lexer(lexer_source).tokenize())
+
+    source = generate_program(lines, seed)
+    parser_tokens = Lexer(source).tokenize()
+    program = Program()
+
+    def parse() -> None:
+        nonlocal program
+        program = Parser(TokenListReader(parser_tokens)).parse_program()
+
+    parse_time = best_of(rounds, parse)
+    nodes = count_tree(program)
+    return {
+        "lines": lines,
+        "lexer_characters": len(lexer_source),
+        "lexer_tokens": len(tokens),
+        "lexer_tokens_per_sec": len(tokens) / lex_time,
+        "parser_characters": len(source),
+        "parser_nodes": nodes,
+        "parser_nodes_per_sec": nodes / parse_time,
+        "peak_memory_bytes": peak_memory(source),
+        "main_seconds": main_seconds(source, rounds),
+    }
+
+
+def revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_suite(sizes: list[int], seed: int, rounds: int) -> dict[str, object]:
+    results = []
+    for lines in sizes:
+        result = measure(lines, seed, rounds)
+        print(
+            f"{lines:>8} lines: "
+            f"lexer {result['lexer_tokens_per_sec']:>10,.0f} tokens/s, "
+            f"parser {result['parser_nodes_per_sec']:>10,.0f} nodes/s, "
+            f"peak {result['peak_memory_bytes'] / 1e6:7.1f} MB, "
+            f"main {result['main_seconds']:6.2f}s",
+            file=sys.stderr,
+        )
+        results.append(result)
+    return {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "seed": seed,
+        "rounds": rounds,
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict) -> None:  # type: ignore
+    # ratios > 1 are improvements
+    old_results = {result["lines"]: result for result in old["results"]}
+    print(f"{old['revision']} -> {new['revision']}")
+    for result in new["results"]:
+        before = old_results.get(result["lines"])
+        if before is None:
+            continue
+        ratios = []
+        for metric in (
+            "lexer_tokens_per_sec",
+            "parser_nodes_per_sec",
+            "peak_memory_bytes",
+            "main_seconds",
+        ):
+            if metric in HIGHER_IS_BETTER:
+                ratio = result[metric] / before[metric]
+            else:
+                ratio = before[metric] / result[metric]
+            ratios.append(f"{metric} {ratio:.2f}x")
+        print(f"{result['lines']:>8} lines: {', '.join(ratios)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="compare two result files instead of running the suite",
+    )
+    args = parser.parse_args()
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare(json.load(old), json.load(new))
+        return
+    report = run_suite(args.sizes, args.seed, args.rounds)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
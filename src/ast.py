@@ -2,6 +2,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 
+from src.symbols import SYMBOLS
 from src.token import Token
 
 
@@ -49,6 +50,32 @@ class Program:
 @dataclass
 class Identifier(Expression):
     value: str = None
+    # (depth, slot) of the binding, filled in by `evaluator.Resolver`
+    depth: int = field(default=-1, compare=False, repr=False)
+    slot: int = field(default=-1, compare=False, repr=False)
+    # id of `value` in `symbols.SYMBOLS`, which also supplies the shared `str`
+    symbol: int = field(default=-1, compare=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.value is not None and self.symbol < 0:
+            self.intern()
+
+    def __getstate__(self) -> dict[str, object]:
+        # ids from this process mean nothing in the one unpickling the node,
+        # so the copy falls back to the class default and is interned when
+        # `symbol_id` is first asked for
+        state = self.__dict__.copy()
+        state.pop("symbol", None)
+        return state
+
+    def intern(self) -> int:
+        self.symbol = SYMBOLS.intern(self.value)
+        self.value = SYMBOLS.names[self.symbol]
+        return self.symbol
+
+    def symbol_id(self) -> int:
+        symbol = self.symbol
+        return symbol if symbol >= 0 else self.intern()
 
     def expression_node(self):
         return self
@@ -102,6 +129,17 @@ class IntegerLiteral(Expression):
         return f"IntegerLiteral(value={self.value.__repr__()})"
 
 
+@dataclass
+class Boolean(Expression):
+    value: bool = None
+
+    def expression_node(self):
+        return self
+
+    def __str__(self) -> str:
+        return f"Boolean(value={self.value.__repr__()})"
+
+
 @dataclass
 class PrefixExpression(Expression):
     operator: str = None
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+from src.ast import Statement
+from src.cache import ParseCache, source_key
+from src.evaluator import EvaluationError, Evaluator, inspect
+from src.lexer import StreamLexer, TextReader
+from src.optimizer import Folder
+from src.parser import Diagnostic, Parser, ParserError, parse_with_diagnostics
+from src.source_map import SourceMap
+from src.transpiler import Transpiler
+from src.vm import VM
+
+SOURCE_SUFFIX = ".mnk"
+# execution engines by `--engine` name
+ENGINES: dict[str, type[Evaluator | VM | Transpiler]] = {
+    "tree": Evaluator,
+    "vm": VM,
+    "py": Transpiler,
+}
+
+
+@dataclass
+class FileResult:
+    path: str
+    statements: int = 0
+    # the program's value when run, else None
+    value: str | None = None
+    error: str | None = None
+    # every syntax error, with `BatchOptions.check`
+    diagnostics: list[Diagnostic] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.diagnostics
+
+    def __str__(self) -> str:
+        if self.diagnostics:
+            return "\n".join(
+                f"{self.path}:{diagnostic}" for diagnostic in self.diagnostics
+            )
+        if self.error is not None:
+            return f"{self.path}: error: {self.error}"
+        if self.value is not None:
+            return f"{self.path}: {self.value}"
+        return f"{self.path}: {self.statements} statements"
+
+
+@dataclass
+class BatchOptions:
+    run: bool = False
+    engine: str = "tree"
+    fold: bool = False
+    use_cache: bool = True
+    # report all syntax errors instead of stopping at the first
+    check: bool = False
+
+
+def expand_paths(paths: Iterable[str]) -> list[str]:
+    # Directories are searched recursively for .mnk files. The result is
+    # sorted within each directory so the order never depends on the
+    # filesystem.
+    files: list[str] = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, directories, names in os.walk(path):
+            directories.sort()
+            files += [
+                os.path.join(root, name)
+                for name in sorted(names)
+                if name.endswith(SOURCE_SUFFIX)
+            ]
+    return files
+
+
+def process_file(path: str, options: BatchOptions) -> FileResult:
+    # Lexes and parses (and runs, with `options.run`) one file; errors are
+    # returned rather than raised so one bad file does not stop a batch.
+    if options.check:
+        return check_file(path)
+    result = FileResult(path)
+    try:
+        with open(path, "r") as file:
+            statements = file_statements(path, file, options.use_cache)
+            if options.fold:
+                statements = Folder().fold_statements(statements)
+
+            def counted(statements: Iterable[Statement]) -> Iterator[Statement]:
+                for statement in statements:
+                    result.statements += 1
+                    yield statement
+
+            if options.run:
+                engine = ENGINES[options.engine]()
+                result.value = inspect(engine.execute(counted(statements)))
+            else:
+                for _ in counted(statements):
+                    pass
+    except (ParserError, EvaluationError) as error:
+        result.error = describe_error(path, error)
+    except RecursionError:
+        result.error = "expression nested too deeply"
+    except (OSError, UnicodeDecodeError) as error:
+        result.error = str(error)
+    except Exception as error:
+        # a bug, or a value Python cannot handle, but only this file's
+        result.error = f"{type(error).__name__}: {error}"
+    return result
+
+
+def describe_error(path: str, error: ParserError | EvaluationError) -> str:
+    # The error's reason with its `line:column` in the file. Files are
+    # streamed, so the file is read again to map the error's offset; this
+    # only happens once per failed file.
+    try:
+        with open(path, "r") as file:
+            return SourceMap(file.read()).describe(error.reason, error.position)
+    except (OSError, UnicodeDecodeError):
+        return error.message
+
+
+def check_file(path: str) -> FileResult:
+    # Lints a file in a single pass; the cache is bypassed since it only
+    # ever holds files that parse.
+    result = FileResult(path)
+    try:
+        with open(path, "r") as file:
+            source = file.read()
+    except (OSError, UnicodeDecodeError) as error:
+        result.error = str(error)
+        return result
+    program, result.diagnostics = parse_with_diagnostics(source)
+    result.statements = len(program.statements)
+    return result
+
+
+def file_statements(
+    path: str, reader: TextReader, use_cache: bool
+) -> Iterable[Statement]:
+    if not use_cache:
+        return Parser(StreamLexer(reader)).iter_statements()
+    cache = ParseCache.beside(path)
+    key = source_key(path)
+    cached = cache.load(key)
+    if cached is not None:
+        return cached
+    return cache.store(key, Parser(StreamLexer(reader)).iter_statements())
+
+
+def process_files(
+    paths: list[str],
+    options: BatchOptions,
+    jobs: int | None = None,
+    chunksize: int | None = None,
+) -> Iterator[FileResult]:
+    # Yields results in the order of `paths`. `jobs` worker processes
+    # (default: one per CPU) each take `chunksize` files at a time; with a
+    # single job everything runs in this process.
+    jobs = jobs or os.cpu_count() or 1
+    worker = partial(process_file, options=options)
+    if jobs == 1 or len(paths) <= 1:
+        yield from map(worker, paths)
+        return
+    if chunksize is None:
+        # a few chunks per worker balances uneven files against IPC overhead
+        chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(worker, paths, chunksize=chunksize)
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from collections.abc import Buffer
+from typing import Any, BinaryIO
+
+from src import collector
+from src.ast import (
+    Boolean,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    PrefixExpression,
+    Program,
+    ReturnStatement,
+)
+from src.token import TOKEN_TYPES, TYPE_CODES, Token
+
+# Compact, versioned binary encoding of a `Program`, for handing parsed
+# programs between processes without reparsing or pickling.
+#
+#   header   magic, FORMAT_VERSION, node, statement and string counts, and
+#            the typecode of each variable-width column
+#   nodes    one row per node in pre-order, as columns: kind, token type,
+#            payload, token literal, token position and token line
+#   strings  end offsets, then the UTF-8 text of every distinct string
+#
+# Children follow their parent in pre-order and every kind has a fixed
+# number of them, so no child links are stored: `loads` rebuilds the tree
+# walking the rows backwards with a stack of built nodes. Payloads are string
+# ids for names and operators, values for integers and booleans, and 0
+# otherwise. Integer columns use the narrowest typecode that fits and are
+# little-endian, each starting on an 8-byte boundary.
+#
+# Reading the columns is cheap; building the node objects is the floor of
+# `loads`, and it runs with the collector paused (see `collector`).
+
+MAGIC = b"MNKB"
+# bump whenever the layout, the kind codes below or `TokenType` change
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHIII5s")
+ALIGNMENT = 8
+UNSIGNED_CODES = "BHIQ"
+SIGNED_CODES = "bhiq"
+BIG_ENDIAN = sys.byteorder == "big"
+
+# node kinds; a NONE row stands for a missing child and has no token
+NONE = 0
+LET = 1
+RETURN = 2
+EXPRESSION = 3
+IDENTIFIER = 4
+INTEGER = 5
+# an integer outside 64 bits, whose payload is the string id of its digits
+BIG_INTEGER = 6
+BOOLEAN = 7
+PREFIX = 8
+INFIX = 9
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def column_code(values: list[int], codes: str) -> str:
+    # the narrowest typecode in `codes` holding every value
+    if not values:
+        return codes[0]
+    low = min(values)
+    high = max(values)
+    for code in codes:
+        bits = array(code).itemsize * 8
+        if code in SIGNED_CODES:
+            if -(1 << bits - 1) <= low and high < 1 << bits - 1:
+                return code
+        elif high < 1 << bits:
+            return code
+    raise OverflowError("column values do not fit in 64 bits")
+
+
+def padding(offset: int) -> int:
+    return -offset % ALIGNMENT
+
+
+def dumps(program: Program) -> bytes:
+    kinds: list[int] = []
+    token_types: list[int] = []
+    payloads: list[int] = []
+    literals: list[int] = []
+    positions: list[int] = []
+    lines: list[int] = []
+    strings: list[str] = []
+    string_ids: dict[str, int] = {}
+
+    def intern(string: str) -> int:
+        string_id = string_ids.get(string)
+        if string_id is None:
+            string_id = string_ids[string] = len(strings)
+            strings.append(string)
+        return string_id
+
+    # pre-order without recursion: children are pushed last first
+    # `Any`: the exact type checks below do not narrow `node`
+    stack: list[Any] = program.statements[::-1]
+    pop = stack.pop
+    while stack:
+        node = pop()
+        kind = type(node)
+        payload = 0
+        if kind is Identifier:
+            code = IDENTIFIER
+            payload = intern(node.value)
+        elif kind is IntegerLiteral:
+            code = INTEGER
+            payload = node.value
+            if not INT64_MIN <= payload <= INT64_MAX:
+                code = BIG_INTEGER
+                payload = intern(str(payload))
+        elif kind is InfixExpression:
+            code = INFIX
+            payload = intern(node.operator)
+            stack += (node.right, node.left)
+        elif kind is PrefixExpression:
+            code = PREFIX
+            payload = intern(node.operator)
+            stack.append(node.right)
+        elif kind is ExpressionStatement:
+            code = EXPRESSION
+            stack.append(node.expression)
+        elif kind is LetStatement:
+            code = LET
+            stack += (node.value, node.name)
+        elif kind is ReturnStatement:
+            code = RETURN
+            stack.append(node.return_value)
+        elif kind is Boolean:
+            code = BOOLEAN
+            payload = int(node.value)
+        elif node is None:
+            kinds.append(NONE)
+            token_types.append(0)
+            payloads.append(0)
+            literals.append(0)
+            positions.append(0)
+            lines.append(0)
+            continue
+        else:
+            raise ValueError(f"cannot serialize {node}")
+        token = node.token
+        kinds.append(code)
+        token_types.append(TYPE_CODES[token.type])
+        payloads.append(payload)
+        literals.append(intern(token.literal))
+        positions.append(token.position)
+        lines.append(token.line)
+
+    encoded = [string.encode() for string in strings]
+    ends: list[int] = []
+    end = 0
+    for string in encoded:
+        end += len(string)
+        ends.append(end)
+
+    columns = [
+        array("B", kinds),
+        array("B", token_types),
+        array(column_code(payloads, SIGNED_CODES), payloads),
+        array(column_code(literals, UNSIGNED_CODES), literals),
+        array(column_code(positions, UNSIGNED_CODES), positions),
+        array(column_code(lines, UNSIGNED_CODES), lines),
+        array(column_code(ends, UNSIGNED_CODES), ends),
+    ]
+    typecodes = "".join(column.typecode for column in columns[2:])
+    out = bytearray(
+        HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            len(kinds),
+            len(program.statements),
+            len(strings),
+            typecodes.encode(),
+        )
+    )
+    for column in columns:
+        out += bytes(padding(len(out)))
+        if BIG_ENDIAN and column.itemsize > 1:
+            column.byteswap()
+        out += column
+    out += b"".join(encoded)
+    return bytes(out)
+
+
+def read_column(
+    view: memoryview, offset: int, code: str, count: int
+) -> tuple[list[int], int]:
+    # the `count` values of typecode `code` at `offset`, and the offset
+    # after them
+    offset += padding(offset)
+    end = offset + array(code).itemsize * count
+    if end > len(view):
+        raise ValueError("truncated binary AST")
+    column = view[offset:end].cast(code)
+    if BIG_ENDIAN and column.itemsize > 1:
+        swapped = array(code, column.tobytes())
+        swapped.byteswap()
+        return swapped.tolist(), end
+    return column.tolist(), end
+
+
+def loads(data: Buffer) -> Program:
+    view = memoryview(data).cast("B")
+    if len(view) < HEADER.size:
+        raise ValueError("truncated binary AST")
+    magic, version, count, statement_count, string_count, typecodes = (
+        HEADER.unpack_from(view)
+    )
+    if magic != MAGIC:
+        raise ValueError("not a binary AST")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported binary AST version {version}")
+    payload_code, literal_code, position_code, line_code, end_code = typecodes.decode()
+    offset = HEADER.size
+    kinds, offset = read_column(view, offset, "B", count)
+    token_types, offset = read_column(view, offset, "B", count)
+    payloads, offset = read_column(view, offset, payload_code, count)
+    literals, offset = read_column(view, offset, literal_code, count)
+    positions, offset = read_column(view, offset, position_code, count)
+    lines, offset = read_column(view, offset, line_code, count)
+    ends, offset = read_column(view, offset, end_code, string_count)
+    text = view[offset:]
+    if string_count and ends[-1] > len(text):
+        raise ValueError("truncated binary AST")
+    strings: list[str] = []
+    start = 0
+    for end in ends:
+        strings.append(str(text[start:end], "utf-8"))
+        start = end
+
+    # rows backwards: a node's children have all been built, first child on
+    # top, by the time it is reached
+    # `Any`: the nodes are built by kind and typed through `Program` below
+    built: list[Any] = []
+    push = built.append
+    pop = built.pop
+    # nothing built here can be part of a cycle
+    with collector.paused():
+        for kind, type_code, payload, literal, position, line in zip(
+            reversed(kinds),
+            reversed(token_types),
+            reversed(payloads),
+            reversed(literals),
+            reversed(positions),
+            reversed(lines),
+        ):
+            if kind == NONE:
+                push(None)
+                continue
+            token = Token(TOKEN_TYPES[type_code], strings[literal], position, line)
+            if kind == IDENTIFIER:
+                push(Identifier(token, strings[payload]))
+            elif kind == INTEGER:
+                push(IntegerLiteral(token, payload))
+            elif kind == INFIX:
+                left = pop()
+                push(InfixExpression(token, strings[payload], left, pop()))
+            elif kind == PREFIX:
+                push(PrefixExpression(token, strings[payload], pop()))
+            elif kind == EXPRESSION:
+                push(ExpressionStatement(token, pop()))
+            elif kind == LET:
+                name = pop()
+                push(LetStatement(token, name, pop()))
+            elif kind == RETURN:
+                push(ReturnStatement(token, pop()))
+            elif kind == BOOLEAN:
+                push(Boolean(token, bool(payload)))
+            elif kind == BIG_INTEGER:
+                push(IntegerLiteral(token, int(strings[payload])))
+            else:
+                raise ValueError(f"unknown node kind {kind}")
+    if len(built) != statement_count:
+        raise ValueError("corrupt binary AST")
+    built.reverse()
+    return Program(built)
+
+
+def dump(program: Program, file: BinaryIO) -> None:
+    file.write(dumps(program))
+
+
+def load(file: BinaryIO) -> Program:
+    return loads(file.read())
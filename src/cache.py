@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import tempfile
+from collections.abc import Iterable, Iterator
+from typing import Any, BinaryIO
+
+from src import binary_ast
+from src.ast import Program, Statement
+from src.parser import PARSER_VERSION
+
+CACHE_DIRECTORY = "__monkeycache__"
+CACHE_SUFFIX = ".ast"
+DEFAULT_MAX_BYTES = 256 << 20
+# statements encoded together; each batch is an independent `binary_ast`
+# record, preceded by its length, so entries can be written and read back
+# without holding the whole program, and at any nesting depth
+CACHE_BATCH_SIZE = 256
+HASH_CHUNK_SIZE = 1 << 20
+HEADER = struct.Struct("<4sIH").pack(b"MNKC", PARSER_VERSION, binary_ast.FORMAT_VERSION)
+# length and SHA-256 of the batches after it, following `HEADER`; written
+# once the entry is complete and checked before any of it is loaded
+BODY = struct.Struct("<Q32s")
+BATCH_LENGTH = struct.Struct("<Q")
+
+
+def source_key(path: str) -> str:
+    digest = hashlib.sha256(f"{PARSER_VERSION}\0".encode())
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    # Directory of parsed programs keyed by a hash of the source and the
+    # parser version, like `__pycache__`. Entries are written to a temporary
+    # file and renamed into place, so readers never see a partial entry and
+    # concurrent writers of the same key are harmless. The directory is kept
+    # under `max_bytes` by evicting the least recently used entries; a hit
+    # bumps the entry's mtime.
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def beside(cls, path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> ParseCache:
+        directory = os.path.join(
+            os.path.dirname(os.path.abspath(path)), CACHE_DIRECTORY
+        )
+        return cls(directory, max_bytes)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def load(self, key: str) -> Iterator[Statement] | None:
+        # None on a miss; otherwise the cached statements, read lazily. Like
+        # an unreadable `__pycache__`, a cache that cannot be read is a miss.
+        path = self.path(key)
+        try:
+            file = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            valid = file.read(len(HEADER)) == HEADER and body_intact(file)
+            os.utime(path)
+        except OSError:
+            valid = False
+        if not valid:
+            file.close()
+            return None
+        return self.read_batches(file)
+
+    def read_batches(self, file: BinaryIO) -> Iterator[Statement]:
+        with file:
+            while length := file.read(BATCH_LENGTH.size):
+                (size,) = BATCH_LENGTH.unpack(length)
+                yield from binary_ast.loads(file.read(size)).statements
+
+    def store(self, key: str, statements: Iterable[Statement]) -> Iterator[Statement]:
+        # Passes `statements` through, writing them to the cache as they go.
+        # The entry is only committed once they have all been consumed; if
+        # parsing fails or the consumer stops early nothing is written. A
+        # cache that cannot be written is skipped, and parsing carries on.
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(
+                dir=self.directory, suffix=CACHE_SUFFIX + ".tmp"
+            )
+        except OSError:
+            yield from statements
+            return
+        file = os.fdopen(descriptor, "wb")
+        # the body's fields are a placeholder until it is complete
+        writable = write(file, HEADER + BODY.pack(0, bytes(32)))
+        body = hashlib.sha256()
+        committed = False
+        try:
+            batch: list[Statement] = []
+            for statement in statements:
+                batch.append(statement)
+                if len(batch) == CACHE_BATCH_SIZE:
+                    writable = writable and write_batch(file, batch, body)
+                    batch = []
+                yield statement
+            if batch:
+                writable = writable and write_batch(file, batch, body)
+            if writable:
+                try:
+                    length = file.tell() - len(HEADER) - BODY.size
+                    file.seek(len(HEADER))
+                    file.write(BODY.pack(length, body.digest()))
+                    file.close()
+                    os.replace(temporary, self.path(key))
+                    committed = True
+                except OSError:
+                    pass
+        finally:
+            if not committed:
+                discard(file, temporary)
+        if committed:
+            self.evict()
+
+    def evict(self) -> None:
+        entries: list[tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if not entry.name.endswith(CACHE_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def write(file: BinaryIO, data: bytes) -> bool:
+    # whether `data` was written; the entry is abandoned otherwise
+    try:
+        file.write(data)
+    except OSError:
+        return False
+    return True
+
+
+def write_batch(file: BinaryIO, batch: list[Statement], body: Any) -> bool:
+    data = binary_ast.dumps(Program(batch))
+    record = BATCH_LENGTH.pack(len(data)) + data
+    body.update(record)
+    return write(file, record)
+
+
+def body_intact(file: BinaryIO) -> bool:
+    # Whether the rest of `file`, positioned after `HEADER`, is the body its
+    # fields describe, so a truncated or corrupted entry is a miss rather
+    # than an error halfway through the program. Leaves `file` at the first
+    # batch.
+    fields = file.read(BODY.size)
+    if len(fields) != BODY.size:
+        return False
+    length, digest = BODY.unpack(fields)
+    start = file.tell()
+    if os.fstat(file.fileno()).st_size != start + length:
+        return False
+    if hashlib.file_digest(file, "sha256").digest() != digest:
+        return False
+    file.seek(start)
+    return True
+
+
+def discard(file: BinaryIO, temporary: str) -> None:
+    try:
+        file.close()
+    except OSError:
+        pass
+    try:
+        os.unlink(temporary)
+    except OSError:
+        pass
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import gc
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# The one policy for the garbage collector in this package: code building
+# a large acyclic structure in one go (`binary_ast.loads`, the Python syntax
+# tree in `transpiler.generate`) pauses the collector around it. The
+# allocations would otherwise trigger collections that rescan everything
+# already built, costing more than building it. Nothing here can form a
+# cycle, and the collector's previous state is always restored, so callers
+# that disabled it themselves keep it disabled.
+
+
+@contextmanager
+def paused() -> Iterator[None]:
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
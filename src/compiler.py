@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from src.ast import (
+    Boolean,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    Node,
+    PrefixExpression,
+    ReturnStatement,
+    Statement,
+)
+from src.evaluator import EvaluationError, Resolver, error_at
+from src.parser import ParserError
+
+
+class Opcode(IntEnum):
+    CONSTANT = 0
+    TRUE = 1
+    FALSE = 2
+    POP = 3
+    ADD = 4
+    SUB = 5
+    MUL = 6
+    DIV = 7
+    EQUAL = 8
+    NOT_EQUAL = 9
+    LESS_THAN = 10
+    GREATER_THAN = 11
+    MINUS = 12
+    BANG = 13
+    SET_GLOBAL = 14
+    GET_GLOBAL = 15
+    RETURN_VALUE = 16
+    # supplies the high 16 bits of the next instruction's operand, for
+    # slots and constants past 65535
+    EXTENDED_ARG = 17
+
+
+# widths in bytes of each opcode's big-endian operands
+OPERAND_WIDTHS: dict[Opcode, tuple[int, ...]] = {
+    Opcode.CONSTANT: (2,),
+    Opcode.SET_GLOBAL: (2,),
+    Opcode.GET_GLOBAL: (2,),
+    Opcode.EXTENDED_ARG: (2,),
+}
+MAX_OPERAND = 0xFFFF
+
+INFIX_OPCODES: dict[str, Opcode] = {
+    "+": Opcode.ADD,
+    "-": Opcode.SUB,
+    "*": Opcode.MUL,
+    "/": Opcode.DIV,
+    "==": Opcode.EQUAL,
+    "!=": Opcode.NOT_EQUAL,
+    "<": Opcode.LESS_THAN,
+    ">": Opcode.GREATER_THAN,
+}
+
+PREFIX_OPCODES: dict[str, Opcode] = {
+    "-": Opcode.MINUS,
+    "!": Opcode.BANG,
+}
+
+
+def make(opcode: Opcode, *operands: int) -> bytes:
+    instruction = bytearray([opcode])
+    for width, operand in zip(OPERAND_WIDTHS.get(opcode, ()), operands, strict=True):
+        instruction += operand.to_bytes(width, "big")
+    return bytes(instruction)
+
+
+def disassemble(instructions: bytes | bytearray) -> str:
+    lines: list[str] = []
+    ip = 0
+    while ip < len(instructions):
+        opcode = Opcode(instructions[ip])
+        operands: list[int] = []
+        offset = ip + 1
+        for width in OPERAND_WIDTHS.get(opcode, ()):
+            operands.append(
+                int.from_bytes(instructions[offset : offset + width], "big")
+            )
+            offset += width
+        lines.append(" ".join([f"{ip:04d}", opcode.name, *map(str, operands)]))
+        ip = offset
+    return "\n".join(lines)
+
+
+@dataclass
+class Bytecode:
+    instructions: bytearray = field(default_factory=bytearray)
+    constants: list[int] = field(default_factory=list)
+    # (line, position) of the node behind every instruction that can fail
+    positions: dict[int, tuple[int, int]] = field(default_factory=dict)
+    # (end of the `let`, globals declared before it) for every `let` that
+    # declared a new global, so a failing one can be undeclared
+    declarations: list[tuple[int, int]] = field(default_factory=list)
+    # the error of the statement that ended the batch by failing to parse
+    # or resolve, raised once the statements before it have run
+    error: ParserError | EvaluationError | None = None
+    # the most values the instructions ever have on the stack at once
+    max_stack: int = 0
+
+
+class Compiler:
+    # Lowers statements to `Bytecode` for `vm.VM`. Global names are bound to
+    # slots by the same `Resolver` the tree-walking evaluator uses, and it is
+    # kept across `compile` calls so later code can refer to earlier lets.
+    def __init__(self, resolver: Resolver | None = None) -> None:
+        self.resolver = resolver or Resolver()
+        self.bytecode = Bytecode()
+        self.constant_indices: dict[int, int] = {}
+
+    def compile(self, statements: Iterable[Statement]) -> Bytecode:
+        # Like `Evaluator.execute`, nothing after a top-level `return` is
+        # read. A statement that fails to parse or resolve ends the batch,
+        # so its error is reported after those of the statements before it.
+        self.bytecode = bytecode = Bytecode()
+        self.constant_indices = {}
+        scope = self.resolver.scopes[0]
+        statements = iter(statements)
+        while True:
+            declared = len(scope)
+            try:
+                statement = next(statements, None)
+                if statement is None:
+                    break
+                self.resolver.resolve(statement)
+            except (ParserError, EvaluationError) as error:
+                bytecode.error = error
+                break
+            self.compile_node(statement)
+            if len(scope) > declared:
+                end = len(bytecode.instructions)
+                bytecode.declarations.append((end, declared))
+            if type(statement) is ReturnStatement:
+                break
+        return bytecode
+
+    def compile_node(self, node: Node) -> None:
+        # Post-order with an explicit stack, so nesting is not limited by
+        # Python's recursion limit: `work` holds nodes still to compile, and
+        # the (node,) of a node whose operands have been emitted.
+        # `depth` follows the values on the VM's stack; only leaves push one.
+        # `Any`: the exact type checks below do not narrow `item`
+        work: list[Any] = [node]
+        depth = 0
+        deepest = self.bytecode.max_stack
+        while work:
+            item = work.pop()
+            kind = type(item)
+            if kind is InfixExpression:
+                work += ((item,), item.right, item.left)
+            elif kind is IntegerLiteral:
+                self.emit(Opcode.CONSTANT, self.add_constant(item.value))
+                depth += 1
+                if depth > deepest:
+                    deepest = depth
+            elif kind is Identifier:
+                self.emit(Opcode.GET_GLOBAL, item.slot)
+                depth += 1
+                if depth > deepest:
+                    deepest = depth
+            elif kind is PrefixExpression:
+                work += ((item,), item.right)
+            elif kind is Boolean:
+                self.emit(Opcode.TRUE if item.value else Opcode.FALSE)
+                depth += 1
+                if depth > deepest:
+                    deepest = depth
+            elif kind is LetStatement:
+                work += ((item,), item.value)
+            elif kind is ExpressionStatement:
+                work += ((item,), item.expression)
+            elif kind is ReturnStatement:
+                work += ((item,), item.return_value)
+            elif kind is tuple:
+                (parent,) = item
+                kind = type(parent)
+                # every operator but a prefix one pops one value more than
+                # it pushes
+                if kind is not PrefixExpression:
+                    depth -= 1
+                if kind is InfixExpression:
+                    self.emit(INFIX_OPCODES[parent.operator], node=parent)
+                elif kind is PrefixExpression:
+                    self.emit(PREFIX_OPCODES[parent.operator], node=parent)
+                elif kind is LetStatement:
+                    self.emit(Opcode.SET_GLOBAL, parent.name.slot)
+                elif kind is ExpressionStatement:
+                    self.emit(Opcode.POP)
+                else:
+                    self.emit(Opcode.RETURN_VALUE)
+            else:
+                raise error_at(item, f"cannot compile {item}")
+        self.bytecode.max_stack = deepest
+
+    def emit(self, opcode: Opcode, *operands: int, node: Node | None = None) -> int:
+        instructions = self.bytecode.instructions
+        # every operand so far is a single u16
+        for operand in operands:
+            if operand > MAX_OPERAND:
+                if operand >> 16 > MAX_OPERAND:
+                    raise EvaluationError(f"operand too large: {operand}")
+                instructions.append(Opcode.EXTENDED_ARG)
+                instructions += (operand >> 16).to_bytes(2, "big")
+        position = len(instructions)
+        if node is not None:
+            self.bytecode.positions[position] = (node.token.line, node.token.position)
+        instructions.append(opcode)
+        for operand in operands:
+            instructions += (operand & MAX_OPERAND).to_bytes(2, "big")
+        return position
+
+    def add_constant(self, value: int) -> int:
+        index = self.constant_indices.get(value)
+        if index is None:
+            index = len(self.bytecode.constants)
+            self.bytecode.constants.append(value)
+            self.constant_indices[value] = index
+        return index
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any
+
+from src.ast import (
+    Boolean,
+    Expression,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    Node,
+    PrefixExpression,
+    Program,
+    ReturnStatement,
+    Statement,
+)
+from src.source_map import at_offset
+
+Value = int | bool | None
+
+
+class EvaluationError(Exception):
+    def __init__(
+        self, message: str, line: int | None = None, position: int | None = None
+    ):
+        # like `ParserError`, `message` is prefixed with the location of the
+        # failing node when it is known: its line and source offset
+        self.reason = message
+        self.line = line
+        self.position = position
+        if line is not None and position is not None:
+            message = at_offset(message, line, position)
+        self.message = message
+        super().__init__(self.message)
+
+
+def error_at(node: Node, message: str) -> EvaluationError:
+    return EvaluationError(message, node.token.line, node.token.position)
+
+
+def type_name(value: Value) -> str:
+    # bool first, it is a subclass of int
+    if isinstance(value, bool):
+        return "BOOLEAN"
+    if isinstance(value, int):
+        return "INTEGER"
+    return "NULL"
+
+
+def inspect(value: Value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def divide(left: int, right: int) -> int:
+    # Monkey integer division truncates toward zero
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
+
+
+# Operator semantics shared by every execution engine. Errors carry no
+# position; callers re-raise them with `error_at` for the offending node.
+
+
+def apply_prefix(operator: str, right: Value) -> Value:
+    match operator:
+        case "!":
+            return right is False or right is None
+        case "-" if type(right) is int:
+            return -right
+        case _:
+            raise EvaluationError(f"unknown operator: {operator}{type_name(right)}")
+
+
+def apply_infix(operator: str, left: Value, right: Value) -> Value:
+    if type(left) is int and type(right) is int:
+        match operator:
+            case "+":
+                return left + right
+            case "-":
+                return left - right
+            case "*":
+                return left * right
+            case "/":
+                if right == 0:
+                    raise EvaluationError("division by zero")
+                return divide(left, right)
+            case "<":
+                return left < right
+            case ">":
+                return left > right
+            case "==":
+                return left == right
+            case "!=":
+                return left != right
+    elif operator == "==":
+        return type_name(left) == type_name(right) and left == right
+    elif operator == "!=":
+        return type_name(left) != type_name(right) or left != right
+    elif type_name(left) != type_name(right):
+        raise EvaluationError(
+            f"type mismatch: {type_name(left)} {operator} {type_name(right)}"
+        )
+    raise EvaluationError(
+        f"unknown operator: {type_name(left)} {operator} {type_name(right)}"
+    )
+
+
+class Resolver:
+    # Static pass binding every `Identifier` to the (depth, slot) of its
+    # `let`, so the evaluator indexes environment lists instead of looking
+    # names up. `scopes[d]` maps symbol ids to slots at nesting depth `d`;
+    # only the global scope exists until the language grows functions.
+    def __init__(self) -> None:
+        self.scopes: list[dict[int, int]] = [{}]
+
+    def resolve(self, node: Node) -> None:
+        # With an explicit stack, so nesting is not limited by Python's
+        # recursion limit. `work` holds nodes, and the (name,) of a `let`
+        # whose value has been resolved: the value cannot see the name it
+        # is being bound to.
+        # `Any`: the exact type checks below do not narrow `item`
+        work: list[Any] = [node]
+        while work:
+            item = work.pop()
+            kind = type(item)
+            if kind is Identifier:
+                self.resolve_identifier(item)
+            elif kind is InfixExpression:
+                work += (item.right, item.left)
+            elif kind is PrefixExpression:
+                work.append(item.right)
+            elif kind is IntegerLiteral or kind is Boolean:
+                pass
+            elif kind is LetStatement:
+                work += ((item.name,), item.value)
+            elif kind is ExpressionStatement:
+                work.append(item.expression)
+            elif kind is ReturnStatement:
+                work.append(item.return_value)
+            elif kind is tuple:
+                self.declare(item[0])
+            else:
+                raise error_at(item, f"cannot evaluate {item}")
+
+    def declare(self, name: Identifier) -> None:
+        scope = self.scopes[-1]
+        # rebinding a name reuses its slot
+        slot = scope.setdefault(name.symbol_id(), len(scope))
+        name.depth = len(self.scopes) - 1
+        name.slot = slot
+
+    def forget(self, count: int) -> None:
+        # Undeclares all but the first `count` names of the innermost scope,
+        # for `let`s whose value failed. New names take the next slot, so
+        # the names kept still number their slots from 0.
+        scope = self.scopes[-1]
+        for symbol in list(scope)[count:]:
+            del scope[symbol]
+
+    def resolve_identifier(self, node: Identifier) -> None:
+        symbol = node.symbol_id()
+        for depth in range(len(self.scopes) - 1, -1, -1):
+            slot = self.scopes[depth].get(symbol)
+            if slot is not None:
+                node.depth = depth
+                node.slot = slot
+                return
+        raise error_at(node, f"identifier not found: {node.value}")
+
+
+class Evaluator:
+    # Tree-walking interpreter. Environments are a display: `frames[d]` is
+    # the slot list of the innermost scope at depth `d`, so a resolved
+    # variable is read with two list indexings whatever the nesting.
+    def __init__(self) -> None:
+        self.resolver = Resolver()
+        self.frames: list[list[Value]] = [[]]
+
+    def eval_program(self, program: Program) -> Value:
+        return self.execute(program.statements)
+
+    def execute(self, statements: Iterable[Statement]) -> Value:
+        # Resolves and runs statements one at a time, so it can consume
+        # `Parser.iter_statements` directly. Returns the value of the last
+        # statement, or of the first top-level `return`. A `let` whose value
+        # fails leaves its name unbound.
+        result: Value = None
+        scope = self.resolver.scopes[0]
+        for statement in statements:
+            declared = len(scope)
+            self.resolver.resolve(statement)
+            # make room for globals the statement declared
+            missing = len(scope) - len(self.frames[0])
+            if missing > 0:
+                self.frames[0].extend([None] * missing)
+            try:
+                match statement:
+                    case LetStatement():
+                        name = statement.name
+                        self.frames[name.depth][name.slot] = self.eval(statement.value)
+                        result = None
+                    case ReturnStatement():
+                        return self.eval(statement.return_value)
+                    case ExpressionStatement():
+                        result = self.eval(statement.expression)
+                    case _:
+                        raise error_at(statement, f"cannot evaluate {statement}")
+            except EvaluationError:
+                self.resolver.forget(declared)
+                del self.frames[0][declared:]
+                raise
+        return result
+
+    def eval(self, node: Expression) -> Value:
+        # Post-order with an explicit stack, so nesting is not limited by
+        # Python's recursion limit: `work` holds nodes still to evaluate, and
+        # None on top of an operator whose operands are the top of `values`.
+        values: list[Value] = []
+        push = values.append
+        # `Any`: the exact type checks below do not narrow `item`
+        work: list[Any] = [node]
+        pop = work.pop
+        while work:
+            item = pop()
+            kind = type(item)
+            if kind is InfixExpression:
+                work += (item, None, item.right, item.left)
+            elif kind is IntegerLiteral:
+                push(item.value)
+            elif kind is Identifier:
+                push(self.frames[item.depth][item.slot])
+            elif item is None:
+                operator = pop()
+                right = values.pop()
+                try:
+                    if type(operator) is InfixExpression:
+                        values[-1] = apply_infix(operator.operator, values[-1], right)
+                    else:
+                        push(apply_prefix(operator.operator, right))
+                except EvaluationError as error:
+                    raise error_at(operator, error.reason) from None
+            elif kind is PrefixExpression:
+                work += (item, None, item.right)
+            elif kind is Boolean:
+                push(item.value)
+            else:
+                raise error_at(item, f"cannot evaluate {item}")
+        return values[0]
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable, Iterator, Sequence
+from enum import IntEnum
+
+from src.ast import (
+    Boolean,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    Node,
+    PrefixExpression,
+    Program,
+    ReturnStatement,
+)
+from src.lexer import Lexer
+from src.parser import ParserError, Precedence
+from src.token import TOKEN_TYPES, TYPE_CODES, Token, TokenStream, TokenType, TokenView
+
+NO_NODE = -1
+
+
+class NodeKind(IntEnum):
+    LET = 0
+    RETURN = 1
+    EXPRESSION = 2
+    IDENTIFIER = 3
+    INTEGER = 4
+    BOOLEAN = 5
+    PREFIX = 6
+    INFIX = 7
+
+
+# operators stored in the payload of PREFIX and INFIX nodes
+OPERATORS: tuple[str, ...] = ("+", "-", "*", "/", "==", "!=", "<", ">", "!")
+OPERATOR_CODES: dict[str, int] = {
+    operator: code for code, operator in enumerate(OPERATORS)
+}
+
+
+class FlatAST:
+    # Arena-backed AST. Node `i` is `kinds[i]`, its token is
+    # `tokens[token_indices[i]]` and children are linked through
+    # `first_child` / `next_sibling` (NO_NODE ends a list):
+    #
+    #   LET         name IDENTIFIER, then value
+    #   RETURN      value
+    #   EXPRESSION  expression
+    #   PREFIX      right, payload is the operator code
+    #   INFIX       left, then right, payload is the operator code
+    #   IDENTIFIER  payload indexes `names`
+    #   INTEGER     payload is the value, or ~index into `big_integers` for
+    #               literals that do not fit in 63 bits
+    #   BOOLEAN     payload is 0 or 1
+    #
+    # `tokens` is a `TokenStream` when built by `parse`, so no `Token` object
+    # exists at all; `from_program` over plain tokens keeps them in a list.
+    def __init__(self, tokens: TokenStream | list[Token]) -> None:
+        self.tokens: Sequence[Token] = tokens
+        self.kinds: array[int] = array("B")
+        self.first_child: array[int] = array("i")
+        self.next_sibling: array[int] = array("i")
+        self.token_indices: array[int] = array("I")
+        self.payloads: array[int] = array("q")
+        self.statements: array[int] = array("I")
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+        self.big_integers: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __repr__(self) -> str:
+        return (
+            f"FlatAST(nodes={len(self)}, statements={len(self.statements)}, "
+            f"nbytes={self.nbytes})"
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            buffer.itemsize * len(buffer)
+            for buffer in (
+                self.kinds,
+                self.first_child,
+                self.next_sibling,
+                self.token_indices,
+                self.payloads,
+                self.statements,
+            )
+        )
+
+    @classmethod
+    def parse(cls, source: str) -> FlatAST:
+        tokens = Lexer(source).tokenize_stream()
+        ast = cls(tokens)
+        FlatParser(ast, tokens).parse()
+        return ast
+
+    def add(self, kind: NodeKind, token_index: int, payload: int = 0) -> int:
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.token_indices.append(token_index)
+        self.payloads.append(payload)
+        return index
+
+    def link(self, parent: int, *children: int) -> None:
+        # `children` become the child list of `parent`, in order
+        previous = NO_NODE
+        for child in children:
+            if previous == NO_NODE:
+                self.first_child[parent] = child
+            else:
+                self.next_sibling[previous] = child
+            previous = child
+
+    def intern(self, name: str) -> int:
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def integer_payload(self, value: int) -> int:
+        if 0 <= value < 1 << 63:
+            return value
+        self.big_integers.append(value)
+        return ~(len(self.big_integers) - 1)
+
+    def children(self, index: int) -> Iterator[int]:
+        child = self.first_child[index]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    def token(self, index: int) -> Token:
+        return self.tokens[self.token_indices[index]]
+
+    def name(self, index: int) -> str:
+        return self.names[self.payloads[index]]
+
+    def integer(self, index: int) -> int:
+        payload = self.payloads[index]
+        return payload if payload >= 0 else self.big_integers[~payload]
+
+    def operator(self, index: int) -> str:
+        return OPERATORS[self.payloads[index]]
+
+    def walk(self) -> Iterator[int]:
+        # every node in pre-order, statement by statement
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        for statement in self.statements:
+            stack = [statement]
+            while stack:
+                index = stack.pop()
+                yield index
+                sibling = next_sibling[index]
+                if sibling != NO_NODE:
+                    stack.append(sibling)
+                child = first_child[index]
+                if child != NO_NODE:
+                    stack.append(child)
+
+    @classmethod
+    def from_program(cls, program: Program) -> FlatAST:
+        # Nodes parsed from one `TokenStream` reference it by index; otherwise
+        # their tokens are kept in a list.
+        tokens: list[Token] = []
+        ast = cls(tokens)
+        stream: TokenStream | None = None
+        for statement in program.statements:
+            token = statement.token
+            if isinstance(token, TokenView):
+                stream = token.stream
+            break
+        if stream is not None:
+            ast.tokens = stream
+
+        def token_index(token: Token) -> int:
+            if stream is not None:
+                assert isinstance(token, TokenView) and token.stream is stream
+                return token.index
+            tokens.append(token)
+            return len(tokens) - 1
+
+        def add(node: Node) -> tuple[int, tuple[Node, ...]]:
+            # adds `node` alone, returning its index and its children
+            token = token_index(node.token)
+            match node:
+                case LetStatement():
+                    return ast.add(NodeKind.LET, token), (node.name, node.value)
+                case ReturnStatement():
+                    return ast.add(NodeKind.RETURN, token), (node.return_value,)
+                case ExpressionStatement():
+                    return ast.add(NodeKind.EXPRESSION, token), (node.expression,)
+                case Identifier():
+                    payload = ast.intern(node.value)
+                    return ast.add(NodeKind.IDENTIFIER, token, payload), ()
+                case IntegerLiteral():
+                    payload = ast.integer_payload(node.value)
+                    return ast.add(NodeKind.INTEGER, token, payload), ()
+                case Boolean():
+                    return ast.add(NodeKind.BOOLEAN, token, int(node.value)), ()
+                case PrefixExpression():
+                    payload = OPERATOR_CODES[node.operator]
+                    return ast.add(NodeKind.PREFIX, token, payload), (node.right,)
+                case InfixExpression():
+                    payload = OPERATOR_CODES[node.operator]
+                    index = ast.add(NodeKind.INFIX, token, payload)
+                    return index, (node.left, node.right)
+            raise ValueError(f"cannot flatten {node}")
+
+        # pre-order without recursion, so nodes are numbered as a recursive
+        # walk would number them
+        for statement in program.statements:
+            root, children = add(statement)
+            ast.statements.append(root)
+            stack = [(root, child) for child in reversed(children)]
+            last_child: dict[int, int] = {}
+            while stack:
+                parent, node = stack.pop()
+                index, children = add(node)
+                previous = last_child.get(parent, NO_NODE)
+                if previous == NO_NODE:
+                    ast.first_child[parent] = index
+                else:
+                    ast.next_sibling[previous] = index
+                last_child[parent] = index
+                stack += [(index, child) for child in reversed(children)]
+        return ast
+
+    def to_program(self) -> Program:
+        return Program([self.to_node(index) for index in self.statements])  # type: ignore
+
+    def to_node(self, index: int) -> Node:
+        # post-order without recursion: children are built before parents
+        built: list[Node] = []
+        stack: list[tuple[int, int]] = [(index, -1)]
+        while stack:
+            node, count = stack.pop()
+            if count < 0:
+                children = list(self.children(node))
+                stack.append((node, len(children)))
+                stack += [(child, -1) for child in reversed(children)]
+                continue
+            children = built[len(built) - count :]
+            del built[len(built) - count :]
+            built.append(self.make_node(node, children))
+        return built[0]
+
+    def make_node(self, index: int, children: list[Node]) -> Node:
+        token = self.token(index)
+        match self.kinds[index]:
+            case NodeKind.LET:
+                return LetStatement(token, *children)  # type: ignore
+            case NodeKind.RETURN:
+                return ReturnStatement(token, *children)  # type: ignore
+            case NodeKind.EXPRESSION:
+                return ExpressionStatement(token, *children)  # type: ignore
+            case NodeKind.IDENTIFIER:
+                return Identifier(token, self.name(index))
+            case NodeKind.INTEGER:
+                return IntegerLiteral(token, self.integer(index))
+            case NodeKind.BOOLEAN:
+                return Boolean(token, bool(self.payloads[index]))
+            case NodeKind.PREFIX:
+                return PrefixExpression(token, self.operator(index), *children)  # type: ignore
+            case NodeKind.INFIX:
+                return InfixExpression(token, self.operator(index), *children)  # type: ignore
+        raise ValueError(f"unknown node kind {self.kinds[index]}")
+
+
+class FlatVisitor:
+    # Dispatches on node kind to `visit_<kind>` methods, e.g. `visit_infix`;
+    # kinds without a method have their children visited in order.
+    def __init__(self, ast: FlatAST) -> None:
+        self.ast = ast
+        self.visitors: dict[int, Callable[[int], object]] = {}
+        for kind in NodeKind:
+            visitor = getattr(self, f"visit_{kind.name.lower()}", None)
+            self.visitors[kind] = visitor or self.generic_visit
+
+    def visit_program(self) -> None:
+        for statement in self.ast.statements:
+            self.visit(statement)
+
+    def visit(self, index: int) -> object:
+        return self.visitors[self.ast.kinds[index]](index)
+
+    def generic_visit(self, index: int) -> object:
+        for child in self.ast.children(index):
+            self.visit(child)
+        return None
+
+
+# Direct token-stream-to-arena parser: the same grammar, precedences and
+# errors as `parser.Parser`, without materializing tokens or nodes.
+
+PRECEDENCES: dict[int, int] = {
+    TYPE_CODES[TokenType.EQ]: Precedence.EQUALS.value,
+    TYPE_CODES[TokenType.NOT_EQ]: Precedence.EQUALS.value,
+    TYPE_CODES[TokenType.LT]: Precedence.LESS_GREATER.value,
+    TYPE_CODES[TokenType.GT]: Precedence.LESS_GREATER.value,
+    TYPE_CODES[TokenType.PLUS]: Precedence.SUM.value,
+    TYPE_CODES[TokenType.MINUS]: Precedence.SUM.value,
+    TYPE_CODES[TokenType.SLASH]: Precedence.PRODUCT.value,
+    TYPE_CODES[TokenType.ASTERISK]: Precedence.PRODUCT.value,
+}
+LOWEST = Precedence.LOWEST.value
+PREFIX = Precedence.PREFIX.value
+
+EOF = TYPE_CODES[TokenType.EOF]
+SEMICOLON = TYPE_CODES[TokenType.SEMICOLON]
+LET = TYPE_CODES[TokenType.LET]
+RETURN = TYPE_CODES[TokenType.RETURN]
+IDENT = TYPE_CODES[TokenType.IDENT]
+INT = TYPE_CODES[TokenType.INT]
+TRUE = TYPE_CODES[TokenType.TRUE]
+FALSE = TYPE_CODES[TokenType.FALSE]
+BANG = TYPE_CODES[TokenType.BANG]
+MINUS = TYPE_CODES[TokenType.MINUS]
+LPAREN = TYPE_CODES[TokenType.LPAREN]
+RPAREN = TYPE_CODES[TokenType.RPAREN]
+ASSIGN = TYPE_CODES[TokenType.ASSIGN]
+
+
+class FlatParser:
+    def __init__(self, ast: FlatAST, tokens: TokenStream) -> None:
+        self.ast = ast
+        self.tokens = tokens
+        self.types = tokens.types
+        self.last = len(tokens.types) - 1
+        self.current = 0
+
+    def peek(self) -> int:
+        return self.types[min(self.current + 1, self.last)]
+
+    def next_token(self) -> None:
+        if self.current < self.last:
+            self.current += 1
+
+    def parse(self) -> None:
+        statements = self.ast.statements
+        while self.types[self.current] != EOF:
+            statements.append(self.parse_statement())
+            self.next_token()
+
+    def parse_statement(self) -> int:
+        kind = self.types[self.current]
+        if kind == LET:
+            return self.parse_let_statement()
+        if kind == RETURN:
+            return self.parse_return_statement()
+        statement = self.ast.add(NodeKind.EXPRESSION, self.current)
+        self.ast.link(statement, self.parse_expression(LOWEST))
+        self.skip_semicolon()
+        return statement
+
+    def parse_let_statement(self) -> int:
+        ast = self.ast
+        statement = ast.add(NodeKind.LET, self.current)
+        self.expect_peek(IDENT)
+        name = ast.add(
+            NodeKind.IDENTIFIER,
+            self.current,
+            ast.intern(self.tokens.literal(self.current)),
+        )
+        self.expect_peek(ASSIGN)
+        self.next_token()
+        ast.link(statement, name, self.parse_expression(LOWEST))
+        self.skip_semicolon()
+        return statement
+
+    def parse_return_statement(self) -> int:
+        statement = self.ast.add(NodeKind.RETURN, self.current)
+        self.next_token()
+        self.ast.link(statement, self.parse_expression(LOWEST))
+        self.skip_semicolon()
+        return statement
+
+    def skip_semicolon(self) -> None:
+        if self.peek() == SEMICOLON:
+            self.next_token()
+
+    def expect_peek(self, expected: int) -> None:
+        if self.peek() != expected:
+            token = self.tokens[min(self.current + 1, self.last)]
+            raise ParserError(
+                f"expected {TOKEN_TYPES[expected]}, got {token.type} instead", token
+            )
+        self.next_token()
+
+    def parse_expression(self, precedence: int) -> int:
+        # iterative like `Parser.parse_expression`; entries are (precedence,
+        # node waiting for its right operand or NO_NODE for a parenthesis,
+        # that node's left operand or NO_NODE for a prefix operator)
+        ast = self.ast
+        types = self.types
+        stack: list[tuple[int, int, int]] = []
+        while True:
+            current = self.current
+            kind = types[current]
+            if kind == BANG or kind == MINUS:
+                operator = OPERATOR_CODES[self.tokens.literal(current)]
+                stack.append(
+                    (precedence, ast.add(NodeKind.PREFIX, current, operator), NO_NODE)
+                )
+                precedence = PREFIX
+                self.next_token()
+                continue
+            if kind == LPAREN:
+                stack.append((precedence, NO_NODE, NO_NODE))
+                precedence = LOWEST
+                self.next_token()
+                continue
+            left = self.parse_operand()
+            while True:
+                peek = self.peek()
+                power = PRECEDENCES.get(peek, LOWEST)
+                if precedence < power:
+                    self.next_token()
+                    current = self.current
+                    operator = OPERATOR_CODES[self.tokens.literal(current)]
+                    stack.append(
+                        (precedence, ast.add(NodeKind.INFIX, current, operator), left)
+                    )
+                    precedence = power
+                    self.next_token()
+                    break
+                if not stack:
+                    return left
+                precedence, pending, pending_left = stack.pop()
+                if pending == NO_NODE:
+                    self.expect_peek(RPAREN)
+                elif pending_left == NO_NODE:
+                    ast.link(pending, left)
+                    left = pending
+                else:
+                    ast.link(pending, pending_left, left)
+                    left = pending
+
+    def parse_operand(self) -> int:
+        ast = self.ast
+        current = self.current
+        kind = self.types[current]
+        if kind == IDENT:
+            return ast.add(
+                NodeKind.IDENTIFIER, current, ast.intern(self.tokens.literal(current))
+            )
+        if kind == INT:
+            literal = self.tokens.literal(current)
+            try:
+                value = int(literal)
+            except ValueError:
+                token = self.tokens[current]
+                raise ParserError(f"could not parse {literal} as an integer", token)
+            return ast.add(NodeKind.INTEGER, current, ast.integer_payload(value))
+        if kind == TRUE or kind == FALSE:
+            return ast.add(NodeKind.BOOLEAN, current, int(kind == TRUE))
+        raise ParserError(
+            f"no prefix parse function for {TOKEN_TYPES[kind]}", self.tokens[current]
+        )
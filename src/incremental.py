@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from itertools import islice
+
+from src.ast import Program, Statement
+from src.lexer import Lexer
+from src.parser import Parser
+from src.token import Token, TokenType
+
+
+@dataclass
+class TextEdit:
+    offset: int
+    deleted: int = 0
+    inserted: str = ""
+
+    def apply(self, source: str) -> str:
+        return (
+            source[: self.offset] + self.inserted + source[self.offset + self.deleted :]
+        )
+
+
+class TokenListReader:
+    # `TokenSource` over a token list starting at `index`; keeps returning the
+    # final EOF token past the end of the list.
+    def __init__(self, tokens: list[Token], index: int = 0) -> None:
+        self.tokens = tokens
+        self.index = index
+
+    def next_token(self) -> Token:
+        index = self.index
+        self.index += 1
+        if index < len(self.tokens):
+            return self.tokens[index]
+        return self.tokens[-1]
+
+
+@dataclass
+class Document:
+    # A parsed buffer that can be kept up to date with `apply` instead of
+    # re-lexing and re-parsing the whole source after every edit.
+    #
+    # `tokens` always ends with EOF and top-level statements tile it:
+    # `statement_starts[i]` is the index of the first token of
+    # `program.statements[i]`. Statements and tokens after an edit are reused
+    # and shifted in place, so node identity survives edits elsewhere.
+    source: str
+    tokens: list[Token]
+    program: Program
+    statement_starts: list[int] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, source: str) -> Document:
+        tokens = Lexer(source).tokenize()
+        statements, starts, _ = parse_statements(tokens, 0, None)
+        return cls(source, tokens, Program(statements), starts)
+
+    def apply(self, edit: TextEdit) -> None:
+        source = edit.apply(self.source)
+        old_tokens = self.tokens
+        old_starts = self.statement_starts
+        delta = len(edit.inserted) - edit.deleted
+        edit_end = edit.offset + len(edit.inserted)
+
+        # Re-lex from the start of the last statement that begins strictly
+        # before the edit: token starts are the only lexer state and that
+        # statement may end in a token the edit extends.
+        first_statement = max(
+            bisect_left(
+                old_starts, edit.offset, key=lambda index: old_tokens[index].position
+            )
+            - 1,
+            0,
+        )
+        lexer = Lexer(source)
+        if first_statement > 0:
+            relex_from = old_starts[first_statement]
+            restart = old_tokens[relex_from]
+            lexer.seek(restart.position, restart.line)
+        else:
+            relex_from = 0
+
+        # Lex until a token starts, past the edit, where an old token started:
+        # everything from there on lexes exactly as before.
+        relexed: list[Token] = []
+        reuse_from = len(old_tokens)
+        line_delta = 0
+        old_index = relex_from
+        while True:
+            token = lexer.next_token()
+            if token.position >= edit_end:
+                old_position = token.position - delta
+                while (
+                    old_index < len(old_tokens)
+                    and old_tokens[old_index].position < old_position
+                ):
+                    old_index += 1
+                if (
+                    old_index < len(old_tokens)
+                    and old_tokens[old_index].position == old_position
+                    and old_tokens[old_index].type == token.type
+                ):
+                    reuse_from = old_index
+                    line_delta = token.line - old_tokens[old_index].line
+                    break
+            relexed.append(token)
+            if token.type == TokenType.EOF:
+                break
+
+        # splice the relexed tokens in place; the old ones are kept to roll
+        # back if the edited source does not parse
+        tokens = old_tokens
+        replaced = tokens[relex_from:reuse_from]
+        tokens[relex_from:reuse_from] = relexed
+        tail_start = relex_from + len(relexed)
+        count_delta = len(relexed) - len(replaced)
+
+        def at_old_statement(start: int) -> bool:
+            # statements starting at an old statement boundary inside the
+            # reused tokens parse exactly as before
+            if start < tail_start:
+                return False
+            old_start = start - count_delta
+            index = bisect_left(old_starts, old_start, first_statement)
+            return index < len(old_starts) and old_starts[index] == old_start
+
+        shift_tokens(tokens, tail_start, delta, line_delta)
+        try:
+            statements, starts, stopped_at = parse_statements(
+                tokens, relex_from, at_old_statement
+            )
+        except Exception:
+            shift_tokens(tokens, tail_start, -delta, -line_delta)
+            tokens[relex_from:tail_start] = replaced
+            raise
+
+        if tokens[stopped_at].type == TokenType.EOF:
+            reused_from = len(old_starts)
+        else:
+            reused_from = bisect_left(old_starts, stopped_at - count_delta)
+        self.source = source
+        self.program.statements[first_statement:reused_from] = statements
+        old_starts[first_statement:reused_from] = starts
+        if count_delta:
+            shifted_from = first_statement + len(starts)
+            old_starts[shifted_from:] = [
+                start + count_delta for start in old_starts[shifted_from:]
+            ]
+
+
+def parse_statements(
+    tokens: list[Token], index: int, stop: Callable[[int], bool] | None
+) -> tuple[list[Statement], list[int], int]:
+    # Parses top-level statements from `tokens[index]` until EOF or until
+    # `stop` accepts the index of the next statement's first token. Returns
+    # the statements, their start indices and the index parsing stopped at.
+    reader = TokenListReader(tokens, index)
+    parser = Parser(reader)
+    statements: list[Statement] = []
+    starts: list[int] = []
+    while True:
+        start = min(reader.index - 2, len(tokens) - 1)
+        if tokens[start].type == TokenType.EOF or (stop is not None and stop(start)):
+            return statements, starts, start
+        statement = parser.parse_statement()
+        if statement:
+            statements.append(statement)
+            starts.append(start)
+        parser.next_token()
+
+
+def shift_tokens(tokens: list[Token], start: int, delta: int, line_delta: int) -> None:
+    if line_delta:
+        for token in islice(tokens, start, None):
+            token.position += delta
+            token.line += line_delta
+    elif delta:
+        for token in islice(tokens, start, None):
+            token.position += delta
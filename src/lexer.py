@@ -1,9 +1,113 @@
-from src.token import Token, TokenType
+from __future__ import annotations
+
+import re
+from typing import Protocol
+
+from src.symbols import SYMBOLS
+from src.token import KEYWORDS, TYPE_CODES, Token, TokenStream, TokenType
+
+# Master pattern used by `Lexer.tokenize`: leading whitespace, then one group
+# per lexeme class. The classes only cover ASCII; an identifier or number
+# running into a non-ASCII character, and any other unclassified character,
+# lands in the catch-all group so it can be lexed with the same `str`
+# predicates `next_token` uses.
+TOKEN_PATTERN = re.compile(
+    r"""
+    (\s*)
+    (?:
+        ([A-Za-z][A-Za-z_]*+(?![^\x00-\x7f]))
+        |([0-9]++(?![^\x00-\x7f]))
+        |("[^"]*"?)
+        |(==|!=|[=!+\-*/<>,;(){}])
+        |(.)
+        |\Z
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+OPERATORS: dict[str, TokenType] = {
+    token_type.value: token_type
+    for token_type in (
+        TokenType.ASSIGN,
+        TokenType.PLUS,
+        TokenType.MINUS,
+        TokenType.BANG,
+        TokenType.ASTERISK,
+        TokenType.SLASH,
+        TokenType.LT,
+        TokenType.GT,
+        TokenType.EQ,
+        TokenType.NOT_EQ,
+        TokenType.COMMA,
+        TokenType.SEMICOLON,
+        TokenType.LPAREN,
+        TokenType.RPAREN,
+        TokenType.LBRACE,
+        TokenType.RBRACE,
+    )
+}
+
+
+def read_unclassified(source: str, position: int) -> tuple[TokenType, int]:
+    # Lexes the lexeme at `position` that `TOKEN_PATTERN` could not classify,
+    # with the same predicates as `Lexer.next_token`. Returns its type and the
+    # offset just past it.
+    input_len = len(source)
+    character = source[position]
+    end = position
+    if character == "\0":
+        return TokenType.EOF, end
+    if character.isalpha():
+        while end < input_len and (source[end].isalpha() or source[end] == "_"):
+            end += 1
+        return TokenType.lookup_keyword(source[position:end]), end
+    if character.isdigit():
+        while end < input_len and source[end].isdigit():
+            end += 1
+        return TokenType.INT, end
+    return TokenType.ILLEGAL, end + 1
+
+
+# Regex fast path of `Lexer.next_token` on ASCII input: the leading
+# whitespace, then one group per lexeme class, so the group that matched
+# (`lastindex`) says how the lexeme becomes a token. On ASCII, `\s`,
+# `[A-Za-z]` and `[0-9]` agree with `isspace`, `isalpha` and `isdigit`.
+ASCII_LEXEME_PATTERN = re.compile(
+    r"""
+    (\s*)
+    (?:
+        ([A-Za-z][A-Za-z_]*)
+        |([0-9]+)
+        |("[^"]*"?)
+        |(==|!=|[=!+\-*/<>,;(){}])
+        |  # no lexeme
+    )
+    """,
+    re.VERBOSE,
+)
+# `lastindex` of a match of each class; only the whitespace group takes
+# part in a match without a lexeme
+NO_LEXEME = 1
+IDENTIFIER_GROUP = 2
+NUMBER_GROUP = 3
+OPERATOR_GROUP = 5
+
+
+def intern_identifier(name: str) -> str:
+    # the shared copy of `name` from `SYMBOLS`, which numbers it on first sight
+    return SYMBOLS.names[SYMBOLS.intern(name)]
 
 
 class Lexer:
     def __init__(self, inp: str) -> None:
+        self.reset(inp)
+
+    def reset(self, inp: str) -> None:
+        # starts over on new input, so one lexer can serve many snippets
         self.input: str = inp
+        # pure ASCII input takes the regex fast path in `next_token`
+        self.ascii: bool = inp.isascii()
         self.position: int = 0
         self.read_position: int = 0
         self.line: int = 0
@@ -15,6 +119,13 @@ class Lexer:
         self.input_len = len(self.input)
         self.read_char()
 
+    def seek(self, position: int, line: int) -> None:
+        # restart lexing at `position`, which must be the start of a token or
+        # of the whitespace before one
+        self.read_position = position
+        self.line = line
+        self.read_char()
+
     def __repr__(self) -> str:
         return (
             f"Lexer(\n"
@@ -37,7 +148,59 @@ class Lexer:
         else:
             return self.input[self.read_position]
 
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview) -> Lexer:
+        # UTF-8 source; only input with non-ASCII bytes is lexed one
+        # character at a time
+        try:
+            return cls(str(data, "ascii"))
+        except UnicodeDecodeError:
+            return cls(str(data, "utf-8"))
+
     def next_token(self) -> Token:
+        # On ASCII input a whole lexeme is matched at once and dispatched on
+        # the pattern group that matched it. The end of input, NUL and
+        # characters that start no lexeme are left to `next_character_token`.
+        if not self.ascii:
+            return self.next_character_token()
+        source = self.input
+        m = ASCII_LEXEME_PATTERN.match(source, self.position)
+        assert m is not None
+        group = m.lastindex
+        start, end = m.span(group)
+        if group == NO_LEXEME:
+            # `start:end` is the whitespace; once past the end of the input,
+            # where `position` is too, the match is clamped back to the end
+            if end > start:
+                self.line += source.count("\n", start, end)
+                self.read_position = end
+                self.read_char()
+            return self.next_character_token()
+        if start > self.position:
+            self.line += source.count("\n", self.position, start)
+        lexeme = source[start:end]
+        self.position = end
+        self.read_position = end + 1
+        self.character = source[end] if end < self.input_len else "\0"
+        if group == OPERATOR_GROUP:
+            return Token(OPERATORS[lexeme], lexeme, start, self.line)
+        if group == IDENTIFIER_GROUP:
+            keyword = KEYWORDS.get(lexeme)
+            if keyword is not None:
+                return Token(keyword, lexeme, start, self.line)
+            # `intern_identifier`, inlined
+            symbol = SYMBOLS.ids.get(lexeme)
+            if symbol is None:
+                symbol = SYMBOLS.intern(lexeme)
+            return Token(TokenType.IDENT, SYMBOLS.names[symbol], start, self.line)
+        if group == NUMBER_GROUP:
+            return Token(TokenType.INT, lexeme, start, self.line)
+        # an unterminated string runs to the end of the input
+        if len(lexeme) > 1 and lexeme[-1] == '"':
+            return Token(TokenType.STRING, lexeme[1:-1], start, self.line)
+        return Token(TokenType.STRING, lexeme[1:], start, self.line)
+
+    def next_character_token(self) -> Token:
         token = Token(TokenType.ILLEGAL, "", 0, 0)
         self.skip_whitespace()
         match self.character:
@@ -78,10 +241,15 @@ class Lexer:
                 token.literal = self.read_string()
                 token.type = TokenType.STRING
                 token.line = self.line
+                if self.character != '"':
+                    # unterminated, there is no closing " to skip
+                    return token
             case ch if ch.isalpha():
                 token.position = self.position
                 token.literal = self.read_identifier()
                 token.type = TokenType.lookup_keyword(token.literal)
+                if token.type is TokenType.IDENT:
+                    token.literal = intern_identifier(token.literal)
                 token.line = self.line
                 return token
             case ch if ch.isdigit():
@@ -91,10 +259,141 @@ class Lexer:
                 token.line = self.line
                 return token
             case _:
-                pass
+                token = Token(
+                    TokenType.ILLEGAL, self.character, self.position, self.line
+                )
         self.read_char()
         return token
 
+    def tokenize(self) -> list[Token]:
+        # Bulk equivalent of calling `next_token` until (and including) EOF:
+        # whole lexemes are matched by `TOKEN_PATTERN` instead of dispatching
+        # on every character.
+        source = self.input
+        input_len = self.input_len
+        keywords = KEYWORDS
+        operators = OPERATORS
+        ident_type = TokenType.IDENT
+        symbol_ids = SYMBOLS.ids
+        symbol_names = SYMBOLS.names
+        intern = SYMBOLS.intern
+        tokens: list[Token] = []
+        append = tokens.append
+        position = self.position
+        line = self.line
+        while position < input_len:
+            for m in TOKEN_PATTERN.finditer(source, position):
+                whitespace, ident, number, string, operator, other = m.groups()
+                if whitespace:
+                    line += whitespace.count("\n")
+                if ident is not None:
+                    keyword = keywords.get(ident)
+                    if keyword is None:
+                        # `intern_identifier`, inlined
+                        symbol = symbol_ids.get(ident)
+                        if symbol is None:
+                            symbol = intern(ident)
+                        append(
+                            Token(ident_type, symbol_names[symbol], m.start(2), line)
+                        )
+                    else:
+                        append(Token(keyword, ident, m.start(2), line))
+                elif operator is not None:
+                    append(Token(operators[operator], operator, m.start(5), line))
+                elif number is not None:
+                    append(Token(TokenType.INT, number, m.start(3), line))
+                elif string is not None:
+                    # an unterminated string runs to the end of the input
+                    if len(string) > 1 and string[-1] == '"':
+                        literal = string[1:-1]
+                    else:
+                        literal = string[1:]
+                    append(Token(TokenType.STRING, literal, m.start(4), line))
+                elif other is not None:
+                    position = m.start(6)
+                    break
+            else:
+                position = input_len
+                break
+            token_type, end = read_unclassified(source, position)
+            if token_type == TokenType.EOF:
+                break
+            literal = source[position:end]
+            if token_type is TokenType.IDENT:
+                literal = intern_identifier(literal)
+            append(Token(token_type, literal, position, line))
+            position = end
+        append(Token(TokenType.EOF, "", position, line))
+        self.finish_bulk(position, line)
+        return tokens
+
+    def tokenize_stream(self) -> TokenStream:
+        # Same scan as `tokenize`, but stores the tokens in a compact
+        # `TokenStream` instead of allocating a `Token` per lexeme.
+        source = self.input
+        input_len = self.input_len
+        keywords = KEYWORDS
+        operators = OPERATORS
+        type_codes = TYPE_CODES
+        ident_code = TYPE_CODES[TokenType.IDENT]
+        int_code = TYPE_CODES[TokenType.INT]
+        string_code = TYPE_CODES[TokenType.STRING]
+        stream = TokenStream(source)
+        append_type = stream.types.append
+        append_start = stream.starts.append
+        append_end = stream.ends.append
+        append_line = stream.lines.append
+        position = self.position
+        line = self.line
+        while position < input_len:
+            for m in TOKEN_PATTERN.finditer(source, position):
+                whitespace, ident, number, string, operator, other = m.groups()
+                if whitespace:
+                    line += whitespace.count("\n")
+                if ident is not None:
+                    keyword = keywords.get(ident)
+                    append_type(ident_code if keyword is None else type_codes[keyword])
+                    append_start(m.start(2))
+                    append_end(m.end(2))
+                elif operator is not None:
+                    append_type(type_codes[operators[operator]])
+                    append_start(m.start(5))
+                    append_end(m.end(5))
+                elif number is not None:
+                    append_type(int_code)
+                    append_start(m.start(3))
+                    append_end(m.end(3))
+                elif string is not None:
+                    end = m.end(4)
+                    if len(string) > 1 and string[-1] == '"':
+                        end -= 1
+                    append_type(string_code)
+                    append_start(m.start(4))
+                    append_end(end)
+                elif other is not None:
+                    position = m.start(6)
+                    break
+                else:
+                    continue
+                append_line(line)
+            else:
+                position = input_len
+                break
+            token_type, end = read_unclassified(source, position)
+            if token_type == TokenType.EOF:
+                break
+            stream.append(token_type, position, end, line)
+            position = end
+        stream.append(TokenType.EOF, position, position, line)
+        self.finish_bulk(position, line)
+        return stream
+
+    def finish_bulk(self, eof_position: int, line: int) -> None:
+        # leave the lexer where `next_token` would be after returning EOF
+        self.line = line
+        self.read_position = eof_position + 1
+        self.read_char()
+
     def match_peek_token(
         self, expected_char: str, matched: TokenType, default: TokenType
     ) -> Token:
@@ -117,9 +416,9 @@ class Lexer:
         # skip opening "
         self.read_char()
         start_position = self.position
-        while self.character != '"':
+        # an unterminated string runs to the end of the input
+        while self.character != '"' and self.position < self.input_len:
             # TODO: handle escape characters
-            # TODO: handle unterminated strings
             # skip closing "
             self.read_char()
         return self.input[start_position : self.position]
@@ -139,3 +438,107 @@ class Lexer:
                 case _:
                     pass
             self.read_char()
+
+
+class TextReader(Protocol):
+    def read(self, size: int, /) -> str: ...
+
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+class StreamLexer:
+    # `next_token` source over a text reader (an open file, `MmapReader`, ...).
+    # Only the unconsumed tail of the current chunk is held in memory; a
+    # lexeme that runs into the end of the buffer triggers a refill so tokens
+    # never split across chunks. Emits the same tokens as `Lexer` would for
+    # the whole text.
+    def __init__(self, reader: TextReader, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.buffer: str = ""
+        # absolute offset of `buffer[0]` in the input
+        self.buffer_offset: int = 0
+        self.index: int = 0
+        self.line: int = 0
+        self.exhausted: bool = False
+
+    def __repr__(self) -> str:
+        return (
+            f"StreamLexer(\n"
+            f"  position: {self.buffer_offset + self.index},\n"
+            f"  line: {self.line},\n"
+            f"  buffered: {len(self.buffer) - self.index},\n"
+            f"  exhausted: {self.exhausted}\n"
+            f")"
+        )
+
+    def fill(self) -> bool:
+        if self.exhausted:
+            return False
+        chunk = self.reader.read(self.chunk_size)
+        if not chunk:
+            self.exhausted = True
+            return False
+        self.buffer_offset += self.index
+        self.buffer = self.buffer[self.index :] + chunk
+        self.index = 0
+        return True
+
+    def next_token(self) -> Token:
+        while True:
+            m = TOKEN_PATTERN.match(self.buffer, self.index)
+            assert m is not None
+            if m.end() < len(self.buffer) or not self.fill():
+                break
+        whitespace, ident, number, string, operator, other = m.groups()
+        if whitespace:
+            self.line += whitespace.count("\n")
+        offset = self.buffer_offset
+        if other is not None:
+            self.index = m.start(6)
+            return self.next_unclassified()
+        self.index = m.end()
+        if ident is not None:
+            keyword = KEYWORDS.get(ident)
+            if keyword is None:
+                return Token(
+                    TokenType.IDENT,
+                    intern_identifier(ident),
+                    offset + m.start(2),
+                    self.line,
+                )
+            return Token(keyword, ident, offset + m.start(2), self.line)
+        if operator is not None:
+            return Token(OPERATORS[operator], operator, offset + m.start(5), self.line)
+        if number is not None:
+            return Token(TokenType.INT, number, offset + m.start(3), self.line)
+        if string is not None:
+            # an unterminated string runs to the end of the input
+            if len(string) > 1 and string[-1] == '"':
+                literal = string[1:-1]
+            else:
+                literal = string[1:]
+            return Token(TokenType.STRING, literal, offset + m.start(4), self.line)
+        return Token(TokenType.EOF, "", offset + self.index, self.line)
+
+    def next_unclassified(self) -> Token:
+        while True:
+            token_type, end = read_unclassified(self.buffer, self.index)
+            if end < len(self.buffer) or not self.fill():
+                break
+        position = self.buffer_offset + self.index
+        literal = self.buffer[self.index : end]
+        self.index = end
+        match token_type:
+            case TokenType.EOF:
+                # an embedded NUL ends the input like `Lexer` does, but lexing
+                # can resume after it
+                self.index += 1
+                return Token(TokenType.EOF, "", position, self.line)
+            case TokenType.IDENT:
+                return Token(
+                    token_type, intern_identifier(literal), position, self.line
+                )
+            case _:
+                return Token(token_type, literal, position, self.line)
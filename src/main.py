@@ -1,8 +1,113 @@
+import argparse
+import asyncio
+import os
 import sys
+from collections.abc import Iterable
 
-from src.ast import Program
-from src.lexer import Lexer
-from src.parser import Parser
+from src.ast import Program, Statement
+from src.batch import (
+    ENGINES,
+    BatchOptions,
+    describe_error,
+    expand_paths,
+    process_files,
+)
+from src.cache import ParseCache, source_key
+from src.evaluator import EvaluationError, Evaluator, inspect
+from src.lexer import Lexer, StreamLexer, TextReader
+from src.optimizer import Folder
+from src.parser import Parser, ParserError
+from src.profiler import Profile, ProfiledParser, ProfiledTokenSource
+from src.reader import MmapReader
+from src.serializer import write_json_lines, write_text
+from src.server import serve
+from src.source_map import SourceMap
+from src.token import TokenSource
+from src.transpiler import Transpiler
+from src.vm import VM
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="pymonkey")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        metavar="file",
+        help="Monkey source files or directories of .mnk files; with more than "
+        "one file each is processed in a worker and summarized on one line",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="read the file through a memory map instead of a buffered file",
+    )
+    parser.add_argument(
+        "--run",
+        action="store_true",
+        help="evaluate the program and print its result instead of its AST",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=list(ENGINES),
+        default="tree",
+        help="execution engine for --run: tree-walking evaluator, bytecode VM or "
+        "Python code objects translated from the AST",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "jsonl"],
+        default="text",
+        help="how to print the AST: the nodes' text form or one JSON object "
+        "per statement",
+    )
+    parser.add_argument(
+        "--fold",
+        action="store_true",
+        help="fold constant expressions and report how many nodes were eliminated",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always parse the file instead of using the on-disk parse cache",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="report every syntax error as file:line:column instead of stopping "
+        "at the first; nothing is printed or run",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print per-phase timings and token/node counters to stderr",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="write the --profile report to PATH as JSON (implies --profile)",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="also trace allocated bytes when profiling (slows the run down)",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help="serve REPL sessions to concurrent clients on HOST:PORT or a Unix "
+        "socket path, one snippet per line, evaluated on --jobs workers",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="worker processes for multiple files or --serve (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        help="files handed to a worker at a time (default: a few chunks per worker)",
+    )
+    return parser.parse_args(argv)
 
 
 def main():
@@ -11,26 +116,128 @@ def main():
         parser = Parser(lexer)
         return parser.parse_program()
 
-    def run_interpreter():
+    def write_statements(statements: Iterable[Statement], args: argparse.Namespace):
+        if args.format == "jsonl":
+            write_json_lines(statements, sys.stdout)
+        else:
+            write_text(statements, sys.stdout)
+
+    def make_engine(engine: str) -> Evaluator | VM | Transpiler:
+        return ENGINES[engine]()
+
+    def run_interpreter(args: argparse.Namespace):
         print("Pymonkey 0.1.0")
+        evaluator = make_engine(args.engine)
         while True:
             try:
                 user_inp = input(">>> ")
                 prog = get_ast(user_inp)
-                print(prog)
+                if args.fold:
+                    prog = Folder().fold_program(prog)
+                if args.run:
+                    print(inspect(evaluator.execute(prog.statements)))
+                else:
+                    write_statements(prog.statements, args)
+            except (ParserError, EvaluationError) as e:
+                print(f"error: {SourceMap(user_inp).describe(e.reason, e.position)}")
             except KeyboardInterrupt:
                 print("KeyboardInterrupt")
             except EOFError:
                 exit(0)
 
-    args = sys.argv[1:]
-    if not args:
-        run_interpreter()
-    file = args[0]
-    with open(file, "r") as f:
-        content = f.read()
-    program = get_ast(content)
-    print(program)
+    def process(statements: Iterable[Statement], args: argparse.Namespace):
+        folder = Folder()
+        if args.fold:
+            statements = folder.fold_statements(statements)
+        if args.run:
+            print(inspect(make_engine(args.engine).execute(statements)))
+        else:
+            write_statements(statements, args)
+        if args.fold:
+            print(f"folding eliminated {folder.eliminated} nodes", file=sys.stderr)
+
+    def run_batch(args: argparse.Namespace) -> bool:
+        options = BatchOptions(
+            run=args.run,
+            engine=args.engine,
+            fold=args.fold,
+            use_cache=not args.no_cache,
+            check=args.check,
+        )
+        paths = expand_paths(args.files)
+        ok = True
+        for result in process_files(paths, options, args.jobs, args.chunksize):
+            print(result)
+            ok = ok and result.ok
+        return ok
+
+    def run_file(path: str, args: argparse.Namespace, profile: Profile | None):
+        consumer = "run" if args.run else "print"
+
+        def profiled(statements: Iterable[Statement], producer: str):
+            if profile is None:
+                return statements
+            return profile.statements(statements, producer, consumer)
+
+        cache = None if args.no_cache else ParseCache.beside(path)
+        key = ""
+        if cache is not None:
+            key = source_key(path)
+            cached = cache.load(key)
+            if cached is not None:
+                process(profiled(cached, "load"), args)
+                return
+
+        def parse(reader: TextReader) -> Iterable[Statement]:
+            lexer: TokenSource = StreamLexer(reader)
+            if profile is None:
+                parser = Parser(lexer)
+            else:
+                parser = ProfiledParser(ProfiledTokenSource(lexer, profile), profile)
+            statements = parser.iter_statements()
+            if cache is not None:
+                statements = cache.store(key, statements)
+            return profiled(statements, "parse")
+
+        if args.mmap:
+            with MmapReader(path) as reader:
+                process(parse(reader), args)
+        else:
+            with open(path, "r") as f:
+                process(parse(f), args)
+
+    args = parse_args(sys.argv[1:])
+    if args.serve:
+        try:
+            asyncio.run(serve(args.serve, args.engine, args.jobs))
+        except KeyboardInterrupt:
+            pass
+        return
+    if not args.files:
+        run_interpreter(args)
+    if args.check or len(args.files) > 1 or os.path.isdir(args.files[0]):
+        if not run_batch(args):
+            sys.exit(1)
+        return
+    path = args.files[0]
+    profile = None
+    if args.profile or args.profile_json:
+        profile = Profile(trace_memory=args.profile_memory)
+        profile.start()
+    try:
+        run_file(path, args, profile)
+    except (ParserError, EvaluationError) as error:
+        print(f"error: {describe_error(path, error)}", file=sys.stderr)
+        sys.exit(1)
+    except RecursionError:
+        print("error: expression nested too deeply", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profile is not None:
+            profile.stop()
+            print(profile.report(), file=sys.stderr)
+            if args.profile_json:
+                profile.dump(args.profile_json)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from src.ast import (
+    Boolean,
+    Expression,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    Node,
+    PrefixExpression,
+    Program,
+    ReturnStatement,
+    Statement,
+)
+from src.evaluator import EvaluationError, Value, apply_infix, apply_prefix
+from src.token import Token, TokenType
+
+# operators whose result is an integer whenever evaluating them succeeds
+INTEGER_OPERATORS = {"+", "-", "*", "/"}
+BOOLEAN_OPERATORS = {"==", "!=", "<", ">"}
+
+
+def is_integer(node: Expression) -> bool:
+    match node:
+        case IntegerLiteral():
+            return True
+        case PrefixExpression(operator="-"):
+            return True
+        case InfixExpression(operator=operator):
+            return operator in INTEGER_OPERATORS
+    return False
+
+
+def is_boolean(node: Expression) -> bool:
+    match node:
+        case Boolean():
+            return True
+        case PrefixExpression(operator="!"):
+            return True
+        case InfixExpression(operator=operator):
+            return operator in BOOLEAN_OPERATORS
+    return False
+
+
+def literal(node: Expression, value: Value) -> Expression:
+    # the folded literal keeps the line/position of the expression it replaces
+    token = node.token
+    if isinstance(value, bool):
+        token_type = TokenType.TRUE if value else TokenType.FALSE
+        return Boolean(
+            Token(token_type, str(value).lower(), token.position, token.line), value
+        )
+    return IntegerLiteral(
+        Token(TokenType.INT, str(value), token.position, token.line), value
+    )
+
+
+class Folder:
+    # Constant folding and algebraic simplification. Rewrites only what is
+    # guaranteed to evaluate the same: expressions that would raise (division
+    # by zero, type errors) are left for the engine to report at run time, and
+    # identities like `x + 0` apply only when `x` is known to be an integer,
+    # since `true + 0` is an error. Returns new nodes and leaves the input
+    # tree untouched; `eliminated` counts the nodes removed so far.
+    def __init__(self) -> None:
+        self.eliminated = 0
+
+    def fold_program(self, program: Program) -> Program:
+        return Program(list(self.fold_statements(program.statements)))
+
+    def fold_statements(self, statements: Iterable[Statement]) -> Iterator[Statement]:
+        for statement in statements:
+            yield self.fold(statement)
+
+    def fold(self, node: Node) -> Node:
+        # Post-order with an explicit stack, so nesting is not limited by
+        # Python's recursion limit: `work` holds nodes still to fold, and the
+        # (node,) of a node whose folded children are the top of `folded`.
+        # `Any`: the exact type checks below do not narrow `item`, and the
+        # folded children of statements are expressions
+        folded: list[Any] = []
+        push = folded.append
+        work: list[Any] = [node]
+        while work:
+            item = work.pop()
+            kind = type(item)
+            if kind is InfixExpression:
+                work += ((item,), item.right, item.left)
+            elif kind is IntegerLiteral or kind is Identifier or kind is Boolean:
+                push(item)
+            elif kind is PrefixExpression:
+                work += ((item,), item.right)
+            elif kind is LetStatement:
+                work += ((item,), item.value)
+            elif kind is ExpressionStatement:
+                work += ((item,), item.expression)
+            elif kind is ReturnStatement:
+                work += ((item,), item.return_value)
+            elif kind is tuple:
+                (parent,) = item
+                kind = type(parent)
+                if kind is InfixExpression:
+                    right = folded.pop()
+                    push(self.fold_infix_expression(parent, folded.pop(), right))
+                elif kind is PrefixExpression:
+                    push(self.fold_prefix_expression(parent, folded.pop()))
+                else:
+                    push(self.fold_statement(parent, folded.pop()))
+            else:
+                raise TypeError(f"cannot fold {item}")
+        return folded[0]
+
+    def fold_statement(self, node: Statement, child: Expression) -> Node:
+        match node:
+            case LetStatement() if child is not node.value:
+                return LetStatement(node.token, node.name, child)
+            case ReturnStatement() if child is not node.return_value:
+                return ReturnStatement(node.token, child)
+            case ExpressionStatement() if child is not node.expression:
+                return ExpressionStatement(node.token, child)
+        return node
+
+    def fold_prefix_expression(self, node: PrefixExpression, right: Expression) -> Node:
+        if isinstance(right, IntegerLiteral | Boolean):
+            try:
+                value = apply_prefix(node.operator, right.value)
+            except EvaluationError:
+                pass
+            else:
+                self.eliminated += 1
+                return literal(node, value)
+        # `--x` is `x` for integers and `!!x` is `x` for booleans
+        if isinstance(right, PrefixExpression) and right.operator == node.operator:
+            inner = right.right
+            if (node.operator == "-" and is_integer(inner)) or (
+                node.operator == "!" and is_boolean(inner)
+            ):
+                self.eliminated += 2
+                return inner
+        if right is node.right:
+            return node
+        return PrefixExpression(node.token, node.operator, right)
+
+    def fold_infix_expression(
+        self, node: InfixExpression, left: Expression, right: Expression
+    ) -> Node:
+        constants = (IntegerLiteral, Boolean)
+        if isinstance(left, constants) and isinstance(right, constants):
+            try:
+                value = apply_infix(node.operator, left.value, right.value)
+            except EvaluationError:
+                pass
+            else:
+                self.eliminated += 2
+                return literal(node, value)
+        simplified = self.simplify(node.operator, left, right)
+        if simplified is not None:
+            self.eliminated += 2
+            return simplified
+        if left is node.left and right is node.right:
+            return node
+        return InfixExpression(node.token, node.operator, left, right)
+
+    def simplify(
+        self, operator: str, left: Expression, right: Expression
+    ) -> Expression | None:
+        # the operand that stays must be an integer for the identity to hold
+        if isinstance(right, IntegerLiteral) and is_integer(left):
+            match operator, right.value:
+                case ("+" | "-", 0) | ("*" | "/", 1):
+                    return left
+        if isinstance(left, IntegerLiteral) and is_integer(right):
+            match operator, left.value:
+                case ("+", 0) | ("*", 1):
+                    return right
+        return None
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import pairwise
+from multiprocessing.shared_memory import SharedMemory
+
+from src.lexer import Lexer
+from src.token import TokenStream, TokenType
+
+# Lexing of one large source on several processes, producing the same
+# `TokenStream` as `Lexer(source).tokenize_stream()`.
+#
+# The source is cut into chunks after newlines outside string literals,
+# the only tokens that can span lines, so every chunk lexes on its own.
+# Whether a newline is inside a string only depends on the parity of the
+# `"` before it, as nothing else contains one. Each chunk's first line is
+# the number of newlines outside strings before it, which is also what
+# the sequential lexer counts. The chunks are UTF-8 encoded into shared
+# memory; each worker decodes and lexes its own, rebases the positions onto
+# the whole source and sends back the columns, which are concatenated.
+
+# below this many characters per job, splitting costs more than it saves
+MIN_CHUNK = 1 << 20
+
+
+def chunk_boundaries(source: str, end: int, count: int) -> list[int]:
+    # Offsets cutting `source[:end]` into at most `count` chunks of about
+    # the same size, each but the last ending just after a newline outside
+    # any string. The first offset is 0 and the last `end`.
+    boundaries = [0]
+    for chunk in range(1, count):
+        start = boundaries[-1]
+        boundary = next_boundary(source, max(end * chunk // count, start), start, end)
+        if boundary is None or boundary == end:
+            break
+        boundaries.append(boundary)
+    boundaries.append(end)
+    return boundaries
+
+
+def next_boundary(source: str, position: int, start: int, end: int) -> int | None:
+    # the offset just after the first newline at or past `position` that is
+    # outside any string, given that `start` is
+    inside = source.count('"', start, position) % 2
+    while True:
+        if inside:
+            # skip to the end of the string
+            position = source.find('"', position, end) + 1
+            if not position:
+                return None
+        newline = source.find("\n", position, end)
+        if newline == -1:
+            return None
+        inside = source.count('"', position, newline) % 2
+        position = newline + 1
+        if not inside:
+            return position
+
+
+def lines_outside_strings(text: str) -> int:
+    # newlines in `text`, which starts outside any string, that the lexer
+    # counts: every other piece between quotes is a string
+    return sum(piece.count("\n") for piece in text.split('"')[::2])
+
+
+def input_end(source: str) -> int:
+    # where the sequential lexer stops: at the end, or at the first NUL
+    # outside a string
+    position = source.find("\0")
+    while position != -1 and source.count('"', 0, position) % 2:
+        position = source.find("\0", position + 1)
+    return len(source) if position == -1 else position
+
+
+def lex_chunk(
+    name: str, start: int, end: int, position: int, line: int
+) -> tuple[array[int], array[int], array[int], array[int]]:
+    # Lexes the bytes `start:end` of shared memory `name`, a chunk starting
+    # at character `position` and line `line` of the source. Returns its
+    # columns without the EOF token.
+    memory = SharedMemory(name)
+    try:
+        lexer = Lexer.from_bytes(bytes(memory.buf[start:end]))
+    finally:
+        memory.close()
+    lexer.line = line
+    stream = lexer.tokenize_stream()
+    count = len(stream) - 1
+    rebase = position.__add__
+    return (
+        stream.types[:count],
+        array("I", map(rebase, stream.starts[:count])),
+        array("I", map(rebase, stream.ends[:count])),
+        stream.lines[:count],
+    )
+
+
+def tokenize_parallel(source: str, jobs: int | None = None) -> TokenStream:
+    # `Lexer(source).tokenize_stream()` on `jobs` processes (default: one per
+    # CPU); small sources are lexed in this process.
+    end = input_end(source)
+    jobs = min(jobs or os.cpu_count() or 1, end // MIN_CHUNK)
+    if jobs <= 1:
+        return Lexer(source).tokenize_stream()
+    boundaries = chunk_boundaries(source, end, jobs)
+    chunks = [source[start:stop].encode() for start, stop in pairwise(boundaries)]
+    memory = SharedMemory(create=True, size=max(1, sum(map(len, chunks))))
+    try:
+        tasks = []
+        offset = 0
+        line = 0
+        for chunk, (start, stop) in zip(chunks, pairwise(boundaries)):
+            memory.buf[offset : offset + len(chunk)] = chunk
+            tasks.append((offset, offset + len(chunk), start, line))
+            offset += len(chunk)
+            line += lines_outside_strings(source[start:stop])
+        del chunks
+        stream = TokenStream(source)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(lex_chunk, memory.name, *task) for task in tasks]
+            for future in futures:
+                types, starts, ends, lines = future.result()
+                stream.types.extend(types)
+                stream.starts.extend(starts)
+                stream.ends.extend(ends)
+                stream.lines.extend(lines)
+    finally:
+        memory.close()
+        memory.unlink()
+    stream.append(TokenType.EOF, end, end, line)
+    return stream
@@ -1,7 +1,13 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
 from enum import Enum
-from typing import Callable
+from typing import Any, ClassVar
 
 from src.ast import (
+    Boolean,
     Expression,
     ExpressionStatement,
     Identifier,
@@ -14,7 +20,12 @@ from src.ast import (
     Statement,
 )
 from src.lexer import Lexer
-from src.token import Token, TokenType
+from src.source_map import SourceMap, at_offset
+from src.token import Token, TokenSource, TokenType
+
+# bump whenever the lexer, parser or AST classes change what a source parses to;
+# it keys `cache.ParseCache` entries
+PARSER_VERSION = 1
 
 
 class Precedence(Enum):
@@ -27,47 +38,159 @@ class Precedence(Enum):
     CALL = 7
 
 
+LOWEST = Precedence.LOWEST.value
+PREFIX = Precedence.PREFIX.value
+
+# where a recovering parser resumes after an error
+SYNCHRONIZING_TOKENS = {TokenType.SEMICOLON, TokenType.RBRACE, TokenType.EOF}
+
+
 class ParserError(Exception):
-    def __init__(self, message: str):
+    def __init__(self, message: str, token: Token | None = None):
+        # `message` is prefixed with the offending token's location, which is
+        # also kept for diagnostics; `SourceMap.describe` formats it with a
+        # column instead
+        self.reason = message
+        self.token = token
+        self.position = None if token is None else token.position
+        if token is not None:
+            message = at_offset(message, token.line, token.position)
         self.message = message
         super().__init__(self.message)
 
 
+@dataclass
+class Diagnostic:
+    # A parse error found in recovery mode. Unlike tokens, `line` and
+    # `column` count from 1, as editors and compilers report them.
+    message: str
+    line: int
+    column: int
+
+    def __str__(self) -> str:
+        return f"{self.line}:{self.column}: {self.message}"
+
+
+class NodeTable:
+    # Hash-consing of expressions: `share` returns the one node standing for
+    # every expression with the same structure, ignoring where it is. The
+    # parser builds trees bottom-up and shares each node once its children
+    # are, so a node is keyed by its operator and its children's ids, and two
+    # shared expressions are structurally equal exactly when they are the
+    # same object. Shared nodes keep the token of their first occurrence;
+    # where the others are is kept in compact columns. Shared nodes must be
+    # treated as read-only: only the resolver writes to them, and it rebinds
+    # identifiers before each statement runs.
+    def __init__(self) -> None:
+        self.identifiers: dict[int, Expression] = {}
+        self.integers: dict[int, Expression] = {}
+        self.booleans: dict[bool, Expression] = {}
+        # by operator, then by the id of the operand, or of both ids packed
+        # into one int
+        self.prefixes: dict[str, dict[int, Expression]] = {}
+        self.infixes: dict[str, dict[int, Expression]] = {}
+        # occurrence `i` after the first of `repeated[i]` is on `lines[i]`
+        # at `positions[i]`
+        self.repeated: list[Expression] = []
+        self.lines: array[int] = array("I")
+        self.positions: array[int] = array("I")
+
+    def __len__(self) -> int:
+        return (
+            len(self.identifiers)
+            + len(self.integers)
+            + len(self.booleans)
+            + sum(map(len, self.prefixes.values()))
+            + sum(map(len, self.infixes.values()))
+        )
+
+    def share(self, node: Expression) -> Expression:
+        table: dict[Any, Expression]
+        if type(node) is InfixExpression:
+            table = self.infixes.get(node.operator) or self.infixes.setdefault(
+                node.operator, {}
+            )
+            key = id(node.left) << 64 | id(node.right)
+        elif type(node) is Identifier:
+            table = self.identifiers
+            key = node.symbol_id()
+        elif type(node) is IntegerLiteral:
+            table = self.integers
+            key = node.value
+        elif type(node) is PrefixExpression:
+            table = self.prefixes.get(node.operator) or self.prefixes.setdefault(
+                node.operator, {}
+            )
+            key = id(node.right)
+        elif type(node) is Boolean:
+            table = self.booleans
+            key = node.value
+        else:
+            return node
+        shared = table.setdefault(key, node)
+        if shared is not node:
+            self.repeated.append(shared)
+            self.lines.append(node.token.line)
+            self.positions.append(node.token.position)
+        return shared
+
+    def occurrences(self, node: Expression) -> list[tuple[int, int]]:
+        # (line, position) of every occurrence of shared `node`, in source
+        # order; a scan of all repeats, meant for diagnostics
+        found = [(node.token.line, node.token.position)]
+        for index, repeated in enumerate(self.repeated):
+            if repeated is node:
+                found.append((self.lines[index], self.positions[index]))
+        return found
+
+
 class Parser:
-    def __init__(self, lexer: Lexer):
+    # Operator tables, shared by every parser: building them per instance
+    # cost more than parsing a typical snippet. `parse_expression` handles
+    # operators and parentheses on its own stack, so only operands have a
+    # parse function, called with the parser.
+    precedences: ClassVar[dict[TokenType, Precedence]] = {
+        TokenType.EQ: Precedence.EQUALS,
+        TokenType.NOT_EQ: Precedence.EQUALS,
+        TokenType.LT: Precedence.LESS_GREATER,
+        TokenType.GT: Precedence.LESS_GREATER,
+        TokenType.PLUS: Precedence.SUM,
+        TokenType.MINUS: Precedence.SUM,
+        TokenType.SLASH: Precedence.PRODUCT,
+        TokenType.ASTERISK: Precedence.PRODUCT,
+    }
+    # the precedences as plain ints, for `parse_expression`
+    binding_powers: ClassVar[dict[TokenType, int]] = {
+        token_type: precedence.value for token_type, precedence in precedences.items()
+    }
+    prefix_operators: ClassVar[frozenset[TokenType]] = frozenset(
+        {TokenType.BANG, TokenType.MINUS}
+    )
+    prefix_parse_fns: ClassVar[dict[TokenType, Callable[[Parser], Expression]]]
+
+    def __init__(
+        self, lexer: TokenSource, recover: bool = False, nodes: NodeTable | None = None
+    ):
+        # with `recover`, errors are collected in `errors` and parsing resumes
+        # after the next `;` or `}` instead of raising
+        self.recover = recover
+        # with `nodes`, expressions are shared through it: identical
+        # subexpressions, in this parse or any other using the same table,
+        # are one object
+        self.nodes = nodes
+        self.reset(lexer)
+
+    def reset(self, lexer: TokenSource) -> None:
+        # Starts over on a new token source, keeping `recover` and `nodes`: a
+        # long-lived parser can take snippet after snippet without being
+        # rebuilt.
         self.lexer = lexer
+        self.errors: list[ParserError] = []
         self.current_token: Token | None = None
         self.peek_token: Token | None = None
-
-        # Add precedence mapping
-        self.precedences: dict[TokenType, Precedence] = {
-            TokenType.EQ: Precedence.EQUALS,
-            TokenType.NOT_EQ: Precedence.EQUALS,
-            TokenType.LT: Precedence.LESS_GREATER,
-            TokenType.GT: Precedence.LESS_GREATER,
-            TokenType.PLUS: Precedence.SUM,
-            TokenType.MINUS: Precedence.SUM,
-            TokenType.SLASH: Precedence.PRODUCT,
-            TokenType.ASTERISK: Precedence.PRODUCT,
-        }
-
-        self.prefix_parse_fns: dict[TokenType, Callable[[], Expression]] = {
-            TokenType.IDENT: self.parse_identifier,
-            TokenType.INT: self.parse_integet_literal,
-            TokenType.BANG: self.parse_prefix_expression,
-            TokenType.MINUS: self.parse_prefix_expression,
-        }
-        # TODO: why aren't these being registered and called when we parse the infix expressions?
-        self.infix_parse_fns: dict[TokenType, Callable[[Expression], Expression]] = {
-            TokenType.PLUS: self.parse_infix_expression,
-            TokenType.MINUS: self.parse_infix_expression,
-            TokenType.SLASH: self.parse_infix_expression,
-            TokenType.ASTERISK: self.parse_infix_expression,
-            TokenType.EQ: self.parse_infix_expression,
-            TokenType.NOT_EQ: self.parse_infix_expression,
-            TokenType.LT: self.parse_infix_expression,
-            TokenType.GT: self.parse_infix_expression,
-        }
+        # deepest expression nesting parsed so far: how many calls deep a
+        # recursive parser would have gone
+        self.max_depth = 0
         self._post_init()
 
     def _post_init(self):
@@ -79,16 +202,34 @@ class Parser:
         self.peek_token = self.lexer.next_token()
 
     def parse_program(self) -> Program:
-        program = Program()
+        return Program(list(self.iter_statements()))
+
+    def iter_statements(self) -> Iterator[Statement]:
+        # yields each top-level statement as soon as it has been parsed, so
+        # callers can consume a program without holding all of it
         # to satisfy pyright, and also a good sanity check to have
         assert self.current_token is not None
         assert self.peek_token is not None
         while self.current_token.type != TokenType.EOF:
-            statement = self.parse_statement()
+            try:
+                statement = self.parse_statement()
+            except ParserError as error:
+                if not self.recover:
+                    raise
+                self.errors.append(error)
+                self.synchronize()
+                statement = None
             if statement:
-                program.statements.append(statement)
+                yield statement
             self.next_token()
-        return program
+
+    def synchronize(self) -> None:
+        # skip to the `;` or `}` ending the broken statement, which the
+        # caller then steps over
+        assert self.current_token is not None
+        while self.current_token.type not in SYNCHRONIZING_TOKENS:
+            self.next_token()
+            assert self.current_token is not None
 
     def parse_statement(self) -> Statement | None:
         # same thing as above
@@ -113,25 +254,77 @@ class Parser:
         return statement
 
     def parse_expression(self, precedence: Precedence) -> Expression:
-        assert self.current_token is not None
-        prefix = self.prefix_parse_fns.get(self.current_token.type, None)
-        if not prefix:
-            raise ParserError(f"no prefix parse function for {self.current_token.type}")
-        left_exp = prefix()
-
-        while (
-            self.peek_token is not None
-            and self.peek_token.type == TokenType.SEMICOLON
-            and precedence.value < self.peek_precedence().value
-        ):
-            infix = self.infix_parse_fns.get(self.peek_token.type, None)
-            if not infix:
-                return left_exp
-
-            self.next_token()
-            left_exp = infix(left_exp)
-
-        return left_exp
+        # Pratt parsing with an explicit stack instead of recursion, so
+        # nesting depth is only limited by memory. Each stack entry is a
+        # suspended parse_expression call: its precedence and the prefix or
+        # infix node waiting for its right operand (None for an open
+        # parenthesis). Builds exactly the trees the recursive version does.
+        stack: list[tuple[int, PrefixExpression | InfixExpression | None]] = []
+        current_precedence = precedence.value
+        binding_powers = self.binding_powers
+        prefix_operators = self.prefix_operators
+        next_token = self.lexer.next_token
+        share = None if self.nodes is None else self.nodes.share
+        while True:
+            # parse the prefix part of an expression
+            token = self.current_token
+            assert token is not None
+            if token.type in prefix_operators:
+                stack.append(
+                    (
+                        current_precedence,
+                        PrefixExpression(token=token, operator=token.literal),
+                    )
+                )
+                current_precedence = PREFIX
+                self.current_token = self.peek_token
+                self.peek_token = next_token()
+                continue
+            if token.type is TokenType.LPAREN:
+                stack.append((current_precedence, None))
+                current_precedence = LOWEST
+                self.current_token = self.peek_token
+                self.peek_token = next_token()
+                continue
+            prefix = self.prefix_parse_fns.get(token.type, None)
+            if not prefix:
+                raise ParserError(f"no prefix parse function for {token.type}", token)
+            left_exp = prefix(self)
+            if share is not None:
+                left_exp = share(left_exp)
+
+            # an operator binding more tightly than this level takes the
+            # expression as its left operand; otherwise this level is done
+            # and the suspended one below it resumes
+            while True:
+                operator = self.peek_token
+                assert operator is not None
+                # `;` and other tokens that are not infix operators bind at
+                # LOWEST, so never take the expression
+                power = binding_powers.get(operator.type, LOWEST)
+                if current_precedence < power:
+                    stack.append(
+                        (
+                            current_precedence,
+                            InfixExpression(
+                                token=operator, operator=operator.literal, left=left_exp
+                            ),
+                        )
+                    )
+                    current_precedence = power
+                    self.current_token = next_token()
+                    self.peek_token = next_token()
+                    break
+                if len(stack) >= self.max_depth:
+                    self.max_depth = len(stack) + 1
+                if not stack:
+                    return left_exp
+                current_precedence, pending = stack.pop()
+                if pending is None:
+                    self.expect_peek(TokenType.RPAREN)
+                else:
+                    pending.right = left_exp
+                    left_exp = pending if share is None else share(pending)
 
     def parse_identifier(self) -> Expression:
         assert self.current_token is not None
@@ -144,42 +337,27 @@ class Parser:
             value = int(self.current_token.literal)
         except ValueError:
             raise ParserError(
-                f"line {self.current_token.line}, col: {self.current_token.position}: could not parse {self.current_token.literal} as an integer"
+                f"could not parse {self.current_token.literal} as an integer",
+                self.current_token,
             )
         literal = IntegerLiteral(token=self.current_token, value=value)
         return literal
 
-    def parse_prefix_expression(self) -> Expression:
+    def parse_boolean(self) -> Expression:
         assert self.current_token is not None
-        expression = PrefixExpression(
-            token=self.current_token, operator=self.current_token.literal
+        return Boolean(
+            token=self.current_token, value=self.current_token.type == TokenType.TRUE
         )
-        self.next_token()
-        expression.right = self.parse_expression(Precedence.PREFIX)
-        return expression
-
-    def parse_infix_expression(self, left: Expression) -> Expression:
-        assert self.current_token is not None
-
-        expression = InfixExpression(
-            token=self.current_token,
-            operator=self.current_token.literal,
-            left=left,
-        )
-        precedence = self.current_precedence()
-        self.next_token()
-        expression.right = self.parse_expression(precedence)
-        return expression
 
     def parse_return_statement(self) -> ReturnStatement:
         assert self.current_token is not None
         statement = ReturnStatement(self.current_token)
         self.next_token()
+        statement.return_value = self.parse_expression(Precedence.LOWEST)
 
         # This check is really annoying, is there a way to avoid it everywhere
-        assert self.current_token is not None
-        # TODO: parse the expression for the return value
-        while self.current_token.type != TokenType.SEMICOLON:
+        assert self.peek_token is not None
+        if self.peek_token.type == TokenType.SEMICOLON:
             self.next_token()
 
         return statement
@@ -193,8 +371,11 @@ class Parser:
         statement.name = Identifier(self.current_token, self.current_token.literal)
         if not self.expect_peek(TokenType.ASSIGN):
             return None
-        # TODO: parse the expression for the value
-        while not self.current_token.type == TokenType.SEMICOLON:
+        self.next_token()
+        statement.value = self.parse_expression(Precedence.LOWEST)
+
+        assert self.peek_token is not None
+        if self.peek_token.type == TokenType.SEMICOLON:
             self.next_token()
         return statement
 
@@ -203,15 +384,45 @@ class Parser:
         assert self.peek_token is not None
         if self.peek_token.type != token_type:
             raise ParserError(
-                f"line {self.peek_token.line}, col: {self.peek_token.position}: expected {token_type}, got {self.peek_token.type} instead"
+                f"expected {token_type}, got {self.peek_token.type} instead",
+                self.peek_token,
             )
         self.next_token()
         return True
 
-    def peek_precedence(self) -> Precedence:
-        assert self.peek_token is not None
-        return self.precedences.get(self.peek_token.type, Precedence.LOWEST)
 
-    def current_precedence(self) -> Precedence:
-        assert self.current_token is not None
-        return self.precedences.get(self.current_token.type, Precedence.LOWEST)
+Parser.prefix_parse_fns = {
+    TokenType.IDENT: Parser.parse_identifier,
+    TokenType.INT: Parser.parse_integet_literal,
+    TokenType.TRUE: Parser.parse_boolean,
+    TokenType.FALSE: Parser.parse_boolean,
+}
+
+
+def parse_many(
+    sources: Iterable[str], nodes: NodeTable | None = None
+) -> Iterator[Program]:
+    # Parses each source into its own program with one lexer and parser,
+    # reset in between, so setting them up is paid once per batch.
+    lexer = Lexer("")
+    parser = Parser(lexer, nodes=nodes)
+    for source in sources:
+        lexer.reset(source)
+        parser.reset(lexer)
+        yield parser.parse_program()
+
+
+def parse_with_diagnostics(source: str) -> tuple[Program, list[Diagnostic]]:
+    # Parses all of `source` in one pass, returning the statements that
+    # parsed and a diagnostic for every error.
+    parser = Parser(Lexer(source), recover=True)
+    program = parser.parse_program()
+    if not parser.errors:
+        return program, []
+    source_map = SourceMap(source)
+    diagnostics = []
+    for error in parser.errors:
+        assert error.token is not None
+        line, column = source_map.location(error.token.position)
+        diagnostics.append(Diagnostic(error.reason, line, column))
+    return program, diagnostics
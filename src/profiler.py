@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from src.ast import Statement
+from src.parser import Parser
+from src.token import Token, TokenSource
+from src.visitor import iter_nodes
+
+
+class ProfileHook:
+    # Subscribe with `Profile.subscribe` to observe a profiled run; every
+    # method is a no-op so tools only override what they need.
+    def on_phase_start(self, name: str) -> None:
+        pass
+
+    def on_phase_end(self, name: str, wall: float, cpu: float) -> None:
+        pass
+
+    def on_token(self, token: Token) -> None:
+        pass
+
+    def on_statement(self, statement: Statement) -> None:
+        pass
+
+
+@dataclass
+class PhaseTimes:
+    wall: float = 0.0
+    cpu: float = 0.0
+    calls: int = 0
+
+
+class Profile:
+    # Per-phase timing and counters for one run. Phases nest (the lexer runs
+    # inside the parser, which runs between the statements the printer or
+    # engine consumes) and each records only its own time, excluding the
+    # phases nested in it. Nothing here is touched unless profiling is on:
+    # main only wraps the lexer, parser and statement stream when it is.
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.phases: dict[str, PhaseTimes] = {}
+        self.token_counts: Counter[str] = Counter()
+        self.node_counts: Counter[str] = Counter()
+        self.max_parser_depth = 0
+        self.hooks: list[ProfileHook] = []
+        self.trace_memory = trace_memory
+        self.peak_allocated_bytes = 0
+        self.allocated_bytes = 0
+        # (name, wall, cpu) of the running phases, innermost last; the times
+        # are when each one last started or resumed
+        self.stack: list[tuple[str, float, float]] = []
+        self.started = (0.0, 0.0)
+        self.total = PhaseTimes()
+
+    def subscribe(self, hook: ProfileHook) -> None:
+        self.hooks.append(hook)
+
+    def start(self) -> None:
+        if self.trace_memory:
+            tracemalloc.start()
+        self.started = (time.perf_counter(), time.process_time())
+
+    def stop(self) -> None:
+        wall, cpu = self.started
+        self.total = PhaseTimes(
+            time.perf_counter() - wall, time.process_time() - cpu, 1
+        )
+        if self.trace_memory:
+            self.allocated_bytes, self.peak_allocated_bytes = (
+                tracemalloc.get_traced_memory()
+            )
+            tracemalloc.stop()
+
+    def enter(self, name: str) -> None:
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self.stack:
+            self.charge(self.stack[-1], wall, cpu)
+        self.stack.append((name, wall, cpu))
+        for hook in self.hooks:
+            hook.on_phase_start(name)
+
+    def exit(self) -> None:
+        wall, cpu = time.perf_counter(), time.process_time()
+        phase = self.stack.pop()
+        times = self.charge(phase, wall, cpu)
+        times.calls += 1
+        if self.stack:
+            # resume the enclosing phase
+            self.stack[-1] = (self.stack[-1][0], wall, cpu)
+        for hook in self.hooks:
+            hook.on_phase_end(phase[0], times.wall, times.cpu)
+
+    def charge(
+        self, phase: tuple[str, float, float], wall: float, cpu: float
+    ) -> PhaseTimes:
+        name, started_wall, started_cpu = phase
+        times = self.phases.get(name)
+        if times is None:
+            times = self.phases[name] = PhaseTimes()
+        times.wall += wall - started_wall
+        times.cpu += cpu - started_cpu
+        return times
+
+    def count_token(self, token: Token) -> None:
+        self.token_counts[token.type.name] += 1
+        for hook in self.hooks:
+            hook.on_token(token)
+
+    def count_statement(self, statement: Statement) -> None:
+        counts = self.node_counts
+        for node in iter_nodes(statement):
+            counts[type(node).__name__] += 1
+        for hook in self.hooks:
+            hook.on_statement(statement)
+
+    def statements(
+        self, statements: Iterable[Statement], producer: str, consumer: str
+    ) -> Iterator[Statement]:
+        # Time spent producing each statement is charged to `producer` and
+        # time spent by whoever consumes it to `consumer`.
+        iterator = iter(statements)
+        while True:
+            self.enter(producer)
+            try:
+                statement = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            self.count_statement(statement)
+            self.enter(consumer)
+            try:
+                yield statement
+            finally:
+                self.exit()
+
+    def to_json(self) -> dict[str, object]:
+        return {
+            "total": {"wall": self.total.wall, "cpu": self.total.cpu},
+            "phases": {
+                name: {"wall": times.wall, "cpu": times.cpu, "calls": times.calls}
+                for name, times in self.phases.items()
+            },
+            "tokens": dict(self.token_counts.most_common()),
+            "nodes": dict(self.node_counts.most_common()),
+            "max_parser_depth": self.max_parser_depth,
+            "allocated_bytes": self.allocated_bytes if self.trace_memory else None,
+            "peak_allocated_bytes": (
+                self.peak_allocated_bytes if self.trace_memory else None
+            ),
+        }
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_json(), file, indent=2)
+
+    def report(self) -> str:
+        lines = [f"{'phase':<12}{'wall (s)':>12}{'cpu (s)':>12}{'calls':>10}"]
+        accounted = PhaseTimes()
+        for name, times in self.phases.items():
+            lines.append(
+                f"{name:<12}{times.wall:>12.4f}{times.cpu:>12.4f}{times.calls:>10}"
+            )
+            accounted.wall += times.wall
+            accounted.cpu += times.cpu
+        lines.append(
+            f"{'other':<12}{self.total.wall - accounted.wall:>12.4f}"
+            f"{self.total.cpu - accounted.cpu:>12.4f}"
+        )
+        lines.append(f"{'total':<12}{self.total.wall:>12.4f}{self.total.cpu:>12.4f}")
+        lines.append(f"tokens: {sum(self.token_counts.values())}")
+        lines += [
+            f"  {name:<12}{count:>10}"
+            for name, count in self.token_counts.most_common()
+        ]
+        lines.append(f"nodes: {sum(self.node_counts.values())}")
+        lines += [
+            f"  {name:<20}{count:>10}" for name, count in self.node_counts.most_common()
+        ]
+        lines.append(f"max parser depth: {self.max_parser_depth}")
+        if self.trace_memory:
+            lines.append(
+                f"allocated: {self.allocated_bytes:,} bytes "
+                f"(peak {self.peak_allocated_bytes:,})"
+            )
+        return "\n".join(lines)
+
+
+class ProfiledTokenSource:
+    # `TokenSource` charging `next_token` to the "lex" phase
+    def __init__(self, source: TokenSource, profile: Profile) -> None:
+        self.source = source
+        self.profile = profile
+
+    def next_token(self) -> Token:
+        self.profile.enter("lex")
+        try:
+            token = self.source.next_token()
+        finally:
+            self.profile.exit()
+        self.profile.count_token(token)
+        return token
+
+
+class ProfiledParser(Parser):
+    # Reports the deepest expression nesting to the profile
+    def __init__(self, lexer: TokenSource, profile: Profile) -> None:
+        self.profile = profile
+        super().__init__(lexer)
+
+    def parse_statement(self) -> Statement | None:
+        statement = super().parse_statement()
+        self.profile.max_parser_depth = max(
+            self.profile.max_parser_depth, self.max_depth
+        )
+        return statement
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import codecs
+import io
+import mmap
+from types import TracebackType
+
+
+class MmapReader:
+    # Text reader over a memory-mapped file. Decodes UTF-8 incrementally and
+    # translates newlines the same way `open(path, "r")` does, so lexing it
+    # yields the same positions as lexing the file's text.
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.mapped: mmap.mmap | None = None
+        # an empty file cannot be mapped
+        if self.file.seek(0, io.SEEK_END) > 0:
+            self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(), translate=True
+        )
+
+    def read(self, size: int, /) -> str:
+        data = self.mapped.read(size) if self.mapped is not None else b""
+        return self.decoder.decode(data, final=not data)
+
+    def close(self) -> None:
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        self.file.close()
+
+    def __enter__(self) -> MmapReader:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,168 @@
+import json
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, TextIO
+
+from src.ast import (
+    Boolean,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    Node,
+    PrefixExpression,
+    ReturnStatement,
+    Statement,
+)
+
+# Writers for ASTs that never recurse and never hold a whole program's text.
+# Nodes are expanded into string fragments with an explicit stack, so
+# nesting depth is only limited by memory, and the fragments of consecutive
+# statements are joined and written in chunks of about `CHUNK_FRAGMENTS`, so
+# memory stays proportional to the largest statement.
+
+CHUNK_FRAGMENTS = 4096
+
+
+def append_text(node: Node | None, out: list[str]) -> None:
+    # appends the pieces of `str(node)` to `out`; the checks are on exact
+    # types, most frequent first
+    append = out.append
+    # `Any`: the exact type checks below do not narrow `item`
+    stack: list[Any] = [node]
+    pop = stack.pop
+    while stack:
+        item = pop()
+        kind = type(item)
+        if kind is str:
+            append(item)
+        elif kind is Identifier or kind is IntegerLiteral or kind is Boolean:
+            append(f"{kind.__name__}(value={item.value!r})")
+        elif kind is InfixExpression:
+            append("InfixExpression(left=")
+            stack += (
+                ")",
+                item.right,
+                f", operator={item.operator}, right=",
+                item.left,
+            )
+        elif kind is PrefixExpression:
+            append(f"PrefixExpression(operator={item.operator}, right=")
+            stack += (")", item.right)
+        elif kind is LetStatement:
+            append("LetStatement(name=")
+            stack += (")", item.value, ", value=", item.name)
+        elif kind is ExpressionStatement:
+            append("ExpressionStatement(expression=")
+            stack += (")", item.expression)
+        elif kind is ReturnStatement:
+            append("ReturnStatement(return_value=")
+            stack += (")", item.return_value)
+        else:
+            append(str(item))
+
+
+def append_json(node: Node | None, out: list[str]) -> None:
+    # Appends `node` as one JSON object: {"type": <class name>, <field>: ...}.
+    # Names and operators are quoted as they are: the lexer only lets
+    # letters, `_` and operator characters into them.
+    append = out.append
+    # `Any`: the exact type checks below do not narrow `item`
+    stack: list[Any] = [node]
+    pop = stack.pop
+    while stack:
+        item = pop()
+        kind = type(item)
+        if kind is str:
+            append(item)
+        elif kind is Identifier:
+            append(f'{{"type": "Identifier", "value": "{item.value}"}}')
+        elif kind is IntegerLiteral:
+            append(f'{{"type": "IntegerLiteral", "value": {item.value}}}')
+        elif kind is InfixExpression:
+            append('{"type": "InfixExpression", "left": ')
+            stack += (
+                "}",
+                item.right,
+                f', "operator": "{item.operator}", "right": ',
+                item.left,
+            )
+        elif kind is PrefixExpression:
+            append(
+                f'{{"type": "PrefixExpression", "operator": "{item.operator}", '
+                '"right": '
+            )
+            stack += ("}", item.right)
+        elif kind is LetStatement:
+            append('{"type": "LetStatement", "name": ')
+            stack += ("}", item.value, ', "value": ', item.name)
+        elif kind is ExpressionStatement:
+            append('{"type": "ExpressionStatement", "expression": ')
+            stack += ("}", item.expression)
+        elif kind is ReturnStatement:
+            append('{"type": "ReturnStatement", "return_value": ')
+            stack += ("}", item.return_value)
+        elif kind is Boolean:
+            append(
+                f'{{"type": "Boolean", "value": {"true" if item.value else "false"}}}'
+            )
+        elif item is None:
+            append("null")
+        else:
+            append(json.dumps({"type": kind.__name__, "text": str(item)}))
+
+
+def node_text(node: Node) -> str:
+    # `str(node)`, without recursion
+    out: list[str] = []
+    append_text(node, out)
+    return "".join(out)
+
+
+def node_json(node: Node) -> str:
+    out: list[str] = []
+    append_json(node, out)
+    return "".join(out)
+
+
+def write_statements(
+    statements: Iterable[Statement],
+    stream: TextIO,
+    append_node: Callable[[Node, list[str]], None],
+    prefix: str,
+    suffix: str,
+) -> None:
+    # Writes `prefix` + each statement written by `append_node` + `suffix`,
+    # joining the fragments of about `CHUNK_FRAGMENTS` at a time. What was
+    # serialized is still written if `statements` raises.
+    out: list[str] = []
+    try:
+        for statement in statements:
+            out.append(prefix)
+            append_node(statement, out)
+            out.append(suffix)
+            if len(out) >= CHUNK_FRAGMENTS:
+                stream.write("".join(out))
+                out.clear()
+    finally:
+        stream.write("".join(out))
+
+
+def write_text(statements: Iterable[Statement], stream: TextIO) -> None:
+    # the same text as `print(Program(statements))`
+    empty = True
+
+    def counted(statements: Iterable[Statement]) -> Iterator[Statement]:
+        nonlocal empty
+        for statement in statements:
+            empty = False
+            yield statement
+
+    stream.write("Program(\n")
+    write_statements(counted(statements), stream, append_text, "  ", "\n")
+    stream.write("  \n)\n" if empty else ")\n")
+
+
+def write_json_lines(statements: Iterable[Statement], stream: TextIO) -> None:
+    # one JSON object per statement, one statement per line
+    write_statements(statements, stream, append_json, "", "\n")
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import count
+
+from src.batch import ENGINES
+from src.evaluator import EvaluationError, Evaluator, inspect
+from src.lexer import Lexer
+from src.parser import Parser, ParserError
+from src.source_map import SourceMap
+from src.symbols import SYMBOLS, SymbolTable
+from src.transpiler import Transpiler
+from src.vm import VM
+
+# Evaluation server for many concurrent sessions. Each connection is a
+# session with its own globals, like one run of the REPL. The protocol is
+# line based: every line a client sends is a snippet, answered by one line
+# with its value as the REPL prints it, or `error: <message>`. The line
+# `:stats` is answered with `ServerStats` as JSON instead.
+#
+# Parsing and evaluation run on worker processes, so the event loop only
+# moves lines. A session is pinned to one worker for its lifetime, and its
+# engine stays in that worker's `SESSIONS` between snippets: a snippet only
+# ships its source there and its reply back.
+
+STATS_COMMAND = ":stats"
+# longest snippet a client may send, in bytes
+MAX_LINE = 1 << 20
+# latencies kept for the percentiles in `ServerStats`
+LATENCY_SAMPLES = 10_000
+
+# engines of the sessions this process evaluates, by session id
+SESSIONS: dict[int, Evaluator | VM | Transpiler] = {}
+# the names each of those sessions has interned, dropped when it ends so a
+# long-lived worker does not keep every name any client ever sent
+SESSION_SYMBOLS: dict[int, SymbolTable] = {}
+# session ids, unique within the serving process
+SESSION_IDS = count()
+# reset onto every snippet this process parses
+LEXER = Lexer("")
+PARSER = Parser(LEXER)
+
+
+def evaluate(session: int, source: str, engine: str) -> str:
+    # Runs one snippet in the session's engine, created by its first
+    # snippet. Like the REPL, nothing runs unless the whole snippet parses.
+    machine = SESSIONS.get(session)
+    if machine is None:
+        machine = SESSIONS[session] = ENGINES[engine]()
+        SESSION_SYMBOLS[session] = SymbolTable()
+    try:
+        with SYMBOLS.using(SESSION_SYMBOLS[session]):
+            LEXER.reset(source)
+            PARSER.reset(LEXER)
+            program = PARSER.parse_program()
+            return inspect(machine.execute(program.statements))
+    except (ParserError, EvaluationError) as error:
+        return f"error: {SourceMap(source).describe(error.reason, error.position)}"
+    except RecursionError:
+        # the session survives snippets nested too deeply for an engine
+        return "error: expression nested too deeply"
+
+
+def end_session(session: int) -> None:
+    SESSIONS.pop(session, None)
+    SESSION_SYMBOLS.pop(session, None)
+
+
+def tcp_address(address: str) -> tuple[str, int] | None:
+    # (host, port) for HOST:PORT; anything else is the path of a Unix socket
+    host, colon, port = address.rpartition(":")
+    if colon and port.isdigit():
+        return host, int(port)
+    return None
+
+
+async def connect(
+    address: str, limit: int = MAX_LINE
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    tcp = tcp_address(address)
+    if tcp is not None:
+        return await asyncio.open_connection(*tcp, limit=limit)
+    return await asyncio.open_unix_connection(address, limit=limit)
+
+
+@dataclass
+class ServerStats:
+    started: float = field(default_factory=time.perf_counter)
+    requests: int = 0
+    errors: int = 0
+    # open now, and ever opened
+    sessions: int = 0
+    total_sessions: int = 0
+    # seconds from reading a line to writing its reply, most recent last
+    latencies: deque[float] = field(
+        default_factory=lambda: deque(maxlen=LATENCY_SAMPLES)
+    )
+
+    def record(self, latency: float, error: bool) -> None:
+        self.requests += 1
+        self.errors += error
+        self.latencies.append(latency)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def to_json(self) -> dict[str, object]:
+        uptime = time.perf_counter() - self.started
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "sessions": self.sessions,
+            "total_sessions": self.total_sessions,
+            "uptime": round(uptime, 3),
+            "requests_per_second": round(self.requests / uptime, 1) if uptime else 0,
+            "latency_ms": {
+                name: round(self.percentile(fraction) * 1000, 3)
+                for name, fraction in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]
+            }
+            | {"max": round(max(self.latencies, default=0.0) * 1000, 3)},
+        }
+
+
+class Server:
+    # Serves sessions on an `asyncio` server. Each session is pinned to the
+    # worker of `workers` serving the fewest sessions; without workers,
+    # snippets are evaluated on the event loop itself.
+    def __init__(self, engine: str = "tree", workers: list[Executor] | None = None):
+        self.engine = engine
+        self.workers = workers or []
+        # open sessions per worker
+        self.load = [0] * len(self.workers)
+        self.stats = ServerStats()
+
+    async def start(self, address: str) -> asyncio.Server:
+        tcp = tcp_address(address)
+        if tcp is not None:
+            host, port = tcp
+            return await asyncio.start_server(
+                self.handle, host or None, port, limit=MAX_LINE
+            )
+        return await asyncio.start_unix_server(self.handle, address, limit=MAX_LINE)
+
+    async def evaluate(self, worker: int, session: int, source: str) -> str:
+        if not self.workers:
+            return evaluate(session, source, self.engine)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.workers[worker], evaluate, session, source, self.engine
+        )
+
+    async def end_session(self, worker: int, session: int) -> None:
+        if not self.workers:
+            end_session(session)
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.workers[worker], end_session, session
+            )
+        except RuntimeError:
+            # the workers were shut down, and the session with them
+            pass
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        session = next(SESSION_IDS)
+        worker = self.load.index(min(self.load)) if self.workers else 0
+        if self.workers:
+            self.load[worker] += 1
+        self.stats.sessions += 1
+        self.stats.total_sessions += 1
+        try:
+            # one snippet at a time, so a session's snippets run in order
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(b"error: snippet too long\n")
+                    break
+                if not line:
+                    break
+                started = time.perf_counter()
+                source = line.decode(errors="replace").rstrip("\r\n")
+                if source.strip() == STATS_COMMAND:
+                    writer.write(json.dumps(self.stats.to_json()).encode() + b"\n")
+                    await writer.drain()
+                    continue
+                output = await self.evaluate(worker, session, source)
+                writer.write(output.encode() + b"\n")
+                await writer.drain()
+                self.stats.record(
+                    time.perf_counter() - started, output.startswith("error: ")
+                )
+        except ConnectionError:
+            pass
+        finally:
+            self.stats.sessions -= 1
+            writer.close()
+            if self.workers:
+                self.load[worker] -= 1
+            await self.end_session(worker, session)
+
+
+@contextmanager
+def worker_pool(jobs: int | None = None) -> Iterator[list[Executor]]:
+    # `jobs` single-process executors (default: one per CPU), one per worker
+    # so a session can be pinned to one. They are spawned rather than
+    # forked: executors start their process on demand, and a forked worker
+    # would inherit the sockets of the sessions open at the time, keeping
+    # them open after the server closes its end.
+    context = multiprocessing.get_context("spawn")
+    workers: list[Executor] = [
+        ProcessPoolExecutor(max_workers=1, mp_context=context)
+        for _ in range(jobs or os.cpu_count() or 1)
+    ]
+    try:
+        yield workers
+    finally:
+        for worker in workers:
+            worker.shutdown(cancel_futures=True)
+
+
+async def serve(address: str, engine: str = "tree", jobs: int | None = None):
+    # serves until cancelled
+    with worker_pool(jobs) as workers:
+        server = await Server(engine, workers).start(address)
+        async with server:
+            await server.serve_forever()
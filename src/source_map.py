@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class SourceMap:
+    # Offset of every line start in a source, built once, so an offset maps
+    # to its line and column with a binary search instead of a scan back to
+    # the previous newline. Lines are the source's actual lines, newlines
+    # inside string literals included, which `Token.line` does not count.
+    def __init__(self, source: str) -> None:
+        self.source = source
+        # `line_starts[i]` is the offset of line `i`; the last line has no
+        # newline, so its entry past the end is dropped
+        self.line_starts: array[int] = array(
+            "Q", accumulate((len(line) + 1 for line in source.split("\n")), initial=0)
+        )
+        self.line_starts.pop()
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+    def line(self, offset: int) -> int:
+        # the line of `offset`, from 0 like `Token.line`; offsets past the
+        # end are on the last line
+        return bisect_right(self.line_starts, offset) - 1
+
+    def location(self, offset: int) -> tuple[int, int]:
+        # line and column of `offset`, both from 1 as in `Diagnostic`
+        line = self.line(offset)
+        return line + 1, offset - self.line_starts[line] + 1
+
+    def line_end(self, line: int) -> int:
+        # offset of the newline ending line `line` (from 0), or of the end
+        if line + 1 < len(self.line_starts):
+            return self.line_starts[line + 1] - 1
+        return len(self.source)
+
+    def snippet(self, start: int, end: int) -> str:
+        # the whole lines the range `start:end` touches, for showing it in
+        # context; an empty range touches the line it is on
+        first = self.line(start)
+        last = self.line(max(start, end - 1))
+        return self.source[self.line_starts[first] : self.line_end(last)]
+
+    def describe(self, reason: str, offset: int | None) -> str:
+        # an error's reason prefixed with the `line:column` of `offset`, as
+        # `Diagnostic` prints it, if the error has a location
+        if offset is None:
+            return reason
+        line, column = self.location(offset)
+        return f"{line}:{column}: {reason}"
+
+
+def at_offset(reason: str, line: int, offset: int) -> str:
+    # an error's reason prefixed with its location, for when the source is not
+    # at hand to turn the offset into a column; `line` counts from 0 like
+    # `Token.line` and is printed from 1
+    return f"line {line + 1}, offset {offset}: {reason}"
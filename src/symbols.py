@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class SymbolTable:
+    # Interned identifier names. Every distinct name is stored once and
+    # numbered in order of first appearance, so later stages can key on
+    # small ints, and every token and `Identifier` spelling a name shares
+    # one `str`.
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self.ids: dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return f"SymbolTable(symbols={len(self.names)})"
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def intern(self, name: str) -> int:
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol
+
+    def name(self, symbol: int) -> str:
+        return self.names[symbol]
+
+    @contextmanager
+    def using(self, table: SymbolTable) -> Iterator[None]:
+        # Names are interned into `table` instead meanwhile, so those of a
+        # scope such as a server session are dropped with it rather than
+        # kept for the life of the process. Nodes built meanwhile carry ids
+        # from `table` and must only be resolved while it is in use.
+        saved = self.names, self.ids
+        self.names, self.ids = table.names, table.ids
+        try:
+            yield
+        finally:
+            self.names, self.ids = saved
+
+
+# The table shared by every lexer and AST in the process, unless swapped out
+# with `using`. Symbol ids are only meaningful within one process: unpickled
+# `Identifier`s re-intern their names.
+SYMBOLS = SymbolTable()
@@ -1,6 +1,9 @@
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass
 from enum import Enum
+from collections.abc import Iterator
+from typing import Protocol
 
 
 class TokenType(Enum):
@@ -46,28 +49,154 @@ class TokenType(Enum):
 
     @staticmethod
     def lookup_keyword(ident: str) -> TokenType:
-        match ident:
-            case "fn":
-                return TokenType.FUNCTION
-            case "let":
-                return TokenType.LET
-            case "true":
-                return TokenType.TRUE
-            case "false":
-                return TokenType.FALSE
-            case "if":
-                return TokenType.IF
-            case "else":
-                return TokenType.ELSE
-            case "return":
-                return TokenType.RETURN
-            case _:
-                return TokenType.IDENT
-
-
-@dataclass
+        return KEYWORDS.get(ident, TokenType.IDENT)
+
+
+KEYWORDS: dict[str, TokenType] = {
+    "fn": TokenType.FUNCTION,
+    "let": TokenType.LET,
+    "true": TokenType.TRUE,
+    "false": TokenType.FALSE,
+    "if": TokenType.IF,
+    "else": TokenType.ELSE,
+    "return": TokenType.RETURN,
+}
+
+
+@dataclass(slots=True)
 class Token:
     type: TokenType
     literal: str
     position: int = 0
     line: int = 0
+
+
+class TokenSource(Protocol):
+    def next_token(self) -> Token: ...
+
+
+# small integer codes used to store token types in a `TokenStream`
+TOKEN_TYPES: tuple[TokenType, ...] = tuple(TokenType)
+TYPE_CODES: dict[TokenType, int] = {
+    token_type: code for code, token_type in enumerate(TOKEN_TYPES)
+}
+STRING_CODE = TYPE_CODES[TokenType.STRING]
+
+
+class TokenStream:
+    # Struct-of-arrays token storage. Token `i` has type `types[i]`, starts at
+    # `starts[i]` (its `Token.position`), its literal ends at `ends[i]` and it
+    # is on `lines[i]`. Literals are only sliced out of `source` on demand.
+    def __init__(self, source: str) -> None:
+        self.source: str = source
+        self.types: array[int] = array("B")
+        self.starts: array[int] = array("I")
+        self.ends: array[int] = array("I")
+        self.lines: array[int] = array("I")
+
+    def __repr__(self) -> str:
+        return f"TokenStream(tokens={len(self)}, nbytes={self.nbytes})"
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> TokenView:
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError("token index out of range")
+        return TokenView(self, index)
+
+    def __iter__(self) -> Iterator[TokenView]:
+        for index in range(len(self.types)):
+            yield TokenView(self, index)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            buffer.itemsize * len(buffer)
+            for buffer in (self.types, self.starts, self.ends, self.lines)
+        )
+
+    def append(self, token_type: TokenType, start: int, end: int, line: int) -> None:
+        self.types.append(TYPE_CODES[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def literal(self, index: int) -> str:
+        start = self.starts[index]
+        if self.types[index] == STRING_CODE:
+            # skip the opening "
+            start += 1
+        return self.source[start : self.ends[index]]
+
+    def token(self, index: int) -> Token:
+        return Token(
+            self.type(index), self.literal(index), self.starts[index], self.lines[index]
+        )
+
+    def to_tokens(self) -> list[Token]:
+        return [self.token(index) for index in range(len(self.types))]
+
+    def reader(self) -> TokenReader:
+        return TokenReader(self)
+
+
+class TokenView(Token):
+    # Flyweight `Token` reading its fields out of a `TokenStream`, so the
+    # parser can consume a stream without materializing every token.
+    __slots__ = ("index", "stream")
+
+    def __init__(self, stream: TokenStream, index: int) -> None:
+        self.stream = stream
+        self.index = index
+
+    @property
+    def type(self) -> TokenType:
+        return TOKEN_TYPES[self.stream.types[self.index]]
+
+    @property
+    def literal(self) -> str:
+        return self.stream.literal(self.index)
+
+    @property
+    def position(self) -> int:
+        return self.stream.starts[self.index]
+
+    @property
+    def line(self) -> int:
+        return self.stream.lines[self.index]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (
+            self.type == other.type
+            and self.position == other.position
+            and self.line == other.line
+            and self.literal == other.literal
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Token(type={self.type!r}, literal={self.literal!r}, "
+            f"position={self.position!r}, line={self.line!r})"
+        )
+
+
+class TokenReader:
+    # `TokenSource` over a `TokenStream`; keeps returning the final EOF token
+    # once the stream is exhausted.
+    def __init__(self, stream: TokenStream) -> None:
+        self.stream = stream
+        self.index = 0
+
+    def next_token(self) -> Token:
+        index = self.index
+        if index < len(self.stream) - 1:
+            self.index += 1
+        return TokenView(self.stream, index)
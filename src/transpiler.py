@@ -0,0 +1,500 @@
+from __future__ import annotations
+
+import ast
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from itertools import islice
+from types import CodeType
+from typing import Any
+
+from src import collector
+from src.ast import (
+    Boolean,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    PrefixExpression,
+    ReturnStatement,
+    Statement,
+)
+from src.evaluator import EvaluationError, Resolver, Value, divide, error_at, type_name
+from src.parser import ParserError
+
+# Execution engine translating Monkey statements into Python functions, so
+# the arithmetic runs as CPython bytecode instead of in an interpreter loop.
+#
+# Statements are lowered a batch at a time to a flat post-order list of
+# operations (the same shape as `compiler.Bytecode`). With no functions or
+# conditionals in the language, the type of every operand is known once the
+# batch starts: literals have theirs, and globals have the type of the value
+# they hold or of the last `let` in the batch. Each operation is therefore
+# emitted as the one Python operation Monkey's semantics reduce to for its
+# operand types, or as a call raising Monkey's error where those types make
+# it fail. The operations are also the key of `CODE_CACHE`, so a batch with
+# the same shape is only compiled once per process.
+#
+# Failing operations get the index of their node in the batch's position
+# table as line number, so the traceback of a Python exception says which
+# Monkey node raised it, the way `Bytecode.positions` does for the VM.
+
+# statements compiled and run together by `Transpiler.execute`
+BATCH_SIZE = 1024
+CODE_CACHE_SIZE = 256
+# deepest Python expression emitted before subexpressions are spilled into
+# temporaries; CPython's compiler recurses on nesting
+MAX_NESTING = 100
+FILENAME = "<monkey>"
+
+# operations; the payloads are in `lower_statement`
+INTEGER = 0
+BOOLEAN = 1
+GET = 2
+PREFIX = 3
+INFIX = 4
+LET = 5
+EXPRESSION = 6
+RETURN = 7
+
+# syntax tree nodes without fields are shared, like the ones `ast.parse`
+# returns
+ARITHMETIC: dict[str, ast.operator] = {
+    "+": ast.Add(),
+    "-": ast.Sub(),
+    "*": ast.Mult(),
+}
+COMPARISONS: dict[str, ast.cmpop] = {
+    "<": ast.Lt(),
+    ">": ast.Gt(),
+    "==": ast.Eq(),
+    "!=": ast.NotEq(),
+}
+
+Operation = tuple[Any, ...]
+
+# operations -> generated function, least recently used first
+CODE_CACHE: dict[tuple[Operation, ...], Callable[..., tuple[Value, bool]]] = {}
+
+
+def fail(message: str, *operands: Value) -> Value:
+    # called with the operands already evaluated, like Monkey does before it
+    # raises
+    raise EvaluationError(message)
+
+
+def checked_divide(left: int, right: int) -> int:
+    if right == 0:
+        raise EvaluationError("division by zero")
+    return divide(left, right)
+
+
+def prefix_type(operator: str, right: str) -> str | None:
+    # the type `operator` produces from `right`, or None if it raises
+    if operator == "!":
+        return "BOOLEAN"
+    if operator == "-" and right == "INTEGER":
+        return "INTEGER"
+    return None
+
+
+def infix_type(operator: str, left: str, right: str) -> str | None:
+    if left == "INTEGER" and right == "INTEGER":
+        if operator in ARITHMETIC or operator == "/":
+            return "INTEGER"
+        if operator in COMPARISONS:
+            return "BOOLEAN"
+        return None
+    if operator == "==" or operator == "!=":
+        return "BOOLEAN"
+    return None
+
+
+def infix_error(operator: str, left: str, right: str) -> str:
+    if left != right:
+        return f"type mismatch: {left} {operator} {right}"
+    return f"unknown operator: {left} {operator} {right}"
+
+
+@dataclass
+class PythonBatch:
+    # a compiled batch: `function(globals, fail, divide)` returns the value
+    # of the last statement and whether it was a `return`
+    function: Callable[..., tuple[Value, bool]]
+    # (line, position) of the Monkey node behind each Python line number
+    positions: list[tuple[int, int]]
+    # (first line after the `let`, globals declared before it) for every
+    # `let` that declared a new global, like `Bytecode.declarations`
+    declarations: list[tuple[int, int]]
+    # like `Bytecode.error`
+    error: ParserError | EvaluationError | None
+    # statements compiled
+    statements: int
+
+
+class Transpiler:
+    # Same contract as `Evaluator` and `VM`. Globals are bound to slots by
+    # the shared `Resolver` and kept in `globals` across `execute` calls.
+    def __init__(self) -> None:
+        self.resolver = Resolver()
+        self.globals: list[Value] = []
+        self.returned = False
+
+    def execute(self, statements: Iterable[Statement]) -> Value:
+        statements = iter(statements)
+        result: Value = None
+        self.returned = False
+        while True:
+            batch = self.compile(islice(statements, BATCH_SIZE))
+            if not batch.statements and batch.error is None:
+                break
+            result = self.run(batch)
+            if self.returned:
+                break
+        return result
+
+    def compile(self, statements: Iterable[Statement]) -> PythonBatch:
+        # types of the globals as the batch starts
+        types = [type_name(value) for value in self.globals]
+        operations: list[Operation] = []
+        positions: list[tuple[int, int]] = [(0, 0)]
+        declarations: list[tuple[int, int]] = []
+        error: ParserError | EvaluationError | None = None
+        scope = self.resolver.scopes[0]
+        compiled = 0
+        statements = iter(statements)
+        # like `Compiler.compile`, the batch ends after a `return` or at the
+        # first statement failing to parse or resolve
+        while True:
+            declared = len(scope)
+            count = len(operations)
+            lines = len(positions)
+            try:
+                statement = next(statements, None)
+                if statement is None:
+                    break
+                returned = self.lower_statement(statement, types, operations, positions)
+            except (ParserError, EvaluationError) as failed:
+                del operations[count:]
+                del positions[lines:]
+                error = failed
+                break
+            compiled += 1
+            if len(scope) > declared:
+                declarations.append((len(positions), declared))
+            if returned:
+                break
+        key = tuple(operations)
+        function = CODE_CACHE.pop(key, None)
+        if function is None:
+            # The Python syntax tree has no cycles and is dropped once
+            # compiled, but allocating it triggers collections rescanning
+            # every live object, the parsed program included.
+            with collector.paused():
+                function = generate(operations)
+        elif len(CODE_CACHE) >= CODE_CACHE_SIZE:
+            del CODE_CACHE[next(iter(CODE_CACHE))]
+        # most recently used last
+        CODE_CACHE[key] = function
+        return PythonBatch(function, positions, declarations, error, compiled)
+
+    def lower_statement(
+        self,
+        statement: Statement,
+        types: list[str],
+        operations: list[Operation],
+        positions: list[tuple[int, int]],
+    ) -> bool:
+        # Appends the operations of `statement`, post-order, resolving its
+        # names and tracking the type of each operand on `operands`. Returns
+        # whether it was a `return`.
+        operands: list[str] = []
+        # `Any`: nodes, and (node,) for a node whose children are done
+        work: list[Any] = [statement]
+        while work:
+            item = work.pop()
+            kind = type(item)
+            if kind is IntegerLiteral:
+                operations.append((INTEGER, item.value))
+                operands.append("INTEGER")
+            elif kind is Identifier:
+                self.resolver.resolve_identifier(item)
+                slot_type = types[item.slot] if item.slot < len(types) else "NULL"
+                operations.append((GET, item.slot, slot_type))
+                operands.append(slot_type)
+            elif kind is Boolean:
+                operations.append((BOOLEAN, item.value))
+                operands.append("BOOLEAN")
+            elif kind is InfixExpression:
+                work += ((item,), item.right, item.left)
+            elif kind is PrefixExpression:
+                work += ((item,), item.right)
+            elif kind is LetStatement:
+                work += ((item,), item.value)
+            elif kind is ExpressionStatement:
+                work += ((item,), item.expression)
+            elif kind is ReturnStatement:
+                work += ((item,), item.return_value)
+            elif kind is tuple:
+                (node,) = item
+                line = len(positions)
+                if type(node) is InfixExpression:
+                    right = operands.pop()
+                    left = operands.pop()
+                    result = infix_type(node.operator, left, right)
+                    operations.append((INFIX, node.operator, left, right, line))
+                    positions.append((node.token.line, node.token.position))
+                    operands.append(result or "NULL")
+                elif type(node) is PrefixExpression:
+                    right = operands.pop()
+                    result = prefix_type(node.operator, right)
+                    operations.append((PREFIX, node.operator, right, line))
+                    positions.append((node.token.line, node.token.position))
+                    operands.append(result or "NULL")
+                elif type(node) is LetStatement:
+                    self.resolver.declare(node.name)
+                    slot = node.name.slot
+                    if slot >= len(types):
+                        types += ["NULL"] * (slot + 1 - len(types))
+                    types[slot] = operands.pop()
+                    operations.append((LET, slot))
+                elif type(node) is ExpressionStatement:
+                    operands.pop()
+                    operations.append((EXPRESSION,))
+                else:
+                    operands.pop()
+                    operations.append((RETURN,))
+                    return True
+            else:
+                raise error_at(item, f"cannot transpile {item}")
+        return False
+
+    def run(self, batch: PythonBatch) -> Value:
+        missing = len(self.resolver.scopes[0]) - len(self.globals)
+        if missing > 0:
+            self.globals.extend([None] * missing)
+        try:
+            value, self.returned = batch.function(self.globals, fail, checked_divide)
+        except EvaluationError as error:
+            failed = failed_line(error, batch.function.__code__)
+            # like the evaluator, a `let` that did not finish binds nothing
+            for end, declared in batch.declarations:
+                if end > failed:
+                    self.resolver.forget(declared)
+                    del self.globals[declared:]
+                    break
+            line, position = batch.positions[failed]
+            raise EvaluationError(error.reason, line, position) from None
+        if batch.error is not None:
+            raise batch.error
+        return value
+
+
+def failed_line(error: BaseException, code: CodeType) -> int:
+    # the line of the generated code that was running when `error` was raised
+    traceback = error.__traceback__
+    while traceback is not None:
+        if traceback.tb_frame.f_code is code:
+            return traceback.tb_lineno or 0
+        traceback = traceback.tb_next
+    return 0
+
+
+LOAD = ast.Load()
+STORE = ast.Store()
+USUB = ast.USub()
+NOT = ast.Not()
+IS = ast.Is()
+
+
+def name(identifier: str, context: ast.expr_context = LOAD) -> ast.Name:
+    return ast.Name(identifier, context, lineno=1, col_offset=0)
+
+
+def constant(value: Value) -> ast.Constant:
+    return ast.Constant(value, lineno=1, col_offset=0)
+
+
+def call(function: ast.expr, arguments: list[ast.expr], line: int) -> ast.Call:
+    return ast.Call(function, arguments, [], lineno=line, col_offset=0)
+
+
+def generate(
+    operations: list[Operation],
+) -> Callable[..., tuple[Value, bool]]:
+    # Builds and compiles `def batch(g, fail, divide)`: global slot `s` is
+    # read into the local `g<s>` once and written through to `g[s]` by each
+    # `let`. Expressions are rebuilt from the operations with a stack of
+    # (expression, nesting, number of statements emitted when it was done).
+    body: list[ast.stmt] = []
+    stack: list[tuple[ast.expr, int, int]] = []
+    slots: set[int] = set()
+    temporaries = 0
+
+    def spill(expression: ast.expr, index: int) -> ast.expr:
+        # evaluates `expression` into a new temporary at `body[index]`
+        nonlocal temporaries
+        temporary = f"t{temporaries}"
+        temporaries += 1
+        body.insert(
+            index,
+            ast.Assign([name(temporary, STORE)], expression, lineno=1, col_offset=0),
+        )
+        return load(temporary)
+
+    # Leaves are shared too: compiling only reads the tree, and building it
+    # is what transpiling spends most of its time on.
+    names: dict[str, ast.Name] = {}
+    # keyed by type too, since `1 == True`
+    constants: dict[tuple[type, Value], ast.Constant] = {}
+
+    def load(identifier: str) -> ast.Name:
+        node = names.get(identifier)
+        if node is None:
+            node = names[identifier] = name(identifier)
+        return node
+
+    def literal(value: Value) -> ast.Constant:
+        key = (type(value), value)
+        node = constants.get(key)
+        if node is None:
+            node = constants[key] = constant(value)
+        return node
+
+    def push(expression: ast.expr, nesting: int) -> None:
+        if nesting > MAX_NESTING:
+            expression = spill(expression, len(body))
+            nesting = 1
+        stack.append((expression, nesting, len(body)))
+
+    last = len(operations) - 1
+    for index, operation in enumerate(operations):
+        code = operation[0]
+        if code == INTEGER or code == BOOLEAN:
+            push(literal(operation[1]), 1)
+        elif code == GET:
+            slots.add(operation[1])
+            push(load(f"g{operation[1]}"), 1)
+        elif code == INFIX:
+            _, operator, left_type, right_type, line = operation
+            right, right_nesting, _ = stack.pop()
+            left, left_nesting, done = stack.pop()
+            if done < len(body) and not isinstance(left, (ast.Name, ast.Constant)):
+                # the right operand was partly spilled ahead of the left one,
+                # which must still be evaluated first
+                left = spill(left, done)
+            nesting = max(left_nesting, right_nesting) + 1
+            result = infix_type(operator, left_type, right_type)
+            expression: ast.expr
+            if result is None:
+                message = infix_error(operator, left_type, right_type)
+                expression = call(load("fail"), [literal(message), left, right], line)
+            elif left_type == "INTEGER" and right_type == "INTEGER":
+                if operator == "/":
+                    expression = call(load("divide"), [left, right], line)
+                elif operator in ARITHMETIC:
+                    expression = ast.BinOp(
+                        left, ARITHMETIC[operator], right, lineno=line, col_offset=0
+                    )
+                else:
+                    expression = ast.Compare(
+                        left,
+                        [COMPARISONS[operator]],
+                        [right],
+                        lineno=line,
+                        col_offset=0,
+                    )
+            elif left_type == right_type:
+                # booleans, or nulls, compare like Monkey's
+                expression = ast.Compare(
+                    left, [COMPARISONS[operator]], [right], lineno=line, col_offset=0
+                )
+            else:
+                # both are evaluated and can never be equal
+                expression = evaluated([left, right], operator == "!=")
+            push(expression, nesting)
+        elif code == PREFIX:
+            _, operator, right_type, line = operation
+            right, nesting, _ = stack.pop()
+            if prefix_type(operator, right_type) is None:
+                message = f"unknown operator: {operator}{right_type}"
+                expression = call(load("fail"), [literal(message), right], line)
+            elif operator == "-":
+                expression = ast.UnaryOp(USUB, right, lineno=line, col_offset=0)
+            elif right_type == "BOOLEAN":
+                expression = ast.UnaryOp(NOT, right, lineno=line, col_offset=0)
+            elif right_type == "NULL":
+                expression = ast.Compare(
+                    right, [IS], [constant(None)], lineno=line, col_offset=0
+                )
+            else:
+                # `!` is only true of false and null
+                expression = evaluated([right], False)
+            push(expression, nesting + 1)
+        elif code == LET:
+            slot = operation[1]
+            slots.add(slot)
+            targets: list[ast.expr] = [
+                name(f"g{slot}", STORE),
+                ast.Subscript(name("g"), constant(slot), STORE, lineno=1, col_offset=0),
+            ]
+            value, _, _ = stack.pop()
+            body.append(ast.Assign(targets, value, lineno=1, col_offset=0))
+            if index == last:
+                body.append(result_statement(constant(None), False))
+        elif code == EXPRESSION:
+            value, _, _ = stack.pop()
+            if index == last:
+                body.append(result_statement(value, False))
+            else:
+                body.append(ast.Expr(value, lineno=1, col_offset=0))
+        else:
+            value, _, _ = stack.pop()
+            body.append(result_statement(value, True))
+    if not operations:
+        body.append(result_statement(constant(None), False))
+    loads: list[ast.stmt] = [
+        ast.Assign(
+            [name(f"g{slot}", STORE)],
+            ast.Subscript(name("g"), constant(slot), LOAD, lineno=1, col_offset=0),
+            lineno=1,
+            col_offset=0,
+        )
+        for slot in sorted(slots)
+    ]
+    arguments = ast.arguments(
+        posonlyargs=[],
+        args=[
+            ast.arg(argument, lineno=1, col_offset=0)
+            for argument in ("g", "fail", "divide")
+        ],
+        kwonlyargs=[],
+        kw_defaults=[],
+        defaults=[],
+    )
+    function = ast.FunctionDef(
+        "batch", arguments, loads + body, [], lineno=1, col_offset=0
+    )
+    module = ast.Module([function], [])
+    namespace: dict[str, Any] = {}
+    exec(compile(module, FILENAME, "exec"), namespace)
+    return namespace["batch"]
+
+
+def evaluated(operands: list[ast.expr], value: Value) -> ast.expr:
+    # `value`, once `operands` have been evaluated for their errors
+    return ast.Subscript(
+        ast.Tuple([*operands, constant(value)], LOAD, lineno=1, col_offset=0),
+        constant(len(operands)),
+        LOAD,
+        lineno=1,
+        col_offset=0,
+    )
+
+
+def result_statement(value: ast.expr, returned: bool) -> ast.Return:
+    return ast.Return(
+        ast.Tuple([value, constant(returned)], LOAD, lineno=1, col_offset=0),
+        lineno=1,
+        col_offset=0,
+    )
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from enum import Enum
+from typing import Any, ClassVar
+
+from src.ast import (
+    Boolean,
+    ExpressionStatement,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    Node,
+    PrefixExpression,
+    Program,
+    ReturnStatement,
+)
+
+# Tree walks without recursion, for any depth the parser accepts.
+#
+# `iter_nodes` yields the nodes of a tree in pre-order. `NodeVisitor` calls
+# `visit_<Class>(node)` on the way down and `leave_<Class>(node)` on the way
+# up, for the node's class or its nearest base with such a method;
+# `NodeTransformer` also puts the node a handler returns in place of the
+# one it was given. Children come from `CHILD_FIELDS`, and the handlers for each node
+# type are looked up once per visitor class.
+
+# attributes holding the children of each node type, in source order; a
+# `Program`'s are a list
+CHILD_FIELDS: dict[type, tuple[str, ...]] = {
+    Program: ("statements",),
+    LetStatement: ("name", "value"),
+    ReturnStatement: ("return_value",),
+    ExpressionStatement: ("expression",),
+    PrefixExpression: ("right",),
+    InfixExpression: ("left", "right"),
+    Identifier: (),
+    IntegerLiteral: (),
+    Boolean: (),
+}
+
+
+class Action(Enum):
+    # returned by a handler instead of nothing (or, in a transformer, a node)
+    SKIP = 1  # don't walk this node's children; its leave handler still runs
+    STOP = 2  # end the walk
+
+
+SKIP = Action.SKIP
+STOP = Action.STOP
+
+Handler = Callable[[Any, Any], Any]
+
+
+def child_fields(node_type: type) -> tuple[str, ...]:
+    # `CHILD_FIELDS` of `node_type`, or of its nearest base listed there
+    fields = CHILD_FIELDS.get(node_type)
+    if fields is None:
+        for base in node_type.__mro__:
+            if base in CHILD_FIELDS:
+                fields = CHILD_FIELDS[node_type] = CHILD_FIELDS[base]
+                break
+        else:
+            raise TypeError(f"not an AST node: {node_type.__name__}")
+    return fields
+
+
+def iter_nodes(root: Node | Program) -> Iterator[Node | Program]:
+    # every node under `root`, `root` included, in pre-order
+    stack: list[Any] = [root]
+    pop = stack.pop
+    push = stack.append
+    fields_of = CHILD_FIELDS
+    while stack:
+        node = pop()
+        yield node
+        fields = fields_of.get(type(node))
+        if fields is None:
+            fields = child_fields(type(node))
+        # pushed last to first, so the first child comes out next
+        for name in reversed(fields):
+            child = getattr(node, name)
+            if type(child) is list:
+                stack += reversed(child)
+            elif child is not None:
+                push(child)
+
+
+class NodeVisitor:
+    # Subclasses define `visit_<Class>` and `leave_<Class>` methods taking
+    # the node; returning `SKIP` or `STOP` changes the walk. `walk` returns
+    # False if it was stopped.
+
+    # (visit, leave, child fields) for each node type seen, per subclass
+    handlers: ClassVar[
+        dict[type, tuple[Handler | None, Handler | None, tuple[str, ...]]]
+    ] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.handlers = {}
+
+    @classmethod
+    def handlers_for(
+        cls, node_type: type
+    ) -> tuple[Handler | None, Handler | None, tuple[str, ...]]:
+        handlers = cls.handlers.get(node_type)
+        if handlers is None:
+            visit = leave = None
+            for base in node_type.__mro__:
+                if visit is None:
+                    visit = getattr(cls, f"visit_{base.__name__}", None)
+                if leave is None:
+                    leave = getattr(cls, f"leave_{base.__name__}", None)
+            handlers = cls.handlers[node_type] = (visit, leave, child_fields(node_type))
+        return handlers
+
+    def walk(self, root: Node | Program) -> bool:
+        handlers = type(self).handlers
+        handlers_for = type(self).handlers_for
+        # a 1-tuple marks a node whose children are done, for its leave
+        stack: list[Any] = [root]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            if type(node) is tuple:
+                (node,) = node
+                if handlers[type(node)][1](self, node) is STOP:
+                    return False
+                continue
+            found = handlers.get(type(node))
+            visit, leave, fields = found if found else handlers_for(type(node))
+            if visit is not None:
+                action = visit(self, node)
+                if action is STOP:
+                    return False
+                if action is SKIP:
+                    fields = ()
+            if leave is not None:
+                push((node,))
+            for name in reversed(fields):
+                child = getattr(node, name)
+                if type(child) is list:
+                    stack += reversed(child)
+                elif child is not None:
+                    push(child)
+        return True
+
+
+class NodeTransformer(NodeVisitor):
+    # A visitor whose handlers return the node to put in place of the one
+    # they were given, in its parent; the tree is rewritten in place. A
+    # node returned by `visit_*` has its own children walked; returning
+    # nothing keeps the node. `walk` returns the root, replaced or not.
+
+    def walk(self, root: Node | Program) -> Any:
+        handlers = type(self).handlers
+        handlers_for = type(self).handlers_for
+        # each entry is a node, the list or node holding it and its index
+        # or attribute there, and whether its children are done
+        top: list[Any] = [root]
+        stack: list[tuple[Any, Any, Any, bool]] = [(root, top, 0, False)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node, owner, key, leaving = pop()
+            found = handlers.get(type(node))
+            visit, leave, fields = found if found else handlers_for(type(node))
+            if leaving:
+                assert leave is not None
+                result = leave(self, node)
+                if result is STOP:
+                    break
+                if result is not None and result is not node:
+                    replace(owner, key, result)
+                continue
+            if visit is not None:
+                result = visit(self, node)
+                if result is STOP:
+                    break
+                if result is SKIP:
+                    fields = ()
+                elif result is not None and result is not node:
+                    replace(owner, key, result)
+                    node = result
+                    visit, leave, fields = handlers_for(type(node))
+            if leave is not None:
+                push((node, owner, key, True))
+            for name in reversed(fields):
+                child = getattr(node, name)
+                if type(child) is list:
+                    for index in range(len(child) - 1, -1, -1):
+                        push((child[index], child, index, False))
+                elif child is not None:
+                    push((child, node, name, False))
+        return top[0]
+
+
+def replace(owner: Any, key: Any, node: Any) -> None:
+    if type(owner) is list:
+        owner[key] = node
+    else:
+        setattr(owner, key, node)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from itertools import islice
+
+from src.ast import Statement
+from src.compiler import Bytecode, Compiler, Opcode
+from src.evaluator import EvaluationError, Value, apply_infix, apply_prefix, divide
+
+# initial size of `VM.stack`, grown for batches that need more
+STACK_SIZE = 2048
+# statements compiled and run together by `VM.execute`
+BATCH_SIZE = 1024
+
+CONSTANT = Opcode.CONSTANT.value
+TRUE = Opcode.TRUE.value
+FALSE = Opcode.FALSE.value
+POP = Opcode.POP.value
+ADD = Opcode.ADD.value
+SUB = Opcode.SUB.value
+MUL = Opcode.MUL.value
+DIV = Opcode.DIV.value
+EQUAL = Opcode.EQUAL.value
+NOT_EQUAL = Opcode.NOT_EQUAL.value
+LESS_THAN = Opcode.LESS_THAN.value
+GREATER_THAN = Opcode.GREATER_THAN.value
+MINUS = Opcode.MINUS.value
+BANG = Opcode.BANG.value
+SET_GLOBAL = Opcode.SET_GLOBAL.value
+GET_GLOBAL = Opcode.GET_GLOBAL.value
+RETURN_VALUE = Opcode.RETURN_VALUE.value
+EXTENDED_ARG = Opcode.EXTENDED_ARG.value
+
+INFIX_OPERATORS: dict[int, str] = {
+    ADD: "+",
+    SUB: "-",
+    MUL: "*",
+    DIV: "/",
+    EQUAL: "==",
+    NOT_EQUAL: "!=",
+    LESS_THAN: "<",
+    GREATER_THAN: ">",
+}
+
+
+class Frame:
+    __slots__ = ("bytecode", "ip")
+
+    def __init__(self, bytecode: Bytecode) -> None:
+        self.bytecode = bytecode
+        self.ip = 0
+
+
+class VM:
+    # Stack machine for `compiler.Bytecode`. The value stack is preallocated,
+    # grown to a batch's `max_stack` before running it, and addressed by
+    # `sp`; globals persist across `run` calls so a session can feed it one
+    # compiled batch at a time.
+    def __init__(self) -> None:
+        self.stack: list[Value] = [None] * STACK_SIZE
+        self.sp: int = 0
+        self.globals: list[Value] = []
+        self.frames: list[Frame] = []
+        self.last_popped: Value = None
+        self.returned: bool = False
+        self.compiler = Compiler()
+
+    def execute(self, statements: Iterable[Statement]) -> Value:
+        # Same contract as `Evaluator.execute`: compiles and runs statements
+        # in batches and returns the last statement's value, or that of the
+        # first top-level `return`.
+        statements = iter(statements)
+        self.last_popped = None
+        while True:
+            bytecode = self.compiler.compile(islice(statements, BATCH_SIZE))
+            if not bytecode.instructions and bytecode.error is None:
+                break
+            self.run(bytecode)
+            if self.returned:
+                break
+        return self.last_popped
+
+    def run(self, bytecode: Bytecode) -> Value:
+        missing = len(self.compiler.resolver.scopes[0]) - len(self.globals)
+        if missing > 0:
+            self.globals.extend([None] * missing)
+        if bytecode.max_stack > len(self.stack):
+            self.stack.extend([None] * (bytecode.max_stack - len(self.stack)))
+        frame = Frame(bytecode)
+        self.frames.append(frame)
+        try:
+            self.loop(frame)
+        except EvaluationError:
+            # like the evaluator, a `let` that did not finish binds nothing
+            for end, declared in bytecode.declarations:
+                if end > frame.ip:
+                    self.compiler.resolver.forget(declared)
+                    del self.globals[declared:]
+                    break
+            raise
+        finally:
+            self.frames.pop()
+        if bytecode.error is not None:
+            raise bytecode.error
+        return self.last_popped
+
+    def loop(self, frame: Frame) -> None:
+        instructions = frame.bytecode.instructions
+        constants = frame.bytecode.constants
+        stack = self.stack
+        globals_ = self.globals
+        end = len(instructions)
+        ip = frame.ip
+        sp = self.sp
+        self.returned = False
+        try:
+            while ip < end:
+                opcode = instructions[ip]
+                if opcode == CONSTANT:
+                    stack[sp] = constants[
+                        (instructions[ip + 1] << 8) | instructions[ip + 2]
+                    ]
+                    sp += 1
+                    ip += 3
+                elif opcode == GET_GLOBAL:
+                    stack[sp] = globals_[
+                        (instructions[ip + 1] << 8) | instructions[ip + 2]
+                    ]
+                    sp += 1
+                    ip += 3
+                elif opcode == SET_GLOBAL:
+                    sp -= 1
+                    globals_[(instructions[ip + 1] << 8) | instructions[ip + 2]] = (
+                        stack[sp]
+                    )
+                    self.last_popped = None
+                    ip += 3
+                elif opcode == POP:
+                    sp -= 1
+                    self.last_popped = stack[sp]
+                    ip += 1
+                elif ADD <= opcode <= GREATER_THAN:
+                    sp -= 1
+                    right = stack[sp]
+                    left = stack[sp - 1]
+                    if type(left) is int and type(right) is int:
+                        if opcode == ADD:
+                            result = left + right
+                        elif opcode == SUB:
+                            result = left - right
+                        elif opcode == MUL:
+                            result = left * right
+                        elif opcode == DIV:
+                            if right == 0:
+                                raise EvaluationError("division by zero")
+                            result = divide(left, right)
+                        elif opcode == LESS_THAN:
+                            result = left < right
+                        elif opcode == GREATER_THAN:
+                            result = left > right
+                        elif opcode == EQUAL:
+                            result = left == right
+                        else:
+                            result = left != right
+                    else:
+                        result = apply_infix(INFIX_OPERATORS[opcode], left, right)
+                    stack[sp - 1] = result
+                    ip += 1
+                elif opcode == TRUE:
+                    stack[sp] = True
+                    sp += 1
+                    ip += 1
+                elif opcode == FALSE:
+                    stack[sp] = False
+                    sp += 1
+                    ip += 1
+                elif opcode == MINUS:
+                    stack[sp - 1] = apply_prefix("-", stack[sp - 1])
+                    ip += 1
+                elif opcode == BANG:
+                    right = stack[sp - 1]
+                    stack[sp - 1] = right is False or right is None
+                    ip += 1
+                elif opcode == RETURN_VALUE:
+                    sp -= 1
+                    self.last_popped = stack[sp]
+                    self.returned = True
+                    break
+                elif opcode == EXTENDED_ARG:
+                    # only ever before an instruction taking a slot or constant
+                    operand = (
+                        (instructions[ip + 1] << 24)
+                        | (instructions[ip + 2] << 16)
+                        | (instructions[ip + 4] << 8)
+                        | instructions[ip + 5]
+                    )
+                    opcode = instructions[ip + 3]
+                    if opcode == CONSTANT:
+                        stack[sp] = constants[operand]
+                        sp += 1
+                    elif opcode == GET_GLOBAL:
+                        stack[sp] = globals_[operand]
+                        sp += 1
+                    else:
+                        sp -= 1
+                        globals_[operand] = stack[sp]
+                        self.last_popped = None
+                    ip += 6
+                else:
+                    raise EvaluationError(f"unknown opcode {opcode}")
+        except EvaluationError as error:
+            line, position = frame.bytecode.positions.get(ip, (0, 0))
+            raise EvaluationError(error.reason, line, position) from None
+        except IndexError:
+            if sp >= len(stack):
+                raise EvaluationError("stack overflow") from None
+            raise
+        finally:
+            frame.ip = ip
+            # whatever happened, the stack of a finished frame is discarded
+            self.sp = 0
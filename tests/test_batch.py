@@ -0,0 +1,142 @@
+import sys
+
+import pytest
+from src import main
+from src.batch import ENGINES, BatchOptions, FileResult, expand_paths, process_files
+
+
+@pytest.fixture
+def sources(tmp_path):  # type: ignore
+    (tmp_path / "b").mkdir()
+    files = {
+        "a.mnk": "let x = 2; x * 3",
+        "b/c.mnk": "1; 2; 3",
+        "b/bad.mnk": "1;\nlet = 1;",
+        "b/error.mnk": "1 + true",
+        "b/notes.txt": "not monkey",
+        "z.mnk": "",
+    }
+    for name, source in files.items():
+        (tmp_path / name).write_text(source)
+    return tmp_path
+
+
+def test_expand_paths(sources):  # type: ignore
+    paths = expand_paths([str(sources), str(sources / "a.mnk")])
+    assert [path.removeprefix(str(sources)) for path in paths] == [
+        "/a.mnk",
+        "/z.mnk",
+        "/b/bad.mnk",
+        "/b/c.mnk",
+        "/b/error.mnk",
+        "/a.mnk",
+    ]
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        (BatchOptions(use_cache=False), ["2", "0", None, "3", "1"]),
+        (BatchOptions(run=True, use_cache=False), ["6", "null", None, "3", None]),
+        (BatchOptions(run=True, engine="vm"), ["6", "null", None, "3", None]),
+        (BatchOptions(run=True, engine="py"), ["6", "null", None, "3", None]),
+    ],
+)
+def test_process_files_in_order(sources, options, expected):  # type: ignore
+    paths = expand_paths([str(sources)])
+    serial = list(process_files(paths, options, jobs=1))
+    parallel = list(process_files(paths, options, jobs=2, chunksize=2))
+    assert serial == parallel
+    assert [result.path for result in parallel] == paths
+    summary = [
+        None if result.error else (result.value or str(result.statements))
+        for result in parallel
+    ]
+    assert summary == expected
+    bad, error = parallel[2], parallel[4]
+    assert bad.error == "2:5: expected TokenType.IDENT, got TokenType.ASSIGN instead"
+    if options.run:
+        assert error.error == "1:3: type mismatch: INTEGER + BOOLEAN"
+
+
+def test_missing_file():
+    (result,) = process_files(["/nonexistent.mnk"], BatchOptions())
+    assert result.error is not None and "No such file" in result.error
+    assert str(result).startswith("/nonexistent.mnk: error: ")
+    assert str(FileResult("a.mnk", 3)) == "a.mnk: 3 statements"
+
+
+def test_main_batch_exit_status(sources, monkeypatch, capsys):  # type: ignore
+    argv = ["pymonkey", "--run", "--jobs", "1", str(sources / "b" / "c.mnk")]
+    monkeypatch.setattr(sys, "argv", [*argv, str(sources / "a.mnk")])
+    main.main()
+    assert capsys.readouterr().out.splitlines() == [
+        f"{sources}/b/c.mnk: 3",
+        f"{sources}/a.mnk: 6",
+    ]
+    monkeypatch.setattr(sys, "argv", ["pymonkey", str(sources)])
+    with pytest.raises(SystemExit) as exit:
+        main.main()
+    assert exit.value.code == 1
+
+
+def test_check(sources, monkeypatch, capsys):  # type: ignore
+    (sources / "b" / "bad.mnk").write_text("let = 1;\nlet y = ;\ny")
+    argv = ["pymonkey", "--check", "--jobs", "1", str(sources / "b")]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit) as exit:
+        main.main()
+    assert exit.value.code == 1
+    assert capsys.readouterr().out.splitlines() == [
+        f"{sources}/b/bad.mnk:1:5: expected TokenType.IDENT, got TokenType.ASSIGN instead",
+        f"{sources}/b/bad.mnk:2:9: no prefix parse function for TokenType.SEMICOLON",
+        f"{sources}/b/c.mnk: 3 statements",
+        # evaluation errors are not syntax errors
+        f"{sources}/b/error.mnk: 1 statements",
+    ]
+    monkeypatch.setattr(sys, "argv", ["pymonkey", "--check", str(sources / "a.mnk")])
+    main.main()
+    assert capsys.readouterr().out == f"{sources}/a.mnk: 2 statements\n"
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_main_single_file_errors(sources, monkeypatch, capsys, engine):  # type: ignore
+    (sources / "zero.mnk").write_text("1;\n1 / 0;")
+    for name, message in [
+        ("zero.mnk", "2:3: division by zero"),
+        ("b/bad.mnk", "2:5: expected TokenType.IDENT, got TokenType.ASSIGN instead"),
+    ]:
+        argv = ["pymonkey", "--run", "--no-cache", "--engine", engine]
+        monkeypatch.setattr(sys, "argv", [*argv, str(sources / name)])
+        with pytest.raises(SystemExit) as exit:
+            main.main()
+        assert exit.value.code == 1
+        assert capsys.readouterr().err == f"error: {message}\n"
+
+
+@pytest.mark.parametrize("options", [BatchOptions(), BatchOptions(check=True)])
+def test_undecodable_file(tmp_path, options):  # type: ignore
+    (tmp_path / "latin.mnk").write_bytes("let é = 1;".encode("latin-1"))
+    (tmp_path / "ok.mnk").write_text("1")
+    paths = expand_paths([str(tmp_path)])
+    latin, ok = process_files(paths, options, jobs=2, chunksize=1)
+    assert latin.error is not None and "can't decode" in latin.error
+    assert ok.ok
+
+
+def test_failures_stay_with_their_file(tmp_path, monkeypatch):  # type: ignore
+    (tmp_path / "a.mnk").write_text("1")
+    # too many digits for `str`
+    (tmp_path / "big.mnk").write_text("let a = 10000000000;" + "a * " * 500 + "1")
+    paths = expand_paths([str(tmp_path)])
+    options = BatchOptions(run=True, use_cache=False)
+    a, big = process_files(paths, options, jobs=2, chunksize=1)
+    assert a.value == "1"
+    assert big.error is not None and big.error.startswith("ValueError: ")
+
+    def overflow(*args):  # type: ignore
+        raise RecursionError
+
+    monkeypatch.setattr(ENGINES["tree"], "execute", overflow)
+    a, big = process_files(paths, options, jobs=1)
+    assert a.error == big.error == "expression nested too deeply"
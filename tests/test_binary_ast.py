@@ -0,0 +1,108 @@
+import gc
+import io
+import pickle
+import struct
+
+import pytest
+from src import binary_ast
+from src.ast import ExpressionStatement, IntegerLiteral, LetStatement, Program
+from src.lexer import Lexer
+from src.optimizer import Folder
+from src.parser import Parser
+from src.serializer import node_text
+from src.token import Token, TokenType
+
+INPUTS = [
+    "",
+    "let x = 5; let y = x;",
+    "return 2 * (3 + 4) - -1 / 2;",
+    "a + b * c + d / e - f",
+    "!true == false != (1 < 2) > 3",
+    "let big = 123456789012345678901234567890; big",
+    "let héllo = 1;\nhéllo + 2",
+    "1 2; 3",
+]
+
+
+def parse(source: str) -> Program:
+    return Parser(Lexer(source)).parse_program()
+
+
+@pytest.mark.parametrize("input", INPUTS)
+def test_round_trip(input: str):
+    program = parse(input)
+    loaded = binary_ast.loads(binary_ast.dumps(program))
+    assert loaded == program
+    assert str(loaded) == str(program)
+
+
+def test_round_trip_keeps_tokens():
+    program = parse("let x = 1;\n  x + 22")
+    loaded = binary_ast.loads(binary_ast.dumps(program))
+    infix = loaded.statements[1].expression  # type: ignore
+    assert infix.token == Token(TokenType.PLUS, "+", 15, 1)
+    assert infix.right.token == Token(TokenType.INT, "22", 17, 1)
+
+
+def test_folded_and_partial_trees():
+    program = Folder().fold_program(
+        parse("let a = 1 - 5; (0 - 2) * 9223372036854775807;")
+    )
+    assert program.statements[0].value.value == -4  # type: ignore
+    program.statements.append(ExpressionStatement(Token(TokenType.SEMICOLON, ";")))
+    program.statements.append(
+        LetStatement(
+            Token(TokenType.LET, "let"),
+            value=IntegerLiteral(Token(TokenType.INT, "7"), 7),
+        )
+    )
+    assert binary_ast.loads(binary_ast.dumps(program)) == program
+
+
+def test_deep_trees():
+    depth = 50_000
+    program = parse("-" * depth + "(a + 1)")
+    loaded = binary_ast.loads(binary_ast.dumps(program))
+    assert node_text(loaded.statements[0]) == node_text(program.statements[0])
+
+
+def test_dump_and_load():
+    program = parse("let x = 5; x * 2;")
+    file = io.BytesIO()
+    binary_ast.dump(program, file)
+    file.seek(0)
+    assert binary_ast.load(file) == program
+    assert binary_ast.loads(memoryview(file.getvalue())) == program
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_loads_restores_collector_state(enabled: bool):
+    data = binary_ast.dumps(parse("let x = 1; x + 2"))
+    (gc.enable if enabled else gc.disable)()
+    try:
+        binary_ast.loads(data)
+        assert gc.isenabled() is enabled
+        with pytest.raises(ValueError):
+            binary_ast.loads(data[:-8])
+        assert gc.isenabled() is enabled
+    finally:
+        gc.enable()
+
+
+def test_smaller_than_pickle():
+    source = "let total = (alpha + 12) * beta - -gamma / 3;\n" * 200
+    program = parse(source)
+    assert len(binary_ast.dumps(program)) * 3 < len(pickle.dumps(program))
+
+
+def test_rejects_other_data():
+    data = binary_ast.dumps(parse("let x = 5; x"))
+    with pytest.raises(ValueError, match="not a binary AST"):
+        binary_ast.loads(b"x" * len(data))
+    newer = bytearray(data)
+    struct.pack_into("<H", newer, 4, binary_ast.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError, match="unsupported binary AST version"):
+        binary_ast.loads(newer)
+    for end in (10, binary_ast.HEADER.size + 3, len(data) - 1):
+        with pytest.raises(ValueError, match="truncated binary AST"):
+            binary_ast.loads(data[:end])
@@ -0,0 +1,124 @@
+import os
+import sys
+
+import pytest
+from src import main
+from src.cache import BODY, CACHE_DIRECTORY, HEADER, ParseCache, source_key
+from src.lexer import Lexer
+from src.parser import Parser, ParserError
+
+
+def parse(source: str):  # type: ignore
+    return Parser(Lexer(source)).iter_statements()
+
+
+def write(path, source: str) -> str:  # type: ignore
+    path.write_text(source)
+    return str(path)
+
+
+def test_store_and_load(tmp_path):  # type: ignore
+    cache = ParseCache(str(tmp_path / "cache"))
+    source = "".join(f"let x{'_' * (i % 5)} = {i} * 2;\n" for i in range(600))
+    key = source_key(write(tmp_path / "a.mnk", source))
+    assert cache.load(key) is None
+    assert list(cache.store(key, parse(source))) == list(parse(source))
+    cached = cache.load(key)
+    assert cached is not None
+    assert list(cached) == list(parse(source))
+    assert os.listdir(cache.directory) == [f"{key}.ast"]
+
+
+def test_key_depends_on_content(tmp_path):  # type: ignore
+    first = source_key(write(tmp_path / "a.mnk", "1 + 2"))
+    assert first == source_key(write(tmp_path / "b.mnk", "1 + 2"))
+    assert first != source_key(write(tmp_path / "c.mnk", "1 + 3"))
+
+
+def test_incomplete_store_is_not_committed(tmp_path):  # type: ignore
+    cache = ParseCache(str(tmp_path))
+    statements = cache.store("partial", parse("1; 2; 3;"))
+    next(statements)
+    statements.close()
+    with pytest.raises(ParserError):
+        list(cache.store("broken", parse("1; let = 2;")))
+    assert cache.load("partial") is None and cache.load("broken") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):  # type: ignore
+    cache = ParseCache(str(tmp_path))
+    (tmp_path / "bad.ast").write_bytes(b"not a pickle")
+    assert cache.load("bad") is None
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        lambda entry: entry[:-1],
+        lambda entry: entry[: len(HEADER) + BODY.size],
+        lambda entry: entry[:-5] + bytes([entry[-5] ^ 1]) + entry[-4:],
+        lambda entry: entry + b"\0",
+    ],
+)
+def test_damaged_body_is_a_miss(tmp_path, damage):  # type: ignore
+    cache = ParseCache(str(tmp_path))
+    list(cache.store("entry", parse("let a = 1; a * 2;" * 100)))
+    path = tmp_path / "entry.ast"
+    entry = path.read_bytes()
+    assert entry.startswith(HEADER)
+    path.write_bytes(damage(entry))
+    assert cache.load("entry") is None
+
+
+def test_evicts_least_recently_used(tmp_path):  # type: ignore
+    cache = ParseCache(str(tmp_path))
+    for index, key in enumerate(["a", "b", "c"]):
+        list(cache.store(key, parse("1 + 2 * 3;" * 50)))
+        os.utime(cache.path(key), (index, index))
+    size = os.path.getsize(cache.path("a"))
+    # a hit makes "a" the most recently used
+    assert cache.load("a") is not None
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["a.ast", "c.ast"]
+
+
+def test_main_warm_run_skips_parsing(tmp_path, monkeypatch, capsys):  # type: ignore
+    path = write(tmp_path / "prog.mnk", "let a = 2;\na * 21")
+    monkeypatch.setattr(sys, "argv", ["pymonkey", "--run", path])
+    main.main()
+    assert capsys.readouterr().out == "42\n"
+    assert len(os.listdir(tmp_path / CACHE_DIRECTORY)) == 1
+
+    def fail(*args):  # type: ignore
+        raise AssertionError("parsed a cached file")
+
+    monkeypatch.setattr(main, "Parser", fail)
+    main.main()
+    assert capsys.readouterr().out == "42\n"
+    monkeypatch.setattr(sys, "argv", ["pymonkey", "--run", "--no-cache", path])
+    with pytest.raises(AssertionError):
+        main.main()
+
+
+def test_unusable_cache_is_a_miss(tmp_path, monkeypatch, capsys):  # type: ignore
+    path = write(tmp_path / "prog.mnk", "let a = 2;\na * 21")
+    # a file where the cache directory should be
+    (tmp_path / CACHE_DIRECTORY).write_text("")
+    monkeypatch.setattr(sys, "argv", ["pymonkey", "--run", path])
+    main.main()
+    assert capsys.readouterr().out == "42\n"
+    cache = ParseCache.beside(path)
+    assert cache.load("key") is None
+    assert list(cache.store("key", parse("1; 2;"))) == list(parse("1; 2;"))
+
+
+def test_deep_trees_are_cached(tmp_path, monkeypatch, capsys):  # type: ignore
+    path = write(tmp_path / "deep.mnk", "-" * 20_000 + "1;")
+    monkeypatch.setattr(sys, "argv", ["pymonkey", path])
+    main.main()
+    printed = capsys.readouterr().out
+    assert len(os.listdir(tmp_path / CACHE_DIRECTORY)) == 1
+    main.main()
+    assert capsys.readouterr().out == printed
@@ -0,0 +1,151 @@
+import pytest
+from contextlib import nullcontext as does_not_raise
+from src.evaluator import EvaluationError, Evaluator, Value
+from src.lexer import Lexer
+from src.parser import Parser
+
+
+def run(input: str) -> Value:
+    program = Parser(Lexer(input)).parse_program()
+    return Evaluator().eval_program(program)
+
+
+@pytest.mark.parametrize(
+    "input, expected",
+    [
+        ("5", 5),
+        ("-10", -10),
+        ("5 + 5 + 5 + 5 - 10", 10),
+        ("2 * 2 * 2 * 2 * 2", 32),
+        ("-50 + 100 + -50", 0),
+        ("20 + 2 * -10", 0),
+        ("2 * (5 + 10)", 30),
+        ("(5 + 10 * 2 + 15 / 3) * 2 + -10", 50),
+        ("7 / 2", 3),
+        ("-7 / 2", -3),
+        ("7 / -2", -3),
+    ],
+)
+def test_integer_expressions(input: str, expected: int):
+    assert run(input) == expected
+
+
+@pytest.mark.parametrize(
+    "input, expected",
+    [
+        ("true", True),
+        ("false", False),
+        ("1 < 2", True),
+        ("1 > 2", False),
+        ("1 == 1", True),
+        ("1 != 1", False),
+        ("true == true", True),
+        ("true != false", True),
+        ("(1 < 2) == true", True),
+        ("!true", False),
+        ("!!true", True),
+        ("!5", False),
+        ("!!5", True),
+        ("!0", False),
+        ("1 == true", False),
+        ("1 != true", True),
+    ],
+)
+def test_boolean_expressions(input: str, expected: bool):
+    assert run(input) is expected
+
+
+@pytest.mark.parametrize(
+    "input, expected",
+    [
+        ("let a = 5; a;", 5),
+        ("let a = 5 * 5; a;", 25),
+        ("let a = 5; let b = a; b;", 5),
+        ("let a = 5; let b = a; let c = a + b + 5; c;", 15),
+        ("let a = 1; let a = a + 1; a;", 2),
+        ("let a = 1;", None),
+        ("9; return 10; 9;", 10),
+        ("return 2 * 5; 9;", 10),
+    ],
+)
+def test_statements(input: str, expected: Value):
+    assert run(input) == expected
+
+
+@pytest.mark.parametrize(
+    "input, message, expectation",
+    [
+        (
+            "5 + true;",
+            "type mismatch: INTEGER + BOOLEAN",
+            pytest.raises(EvaluationError),
+        ),
+        ("-true", "unknown operator: -BOOLEAN", pytest.raises(EvaluationError)),
+        (
+            "true + false;",
+            "unknown operator: BOOLEAN + BOOLEAN",
+            pytest.raises(EvaluationError),
+        ),
+        ("foobar", "identifier not found: foobar", pytest.raises(EvaluationError)),
+        ("let a = a;", "identifier not found: a", pytest.raises(EvaluationError)),
+        ("5 / (2 - 2)", "division by zero", pytest.raises(EvaluationError)),
+        ("5 == true", "", does_not_raise()),
+        (
+            "5 < true",
+            "type mismatch: INTEGER < BOOLEAN",
+            pytest.raises(EvaluationError),
+        ),
+    ],
+)
+def test_errors(input: str, message: str, expectation):  # type: ignore
+    with expectation as error:
+        run(input)
+    if error is not None:
+        assert error.value.message.endswith(message)
+
+
+def test_identifiers_are_resolved_to_slots():
+    program = Parser(Lexer("let a = 1; let b = 2; let a = b; a + b;")).parse_program()
+    evaluator = Evaluator()
+    assert evaluator.eval_program(program) == 4
+    infix = program.statements[3].expression  # type: ignore
+    assert (infix.left.depth, infix.left.slot) == (0, 0)
+    assert (infix.right.depth, infix.right.slot) == (0, 1)
+    assert evaluator.frames == [[2, 2]]
+
+
+def test_evaluator_keeps_state_between_programs():
+    evaluator = Evaluator()
+    evaluator.eval_program(Parser(Lexer("let x = 2;")).parse_program())
+    assert evaluator.eval_program(Parser(Lexer("x * 21")).parse_program()) == 42
+
+
+@pytest.mark.parametrize(
+    "input, expected",
+    [
+        ("-" * 5000 + "1", 1),
+        ("!" * 5001 + "true", False),
+        (" + ".join(["1"] * 5000), 5000),
+        ("(" * 5000 + "1" + " + 1)" * 5000, 5001),
+    ],
+)
+def test_deep_expressions(input: str, expected: Value):
+    assert run(input) == expected
+
+
+def test_failed_let_binds_nothing():
+    evaluator = Evaluator()
+
+    def execute(input: str) -> Value:
+        return evaluator.execute(Parser(Lexer(input)).iter_statements())
+
+    assert execute("let a = 5;") is None
+    with pytest.raises(EvaluationError, match="division by zero"):
+        execute("let b = a; let a = 1 / 0; let c = 2;")
+    with pytest.raises(EvaluationError, match="division by zero"):
+        execute("let q = 1 / 0;")
+    with pytest.raises(EvaluationError, match="identifier not found: q"):
+        execute("q")
+    assert execute("a + b") == 10
+    assert execute("let q = 2; q") == 2
+    assert evaluator.frames == [[5, 5, 2]]
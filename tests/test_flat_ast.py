@@ -0,0 +1,98 @@
+import pytest
+from src.flat_ast import FlatAST, FlatVisitor, NodeKind
+from src.lexer import Lexer
+from src.parser import Parser, ParserError
+
+INPUTS = [
+    "",
+    "let x = 5; let y = x;",
+    "return 2 * (3 + 4) - -1 / 2;",
+    "a + b * c + d / e - f",
+    "!true == false != (1 < 2) > 3",
+    "let big = 123456789012345678901234567890; big",
+    "1 2; 3",
+]
+
+
+@pytest.mark.parametrize("input", INPUTS)
+def test_parse_matches_parser(input: str):
+    program = Parser(Lexer(input)).parse_program()
+    ast = FlatAST.parse(input)
+    assert ast.to_program() == program
+    assert str(ast.to_program()) == str(program)
+
+
+@pytest.mark.parametrize("input", INPUTS)
+def test_from_program_round_trip(input: str):
+    program = Parser(Lexer(input)).parse_program()
+    ast = FlatAST.from_program(program)
+    assert ast.to_program() == program
+    assert len(list(ast.walk())) == len(ast)
+
+
+def test_from_program_keeps_token_stream():
+    stream = Lexer("let x = 1; x + 2").tokenize_stream()
+    ast = FlatAST.from_program(Parser(stream.reader()).parse_program())
+    assert ast.tokens is stream
+    assert [ast.token(index).literal for index in ast.walk()] == [
+        "let",
+        "x",
+        "1",
+        "x",
+        "+",
+        "x",
+        "2",
+    ]
+
+
+@pytest.mark.parametrize("input", ["let = 5", "let x 5", "(1 + 2", "+"])
+def test_parse_errors_match_parser(input: str):
+    with pytest.raises(ParserError) as expected:
+        Parser(Lexer(input)).parse_program()
+    with pytest.raises(ParserError) as error:
+        FlatAST.parse(input)
+    assert error.value.message == expected.value.message
+
+
+def test_layout():
+    ast = FlatAST.parse("let x = -y + 2;")
+    (let,) = ast.statements
+    assert ast.kinds[let] == NodeKind.LET
+    name, value = ast.children(let)
+    assert ast.name(name) == "x"
+    assert ast.kinds[value] == NodeKind.INFIX and ast.operator(value) == "+"
+    left, right = ast.children(value)
+    assert ast.operator(left) == "-"
+    assert ast.name(next(ast.children(left))) == "y"
+    assert ast.integer(right) == 2
+    assert ast.token(right).position == 13
+
+
+def test_visitor():
+    class Sum(FlatVisitor):
+        def __init__(self, ast: FlatAST) -> None:
+            super().__init__(ast)
+            self.total = 0
+            self.names: list[str] = []
+
+        def visit_integer(self, index: int) -> None:
+            self.total += self.ast.integer(index)
+
+        def visit_identifier(self, index: int) -> None:
+            self.names.append(self.ast.name(index))
+
+    visitor = Sum(FlatAST.parse("let a = 1 + 2; return a * -3; b;"))
+    visitor.visit_program()
+    assert visitor.total == 6
+    assert visitor.names == ["a", "a", "b"]
+
+
+def test_deep_expressions():
+    depth = 20_000
+    ast = FlatAST.parse("-" * depth + "(" * depth + "1" + ")" * depth + " + 2")
+    assert len(ast) == depth + 4
+    # dataclass == recurses, so compare through the arrays instead
+    program = Parser(ast.tokens.reader()).parse_program()
+    flattened = FlatAST.from_program(program)
+    assert sorted(flattened.token_indices) == sorted(ast.token_indices)
+    assert FlatAST.from_program(ast.to_program()).kinds == flattened.kinds
@@ -0,0 +1,64 @@
+import pytest
+from src.incremental import Document, TextEdit
+from src.lexer import Lexer
+from src.parser import Parser, ParserError
+
+SOURCE = """let five = 5;
+let ten = 10;
+foobar;
+-15;
+return 5;
+"""
+
+
+def check_document(document: Document):
+    assert document.tokens == Lexer(document.source).tokenize()
+    assert document.program == Parser(Lexer(document.source)).parse_program()
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        TextEdit(offset=11, inserted="0"),
+        TextEdit(offset=11, deleted=1, inserted="42"),
+        TextEdit(offset=0, inserted="\n\n"),
+        TextEdit(offset=14, inserted="let x = 1; x;\n"),
+        TextEdit(offset=28, deleted=8),
+        TextEdit(offset=33, inserted="baz"),
+        TextEdit(offset=len(SOURCE), inserted="bar;"),
+    ],
+)
+def test_apply_edit(edit: TextEdit):
+    document = Document.parse(SOURCE)
+    document.apply(edit)
+    assert document.source == edit.apply(SOURCE)
+    check_document(document)
+
+
+def test_unchanged_statements_are_reused():
+    document = Document.parse(SOURCE)
+    statements = list(document.program.statements)
+    document.apply(TextEdit(offset=23, inserted="\n\n"))
+    check_document(document)
+    new_statements = document.program.statements
+    assert new_statements[0] is statements[0]
+    assert all(new is old for new, old in zip(new_statements[2:], statements[2:]))
+    assert new_statements[3].token.line == 5
+
+
+def test_consecutive_edits():
+    document = Document.parse(SOURCE)
+    offset = SOURCE.index("foobar") + len("foobar")
+    for i, inserted in enumerate("qux\nbaz"):
+        document.apply(TextEdit(offset=offset + i, inserted=inserted))
+        check_document(document)
+    assert "foobarqux\nbaz;" in document.source
+    assert len(document.program.statements) == 6
+
+
+def test_failed_edit_leaves_document_unchanged():
+    document = Document.parse(SOURCE)
+    with pytest.raises(ParserError):
+        document.apply(TextEdit(offset=4, deleted=4, inserted="5"))
+    assert document.source == SOURCE
+    check_document(document)
@@ -1,5 +1,8 @@
+import io
 import pprint
-from src.lexer import Lexer, Token, TokenType
+import pytest
+from src.lexer import Lexer, StreamLexer, Token, TokenType
+from src.reader import MmapReader
 
 
 def input_to_tokens(input: str) -> list[Token]:
@@ -137,3 +140,138 @@ def test_equality_operators():
         Token(type=TokenType.NOT_EQ, literal="!=", position=2),
         Token(type=TokenType.INT, literal="5", position=5),
     ]
+
+
+def sequential_tokens(input: str) -> list[Token]:
+    lexer = Lexer(input)
+    tokens = [lexer.next_token()]
+    while tokens[-1].type != TokenType.EOF:
+        tokens.append(lexer.next_token())
+    return tokens
+
+
+TOKENIZE_INPUTS = [
+    "",
+    "   \n\t ",
+    "let five = 5;\nlet ten = 10;\nlet add = fn(x, y) {\nx + y;\n};",
+    "!-/*5; 5 < 10 > 5; 5 != 5 == 5",
+    'if (5 < 10) { return true; } else { return "no\nway"; }\nx',
+    "foo_bar baz2 _qux @ $",
+    "café été 12٣ x²",
+    "a\0b",
+    'x "unterminated',
+]
+
+
+def test_illegal_tokens_keep_their_location():
+    tokens = sequential_tokens("x\n  @ é$")
+    assert tokens[1:4] == [
+        Token(TokenType.ILLEGAL, "@", 4, 1),
+        Token(TokenType.IDENT, "é", 6, 1),
+        Token(TokenType.ILLEGAL, "$", 7, 1),
+    ]
+
+
+@pytest.mark.parametrize("input", TOKENIZE_INPUTS)
+def test_tokenize_matches_next_token(input: str):
+    assert Lexer(input).tokenize() == sequential_tokens(input)
+
+
+@pytest.mark.parametrize(
+    "input",
+    [
+        *TOKENIZE_INPUTS,
+        "a\x1c\x1fb\x0b\x0c\r\n;",
+        '"a\nb" "',
+        "x\0\0 y _z",
+    ],
+)
+def test_ascii_path_matches_character_path(input: str):
+    lexer, characters = Lexer(input), Lexer(input)
+    characters.ascii = False
+    for _ in range(len(input) + 2):
+        assert lexer.next_token() == characters.next_token()
+        assert (lexer.position, lexer.read_position, lexer.character) == (
+            characters.position,
+            characters.read_position,
+            characters.character,
+        )
+        assert lexer.line == characters.line
+
+
+@pytest.mark.parametrize(
+    "data, ascii",
+    [
+        (b"let x = 5;", True),
+        (memoryview(b"let x = 5;"), True),
+        ("let café = 5;".encode(), False),
+    ],
+)
+def test_from_bytes(data: bytes | memoryview, ascii: bool):
+    lexer = Lexer.from_bytes(data)
+    assert lexer.ascii == ascii
+    source = bytes(data).decode()
+    tokens = [lexer.next_token() for _ in range(5)]
+    assert tokens == Lexer(source).tokenize()[:5]
+
+
+def test_unterminated_string():
+    assert sequential_tokens('x "abc') == [
+        Token(type=TokenType.IDENT, literal="x", position=0),
+        Token(type=TokenType.STRING, literal="abc", position=2),
+        Token(type=TokenType.EOF, literal="", position=6),
+    ]
+
+
+def test_tokenize_leaves_lexer_at_eof():
+    lexer = Lexer("let x = 5;")
+    tokens = lexer.tokenize()
+    assert tokens[-1] == Token(type=TokenType.EOF, literal="", position=10)
+    assert lexer.next_token() == Token(type=TokenType.EOF, literal="", position=11)
+
+
+@pytest.mark.parametrize("input", TOKENIZE_INPUTS)
+def test_tokenize_stream_matches_tokenize(input: str):
+    stream = Lexer(input).tokenize_stream()
+    tokens = Lexer(input).tokenize()
+    assert list(stream) == tokens
+    assert stream.to_tokens() == tokens
+
+
+def test_token_stream_views():
+    stream = Lexer('let s = "hi";').tokenize_stream()
+    assert len(stream) == 6
+    assert stream[3] == Token(type=TokenType.STRING, literal="hi", position=8)
+    assert stream[-1].type == TokenType.EOF
+    reader = stream.reader()
+    types = [reader.next_token().type for _ in range(len(stream) + 2)]
+    assert types[-3:] == [TokenType.EOF] * 3
+
+
+def stream_tokens(lexer: StreamLexer) -> list[Token]:
+    tokens = [lexer.next_token()]
+    while tokens[-1].type != TokenType.EOF:
+        tokens.append(lexer.next_token())
+    return tokens
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 64])
+@pytest.mark.parametrize("input", TOKENIZE_INPUTS + ['x "spans\nchunks" == y'])
+def test_stream_lexer_matches_tokenize(input: str, chunk_size: int):
+    lexer = StreamLexer(io.StringIO(input), chunk_size=chunk_size)
+    assert stream_tokens(lexer) == Lexer(input).tokenize()
+
+
+def test_stream_lexer_over_mmap(tmp_path):  # type: ignore
+    input = "let café = 5;\r\nlet ten = 10;\n"
+    path = tmp_path / "input.mnk"
+    path.write_bytes(input.encode())
+    with open(path) as f:
+        expected = Lexer(f.read()).tokenize()
+    with MmapReader(str(path)) as reader:
+        assert stream_tokens(StreamLexer(reader, chunk_size=4)) == expected
+    (tmp_path / "empty.mnk").write_bytes(b"")
+    with MmapReader(str(tmp_path / "empty.mnk")) as reader:
+        assert stream_tokens(StreamLexer(reader)) == [
+            Token(type=TokenType.EOF, literal="", position=0)
+        ]
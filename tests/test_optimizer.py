@@ -0,0 +1,117 @@
+import pytest
+from src.ast import IntegerLiteral, PrefixExpression
+from src.evaluator import EvaluationError, Evaluator
+from src.lexer import Lexer
+from src.optimizer import Folder
+from src.parser import Parser
+
+
+def parse(input: str):  # type: ignore
+    return Parser(Lexer(input)).parse_program()
+
+
+@pytest.mark.parametrize(
+    "input, expected, eliminated",
+    [
+        ("-5", "IntegerLiteral(value=-5)", 1),
+        ("1 + 2 * 3", "IntegerLiteral(value=7)", 4),
+        ("!true", "Boolean(value=False)", 1),
+        ("1 < 2 == true", "Boolean(value=True)", 4),
+        (
+            "-(-(a + b))",
+            "InfixExpression(left=Identifier(value='a'), operator=+, right=Identifier(value='b'))",
+            2,
+        ),
+        (
+            "!!(a < b)",
+            "InfixExpression(left=Identifier(value='a'), operator=<, right=Identifier(value='b'))",
+            2,
+        ),
+        (
+            "(a - b) * 1",
+            "InfixExpression(left=Identifier(value='a'), operator=-, right=Identifier(value='b'))",
+            2,
+        ),
+        (
+            "0 + (a * b)",
+            "InfixExpression(left=Identifier(value='a'), operator=*, right=Identifier(value='b'))",
+            2,
+        ),
+        (
+            "(a * b) + (2 - 2)",
+            "InfixExpression(left=Identifier(value='a'), operator=*, right=Identifier(value='b'))",
+            4,
+        ),
+        # not provably integers or booleans, so left alone
+        (
+            "a + 0",
+            "InfixExpression(left=Identifier(value='a'), operator=+, right=IntegerLiteral(value=0))",
+            0,
+        ),
+        (
+            "!!a",
+            "PrefixExpression(operator=!, right=PrefixExpression(operator=!, right=Identifier(value='a')))",
+            0,
+        ),
+        ("--5", "IntegerLiteral(value=5)", 2),
+        # errors are left for run time
+        (
+            "1 / 0",
+            "InfixExpression(left=IntegerLiteral(value=1), operator=/, right=IntegerLiteral(value=0))",
+            0,
+        ),
+        (
+            "true + 0",
+            "InfixExpression(left=Boolean(value=True), operator=+, right=IntegerLiteral(value=0))",
+            0,
+        ),
+    ],
+)
+def test_fold(input: str, expected: str, eliminated: int):
+    folder = Folder()
+    program = folder.fold_program(parse(input))
+    assert str(program.statements[0].expression) == expected  # type: ignore
+    assert folder.eliminated == eliminated
+
+
+def test_fold_keeps_positions_and_input():
+    program = parse("let x = 10;\nlet y = x * (2 + 3);")
+    original = str(program)
+    folded = Folder().fold_program(program)
+    literal = folded.statements[1].value.right  # type: ignore
+    assert isinstance(literal, IntegerLiteral)
+    assert (literal.token.line, literal.token.position) == (1, 27)
+    assert str(program) == original
+    assert folded.statements[0] is program.statements[0]
+
+
+@pytest.mark.parametrize(
+    "input",
+    [
+        "let a = 3; let b = -(-a) * 1 + (4 - 4); !!(a < b) == (b > 2 * 1);",
+        "let a = true; a + 0",
+        "let a = 1; 10 / (a - 1)",
+        "-true == !!false",
+        "return (1 + 1) * -(-3);",
+    ],
+)
+def test_fold_preserves_evaluation(input: str):
+    def evaluate(program):  # type: ignore
+        try:
+            return Evaluator().eval_program(program)
+        except EvaluationError as error:
+            return error.message
+
+    assert evaluate(Folder().fold_program(parse(input))) == evaluate(parse(input))
+
+
+def test_deep_expressions():
+    depth = 5000
+    program = parse("-" * depth + "(x + 1);" + " + ".join(["1"] * depth))
+    folded = Folder().fold_program(program)
+    # pairs of `-` cancel out around an integer
+    inner = program.statements[0].expression  # type: ignore
+    while isinstance(inner, PrefixExpression):
+        inner = inner.right
+    assert folded.statements[0].expression is inner  # type: ignore
+    assert folded.statements[1].expression.value == depth  # type: ignore
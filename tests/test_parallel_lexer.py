@@ -0,0 +1,51 @@
+import pytest
+
+from src import parallel_lexer
+from src.lexer import Lexer
+from src.parallel_lexer import chunk_boundaries, tokenize_parallel
+from src.token import TokenStream
+
+PROGRAM = "let x = 5;\nlet y = x * 2 + 1;\n" * 6
+
+
+def columns(stream: TokenStream) -> tuple[list[int], ...]:
+    return tuple(
+        list(column)
+        for column in (stream.types, stream.starts, stream.ends, stream.lines)
+    )
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        PROGRAM,
+        # strings spanning the places the source would be cut
+        PROGRAM + '"a\n\n\nb";\n' * 8 + PROGRAM,
+        '"' + "\n" * 200 + '" + 1;\n' + PROGRAM,
+        # an unterminated string runs to the end
+        PROGRAM + '"open\n' + PROGRAM,
+        # lexing stops at a NUL outside strings
+        PROGRAM + '"\0";\n' + PROGRAM + "\0" + PROGRAM,
+        "let é = 1;\nlet ñ = é;\n" * 10 + '"ü\n";\n' * 10,
+        "\n" * 100 + PROGRAM + "  \n\n ",
+    ],
+)
+def test_same_stream_as_sequential(monkeypatch, source: str):  # type: ignore
+    monkeypatch.setattr(parallel_lexer, "MIN_CHUNK", 16)
+    expected = Lexer(source).tokenize_stream()
+    stream = tokenize_parallel(source, jobs=3)
+    assert columns(stream) == columns(expected)
+    assert stream.to_tokens() == expected.to_tokens()
+
+
+@pytest.mark.parametrize(
+    "source, count, expected",
+    [
+        ("a\nb\nc\nd\n", 2, [0, 6, 8]),
+        ('"a\nb\nc"\nd\n', 2, [0, 8, 10]),
+        ('a\n"b\nc\nd\n', 3, [0, 9]),
+        ("abcdef", 4, [0, 6]),
+    ],
+)
+def test_chunk_boundaries(source: str, count: int, expected: list[int]):
+    assert chunk_boundaries(source, len(source), count) == expected
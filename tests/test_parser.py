@@ -11,8 +11,10 @@ from src.ast import (
     ReturnStatement,
 )
 from contextlib import nullcontext as does_not_raise
+from src.batch import ENGINES
+from src.evaluator import EvaluationError, inspect
 from src.lexer import Lexer
-from src.parser import Parser
+from src.parser import NodeTable, Parser, parse_many, parse_with_diagnostics
 
 # TODO: add more tests that don't take the happy path
 # TODO: need to make sure the parser handles errors and edge cases
@@ -207,3 +209,193 @@ def test_infix_expressions(
         assert check_infix_expressions(
             ast, left_expression, expected_operator, right_expression
         )
+
+
+def test_parse_from_token_stream():
+    input = "let x = 5; let y = 10; return 5; foobar; -15;"
+    stream = Lexer(input).tokenize_stream()
+    assert Parser(stream.reader()).parse_program() == input_to_ast(input)
+
+
+def test_parse_many():
+    sources = ["let x = 5; x", "", "-a * (b + c);", "return true == !false;"]
+    assert list(parse_many(sources)) == [input_to_ast(source) for source in sources]
+    with pytest.raises(ParserError):
+        list(parse_many(["x", "let = 1"]))
+
+
+def test_reset_after_error():
+    lexer = Lexer("let x = ((((1 + 2; let y = 3;")
+    parser = Parser(lexer, recover=True)
+    parser.parse_program()
+    assert len(parser.errors) == 1
+    lexer.reset("1 + 2 * 3")
+    parser.reset(lexer)
+    assert parser.errors == [] and parser.recover
+    assert parser.parse_program() == input_to_ast("1 + 2 * 3")
+    fresh = Parser(Lexer("1 + 2 * 3"))
+    fresh.parse_program()
+    assert parser.max_depth == fresh.max_depth
+
+
+def test_iter_statements_is_lazy():
+    parser = Parser(Lexer("let x = 5; foobar; let 5;"))
+    statements = parser.iter_statements()
+    assert isinstance(next(statements), LetStatement)
+    assert isinstance(next(statements), ExpressionStatement)
+    with pytest.raises(ParserError):
+        next(statements)
+
+
+@pytest.mark.parametrize(
+    "input, expected",
+    [
+        ("a + b * c + d / e - f", "(((a + (b * c)) + (d / e)) - f)"),
+        ("-a * b", "((-a) * b)"),
+        ("!-a", "(!(-a))"),
+        ("a + (b + c) + d", "((a + (b + c)) + d)"),
+        ("(((a)))", "a"),
+        ("-(5 + 5) == !true < false", "((-(5 + 5)) == ((!true) < false))"),
+        ("1 < 2 == 3 > 4 != 5", "(((1 < 2) == (3 > 4)) != 5)"),
+    ],
+)
+def test_operator_precedence(input: str, expected: str):
+    def render(node) -> str:  # type: ignore
+        match node:
+            case InfixExpression():
+                return f"({render(node.left)} {node.operator} {render(node.right)})"
+            case PrefixExpression():
+                return f"({node.operator}{render(node.right)})"
+            case _:
+                return node.token.literal
+
+    (statement,) = input_to_ast(input).statements
+    assert render(statement.expression) == expected  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "input, depth",
+    [
+        ("-" * 20_000 + "a", 20_001),
+        ("(" * 20_000 + "a" + ")" * 20_000, 20_001),
+        (" + ".join(["a"] * 20_000), 2),
+        ("a" + " + (a" * 10_000 + ")" * 10_000, 20_001),
+    ],
+)
+def test_deep_expressions(input: str, depth: int):
+    parser = Parser(Lexer(input + "; x"))
+    statement, last = parser.parse_program().statements
+    assert parser.max_depth == depth
+    assert isinstance(last, ExpressionStatement) and last.token.literal == "x"
+    # walk the tree without recursion
+    nodes, stack = 0, [statement.expression]  # type: ignore
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        if isinstance(node, PrefixExpression):
+            stack.append(node.right)
+        elif isinstance(node, InfixExpression):
+            stack += (node.left, node.right)
+    assert nodes == input.count("a") + input.count("-") + input.count("+")
+
+
+@pytest.mark.parametrize(
+    "input, expected, diagnostics",
+    [
+        ("let x = 5; x;", "let x = 5; x;", []),
+        (
+            "let x = 5;\nlet = 10; x + ;\n  (1 + 2 3; let y = x;",
+            "let x = 5; let y = x;",
+            [
+                "2:5: expected TokenType.IDENT, got TokenType.ASSIGN instead",
+                "2:15: no prefix parse function for TokenType.SEMICOLON",
+                "3:10: expected TokenType.RPAREN, got TokenType.INT instead",
+            ],
+        ),
+        (
+            "} let x = 1 } x",
+            "let x = 1; x",
+            [
+                "1:1: no prefix parse function for TokenType.RBRACE",
+                "1:13: no prefix parse function for TokenType.RBRACE",
+            ],
+        ),
+        ("x = 1", "x", ["1:3: no prefix parse function for TokenType.ASSIGN"]),
+        ("1 +", "", ["1:4: no prefix parse function for TokenType.EOF"]),
+        (
+            "let a = 1;\nlet b = 2;\nlet c = @;",
+            "let a = 1; let b = 2;",
+            ["3:9: no prefix parse function for TokenType.ILLEGAL"],
+        ),
+        # lines are counted in strings too
+        (
+            'let s = "a\nb"; let = 1;',
+            "",
+            [
+                "1:9: no prefix parse function for TokenType.STRING",
+                "2:9: expected TokenType.IDENT, got TokenType.ASSIGN instead",
+            ],
+        ),
+    ],
+)
+def test_parse_with_diagnostics(input: str, expected: str, diagnostics: list[str]):
+    program, errors = parse_with_diagnostics(input)
+    assert str(program) == str(input_to_ast(expected))
+    assert [str(error) for error in errors] == diagnostics
+
+
+def test_errors_raise_without_recovery():
+    parser = Parser(Lexer("let = 1; x"))
+    with pytest.raises(ParserError) as error:
+        parser.parse_program()
+    assert error.value.token is not None and error.value.token.position == 4
+    assert error.value.message == f"line 1, offset 4: {error.value.reason}"
+    assert parser.errors == []
+
+
+def test_shared_nodes():
+    source = "let x = 2;\nx * 2 + 1;\nlet y = x * 2 + 1; -1 == -1"
+    nodes = NodeTable()
+    program = Parser(Lexer(source), nodes=nodes).parse_program()
+    assert str(program) == str(input_to_ast(source))
+    _, first, second, last = program.statements
+    assert first.expression is second.value  # type: ignore
+    assert last.expression.left is last.expression.right  # type: ignore
+    # `2` is shared by the let and both products
+    two = first.expression.left.right  # type: ignore
+    assert two is program.statements[0].value  # type: ignore
+    # (line, position) of each occurrence
+    assert nodes.occurrences(two) == [(0, 8), (1, 15), (2, 34)]
+    assert nodes.occurrences(first.expression) == [(1, 17), (2, 36)]  # type: ignore
+    # `1` and `true` are kept apart
+    (statement,) = Parser(Lexer("1 == true"), nodes=nodes).parse_program().statements
+    assert statement.expression.left is not statement.expression.right  # type: ignore
+
+
+def test_shared_nodes_across_parses():
+    nodes = NodeTable()
+    first, second = parse_many(["a + -b", "c; a + -b"], nodes)
+    assert first.statements[0].expression is second.statements[1].expression  # type: ignore
+    assert len(nodes) == 5
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source",
+    [
+        "let a = 1; let b = a + 1; let a = a + 1; let c = a + 1; b + a * c",
+        "let a = 1; let b = a / 0; let b = a + 1; b * (a + 1)",
+    ],
+)
+def test_shared_nodes_evaluate_alike(engine: str, source: str):
+    def run(nodes: NodeTable | None) -> list[str]:
+        machine = ENGINES[engine]()
+        results = []
+        for statement in Parser(Lexer(source), nodes=nodes).iter_statements():
+            try:
+                results.append(inspect(machine.execute([statement])))
+            except EvaluationError as error:
+                results.append(error.message)
+        return results
+
+    assert run(NodeTable()) == run(None)
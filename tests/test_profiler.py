@@ -0,0 +1,83 @@
+import json
+import sys
+
+from src import main
+from src.lexer import Lexer
+from src.profiler import Profile, ProfiledParser, ProfiledTokenSource, ProfileHook
+
+
+def profile_source(source: str, profile: Profile) -> list:  # type: ignore
+    parser = ProfiledParser(ProfiledTokenSource(Lexer(source), profile), profile)
+    profile.start()
+    statements = list(profile.statements(parser.iter_statements(), "parse", "print"))
+    profile.stop()
+    return statements
+
+
+def test_counters():
+    profile = Profile()
+    statements = profile_source("let x = 1 + 2;\n-(x * (3 - 4));", profile)
+    assert len(statements) == 2
+    assert profile.token_counts["INT"] == 4
+    assert profile.token_counts["LPAREN"] == 2
+    assert profile.node_counts == {
+        "LetStatement": 1,
+        "ExpressionStatement": 1,
+        "Identifier": 2,
+        "IntegerLiteral": 4,
+        "InfixExpression": 3,
+        "PrefixExpression": 1,
+    }
+    # statement, prefix operand, group, `*` operand, group, `-` operand
+    assert profile.max_parser_depth == 6
+    assert set(profile.phases) == {"lex", "parse", "print"}
+    assert profile.phases["parse"].calls == 3
+    assert sum(times.wall for times in profile.phases.values()) <= profile.total.wall
+
+
+def test_nested_phases_record_own_time():
+    profile = Profile()
+    profile.start()
+    profile.enter("outer")
+    profile.enter("inner")
+    profile.exit()
+    profile.exit()
+    profile.stop()
+    outer, inner = profile.phases["outer"], profile.phases["inner"]
+    assert outer.calls == inner.calls == 1
+    assert outer.wall + inner.wall <= profile.total.wall
+
+
+def test_hooks():
+    class Recorder(ProfileHook):
+        def __init__(self) -> None:
+            self.events: list[str] = []
+
+        def on_phase_end(self, name: str, wall: float, cpu: float) -> None:
+            self.events.append(name)
+
+        def on_statement(self, statement) -> None:  # type: ignore
+            self.events.append(type(statement).__name__)
+
+    profile = Profile()
+    recorder = Recorder()
+    profile.subscribe(recorder)
+    profile_source("1;", profile)
+    assert "ExpressionStatement" in recorder.events
+    assert recorder.events.count("lex") == profile.token_counts.total()
+
+
+def test_main_profile_json(tmp_path, monkeypatch, capsys):  # type: ignore
+    path = tmp_path / "prog.mnk"
+    path.write_text("let a = 2;\na * 21")
+    report = tmp_path / "profile.json"
+    argv = ["pymonkey", "--run", "--no-cache", "--profile-json", str(report)]
+    monkeypatch.setattr(sys, "argv", [*argv, "--profile-memory", str(path)])
+    main.main()
+    out, err = capsys.readouterr()
+    assert out == "42\n"
+    assert "max parser depth: 2" in err
+    data = json.loads(report.read_text())
+    assert set(data["phases"]) == {"lex", "parse", "run"}
+    assert data["nodes"]["Identifier"] == 2
+    assert data["peak_allocated_bytes"] > 0
@@ -0,0 +1,111 @@
+import io
+import json
+import sys
+
+import pytest
+from src import main
+from src.ast import Program
+from src.lexer import Lexer
+from src.parser import Parser, ParserError
+from src.serializer import node_json, node_text, write_json_lines, write_text
+
+PROGRAMS = [
+    "",
+    "let x = 5; return x;",
+    "-a * b + !true == (c - 1) / 2 < 3 != false;",
+    "let y = !-x; y > 10;",
+]
+
+
+def parse(source: str) -> Program:
+    return Parser(Lexer(source)).parse_program()
+
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_text_matches_str(source: str):
+    program = parse(source)
+    out = io.StringIO()
+    write_text(program.statements, out)
+    assert out.getvalue() == f"{program}\n"
+    for statement in program.statements:
+        assert node_text(statement) == str(statement)
+
+
+def test_json_lines():
+    program = parse("let x = -5; x + 2 * x; return !true;")
+    out = io.StringIO()
+    write_json_lines(program.statements, out)
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {
+            "type": "LetStatement",
+            "name": {"type": "Identifier", "value": "x"},
+            "value": {
+                "type": "PrefixExpression",
+                "operator": "-",
+                "right": {"type": "IntegerLiteral", "value": 5},
+            },
+        },
+        {
+            "type": "ExpressionStatement",
+            "expression": {
+                "type": "InfixExpression",
+                "left": {"type": "Identifier", "value": "x"},
+                "operator": "+",
+                "right": {
+                    "type": "InfixExpression",
+                    "left": {"type": "IntegerLiteral", "value": 2},
+                    "operator": "*",
+                    "right": {"type": "Identifier", "value": "x"},
+                },
+            },
+        },
+        {
+            "type": "ReturnStatement",
+            "return_value": {
+                "type": "PrefixExpression",
+                "operator": "!",
+                "right": {"type": "Boolean", "value": True},
+            },
+        },
+    ]
+    assert lines[0] == node_json(program.statements[0])
+
+
+def test_deep_trees():
+    depth = 50_000
+    (statement,) = parse("-" * depth + "(a + 1)").statements
+    text = node_text(statement)
+    assert text.count("PrefixExpression(") == depth
+    assert text.endswith("right=IntegerLiteral(value=1))" + ")" * (depth + 1))
+    assert node_json(statement).count('"PrefixExpression"') == depth
+
+
+def test_output_before_an_error_is_written():
+    out = io.StringIO()
+    with pytest.raises(ParserError):
+        write_text(Parser(Lexer("1; 2; let;")).iter_statements(), out)
+    assert out.getvalue().count("IntegerLiteral") == 2
+
+
+@pytest.mark.parametrize(
+    "format, expected",
+    [
+        (
+            "text",
+            "Program(\n  ExpressionStatement(expression=Identifier(value='x'))\n)",
+        ),
+        (
+            "jsonl",
+            '{"type": "ExpressionStatement", "expression": '
+            '{"type": "Identifier", "value": "x"}}',
+        ),
+    ],
+)
+def test_main_format(tmp_path, monkeypatch, capsys, format, expected):  # type: ignore
+    path = tmp_path / "x.mnk"
+    path.write_text("x;")
+    argv = ["pymonkey", "--no-cache", "--format", format, str(path)]
+    monkeypatch.setattr(sys, "argv", argv)
+    main.main()
+    assert capsys.readouterr().out == expected + "\n"
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor
+
+import pytest
+from src.server import (
+    MAX_LINE,
+    SESSION_SYMBOLS,
+    SESSIONS,
+    STATS_COMMAND,
+    Server,
+    connect,
+    end_session,
+    evaluate,
+    tcp_address,
+    worker_pool,
+)
+from src.symbols import SYMBOLS
+
+Client = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm", "py"])
+def test_sessions_keep_their_globals(engine: str):
+    try:
+        assert evaluate(-1, "let a = 2; let b = a > 1;", engine) == "null"
+        assert evaluate(-1, "let c = a * 21; c", engine) == "42"
+        assert evaluate(-1, "b + 1", engine) == (
+            "error: 1:3: type mismatch: BOOLEAN + INTEGER"
+        )
+        assert evaluate(-2, "a", engine) == "error: 1:1: identifier not found: a"
+    finally:
+        end_session(-1)
+        end_session(-2)
+    assert -1 not in SESSIONS and -2 not in SESSIONS
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm", "py"])
+def test_sessions_intern_their_own_names(engine: str):
+    interned = len(SYMBOLS)
+    try:
+        for session in range(-10, 0):
+            name = "session_" + "x" * -session
+            assert evaluate(session, f"let {name} = {-session};", engine) == "null"
+            assert evaluate(session, f"{name} * 2", engine) == str(-session * 2)
+            assert name not in SYMBOLS
+    finally:
+        for session in range(-10, 0):
+            end_session(session)
+    assert len(SYMBOLS) == interned
+    assert not SESSION_SYMBOLS
+
+
+def test_parse_errors_run_nothing():
+    try:
+        assert evaluate(-1, "let a = 5;", "tree") == "null"
+        assert evaluate(-1, "let a = 1; let;", "tree").startswith("error: ")
+        assert evaluate(-1, "a", "tree") == "5"
+    finally:
+        end_session(-1)
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [("localhost:8000", ("localhost", 8000)), (":0", ("", 0)), ("/tmp/s", None)],
+)
+def test_tcp_address(address: str, expected: tuple[str, int] | None):
+    assert tcp_address(address) == expected
+
+
+def serving(
+    tmp_path,  # type: ignore
+    test: Callable[[str], Awaitable[None]],
+    workers: list[Executor] | None = None,
+) -> Server:
+    server = Server("tree", workers)
+    address = os.path.join(tmp_path, "server.sock")
+
+    async def main() -> None:
+        async with await server.start(address) as listening:
+            try:
+                await test(address)
+            finally:
+                # a failed test must not leave the server waiting on clients
+                listening.close_clients()
+
+    asyncio.run(main())
+    return server
+
+
+async def ask(client: Client, line: str) -> str:
+    reader, writer = client
+    writer.write(line.encode() + b"\n")
+    await writer.drain()
+    return (await reader.readline()).decode().rstrip("\n")
+
+
+async def close(client: Client) -> None:
+    client[1].close()
+    await client[1].wait_closed()
+
+
+def test_sessions_are_isolated(tmp_path):  # type: ignore
+    async def test(address: str) -> None:
+        first = await connect(address)
+        second = await connect(address)
+        assert await ask(first, "let x = 1;") == "null"
+        assert await ask(second, "let x = 10;") == "null"
+        replies = await asyncio.gather(ask(first, "x + 1"), ask(second, "x + 1"))
+        assert replies == ["2", "11"]
+        assert (await ask(second, "y")).endswith("identifier not found: y")
+        stats = json.loads(await ask(first, STATS_COMMAND))
+        assert stats["requests"] == 5 and stats["errors"] == 1
+        assert stats["sessions"] == 2
+        await close(first)
+        await close(second)
+
+    server = serving(tmp_path, test)
+    assert server.stats.sessions == 0
+    assert server.stats.total_sessions == 2
+
+
+def test_long_snippets_end_the_session(tmp_path):  # type: ignore
+    async def test(address: str) -> None:
+        client = await connect(address)
+        assert await ask(client, "1" * (MAX_LINE + 1)) == "error: snippet too long"
+        assert await client[0].readline() == b""
+        await close(client)
+
+    serving(tmp_path, test)
+
+
+def test_worker_processes(tmp_path):  # type: ignore
+    async def test(address: str) -> None:
+        clients = [await connect(address) for _ in range(4)]
+        await asyncio.gather(
+            *(ask(client, f"let n = {i};") for i, client in enumerate(clients))
+        )
+        replies = await asyncio.gather(*(ask(client, "n * n") for client in clients))
+        assert replies == ["0", "1", "4", "9"]
+        for client in clients:
+            await close(client)
+
+    with worker_pool(2) as workers:
+        server = serving(tmp_path, test, workers)
+    assert server.load == [0, 0]
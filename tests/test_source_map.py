@@ -0,0 +1,60 @@
+import pytest
+
+from src.source_map import SourceMap
+
+SOURCE = 'let x = 1;\n\nlet s = "a\nb";\nx'
+
+
+@pytest.mark.parametrize(
+    "offset, location",
+    [
+        (0, (1, 1)),
+        (4, (1, 5)),
+        (10, (1, 11)),
+        (11, (2, 1)),
+        (12, (3, 1)),
+        (21, (3, 10)),
+        (22, (3, 11)),
+        (23, (4, 1)),
+        (27, (5, 1)),
+        (len(SOURCE), (5, 2)),
+    ],
+)
+def test_location(offset: int, location: tuple[int, int]):
+    source_map = SourceMap(SOURCE)
+    assert source_map.location(offset) == location
+    # the column counts back to the previous newline
+    line, column = location
+    assert SOURCE.rfind("\n", 0, offset) + 1 == offset - column + 1
+    assert SOURCE.count("\n", 0, offset) == line - 1
+
+
+@pytest.mark.parametrize(
+    "start, end, snippet",
+    [
+        (4, 5, "let x = 1;"),
+        (11, 11, ""),
+        (20, 24, 'let s = "a\nb";'),
+        (0, len(SOURCE), SOURCE),
+        (27, 28, "x"),
+    ],
+)
+def test_snippet(start: int, end: int, snippet: str):
+    assert SourceMap(SOURCE).snippet(start, end) == snippet
+
+
+def test_describe():
+    source_map = SourceMap(SOURCE)
+    # the string's newline counts, unlike in `Token.line`
+    assert source_map.describe("oops", 27) == "5:1: oops"
+    assert source_map.describe("oops", None) == "oops"
+
+
+@pytest.mark.parametrize("source, lines", [("", 1), ("x", 1), ("\n", 2), ("a\nb\n", 3)])
+def test_lines(source: str, lines: int):
+    source_map = SourceMap(source)
+    assert len(source_map) == lines
+    assert source_map.location(len(source)) == (
+        lines,
+        len(source.rsplit("\n", 1)[-1]) + 1,
+    )
@@ -0,0 +1,83 @@
+import io
+import pickle
+
+import pytest
+from src.ast import Identifier
+from src.evaluator import Resolver
+from src.lexer import Lexer, StreamLexer
+from src.parser import Parser
+from src.symbols import SYMBOLS, SymbolTable
+from src.token import Token, TokenType
+
+
+def test_symbol_table():
+    table = SymbolTable()
+    assert [table.intern(name) for name in ["a", "bc", "a", "d"]] == [0, 1, 0, 2]
+    assert table.names == ["a", "bc", "d"]
+    assert table.name(1) == "bc"
+    assert len(table) == 3
+    assert "d" in table and "e" not in table
+
+
+def test_using_another_table():
+    table = SymbolTable()
+    with SYMBOLS.using(table):
+        (token,) = [t for t in Lexer("scoped").tokenize() if t.literal == "scoped"]
+        assert Identifier(token, "scoped").symbol == 0
+    assert table.names == ["scoped"]
+    assert "scoped" not in SYMBOLS
+
+
+def slice_of(name: str) -> str:
+    # an equal `str` that is not the interned object
+    return (" " + name)[1:]
+
+
+def take(lexer: Lexer | StreamLexer, count: int) -> list[Token]:
+    return [lexer.next_token() for _ in range(count)]
+
+
+@pytest.mark.parametrize(
+    "tokenize",
+    [
+        lambda source: take(Lexer(source), 6),
+        lambda source: Lexer(source).tokenize(),
+        lambda source: take(StreamLexer(io.StringIO(source), 4), 6),
+    ],
+)
+def test_lexers_intern_identifiers(tokenize):  # type: ignore
+    names = [
+        token.literal
+        for token in tokenize("foobar + foobar; let foobar")
+        if token.type == TokenType.IDENT
+    ]
+    assert names == ["foobar"] * 3
+    assert all(name is SYMBOLS.names[SYMBOLS.intern("foobar")] for name in names)
+
+
+def test_identifiers_carry_symbols():
+    program = Parser(Lexer("let alpha = 1; alpha + beta;")).parse_program()
+    name = program.statements[0].name  # type: ignore
+    left = program.statements[1].expression.left  # type: ignore
+    right = program.statements[1].expression.right  # type: ignore
+    assert name.symbol == left.symbol == SYMBOLS.intern("alpha")
+    assert right.symbol == SYMBOLS.intern("beta") != left.symbol
+    built = Identifier(Token(TokenType.IDENT, "alpha"), slice_of("alpha"))
+    assert built.symbol == left.symbol and built.value is left.value
+
+
+def test_unpickled_identifiers_are_reinterned():
+    identifier = Identifier(Token(TokenType.IDENT, "gamma"), "gamma")
+    identifier.symbol = 12345
+    loaded = pickle.loads(pickle.dumps(identifier))
+    assert loaded.symbol == -1
+    assert loaded.symbol_id() == SYMBOLS.intern("gamma") == loaded.symbol
+    assert loaded.value is SYMBOLS.names[loaded.symbol]
+    assert identifier.symbol == 12345
+
+
+def test_resolver_scopes_are_keyed_by_symbol():
+    resolver = Resolver()
+    for statement in Parser(Lexer("let delta = 1; delta;")).iter_statements():
+        resolver.resolve(statement)
+    assert resolver.scopes == [{SYMBOLS.intern("delta"): 0}]
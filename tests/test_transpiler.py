@@ -0,0 +1,190 @@
+import sys
+import warnings
+
+import pytest
+from src import main
+from src.ast import InfixExpression, IntegerLiteral, Program
+from src.evaluator import EvaluationError, Evaluator, Value
+from src.lexer import Lexer
+from src.parser import Parser
+from src.token import Token, TokenType
+from src.transpiler import BATCH_SIZE, CODE_CACHE, MAX_NESTING, Transpiler
+
+
+def parse(input: str) -> Program:
+    return Parser(Lexer(input)).parse_program()
+
+
+def run(input: str) -> Value:
+    return Transpiler().execute(parse(input).statements)
+
+
+@pytest.mark.parametrize(
+    "input",
+    [
+        "5",
+        "-50 + 100 + -50",
+        "(5 + 10 * 2 + 15 / 3) * 2 + -10",
+        "-7 / 2",
+        "7 / -2",
+        "!!5",
+        "!0",
+        "!true",
+        "(1 < 2) == true",
+        "1 == true",
+        "1 != true",
+        "true == true",
+        "true != (1 > 2)",
+        "let a = 5; let b = a; let c = a + b + 5; c;",
+        "let a = 1; let a = a + 1; a;",
+        "let a = 1; let a = a == 1; !a;",
+        "let a = 1;",
+        "9; return 10; 9;",
+        "return 2 * 5; undefined;",
+        "99999999999999999999 * 99999999999999999999",
+        "",
+    ],
+)
+def test_matches_evaluator(input: str):
+    expected = Evaluator().eval_program(parse(input))
+    result = run(input)
+    assert result == expected and type(result) is type(expected)
+
+
+@pytest.mark.parametrize(
+    "input",
+    [
+        "5 + true;",
+        "-true",
+        "true + false;",
+        "!(1 < true)",
+        "foobar",
+        "let a = a;",
+        "let x = 1;\nx / (2 - 2)",
+        "5 < true",
+        "let b = true;\n1 + 2;\n3 * -b",
+        # the left operand fails first
+        "(1 / 0) + (true - false)",
+        # runtime errors come before those of later statements
+        "1 / 0; undefined_name;",
+    ],
+)
+def test_errors_match_evaluator(input: str):
+    with pytest.raises(EvaluationError) as expected:
+        Evaluator().eval_program(parse(input))
+    with pytest.raises(EvaluationError) as error:
+        run(input)
+    assert error.value.message == expected.value.message
+
+
+def test_unknown_operators():
+    # the parser only produces known operators, but an AST built by hand can
+    # hold any
+    program = parse("0")
+    one = IntegerLiteral(Token(TokenType.INT, "1"), 1)
+    modulo = InfixExpression(Token(TokenType.ILLEGAL, "%", 3, 1), "%", one, one)
+    program.statements[0].expression = modulo  # type: ignore
+    with pytest.raises(EvaluationError) as expected:
+        Evaluator().eval_program(program)
+    with pytest.raises(EvaluationError) as error:
+        Transpiler().execute(program.statements)
+    assert error.value.message == expected.value.message
+    assert (
+        error.value.message == "line 2, offset 3: unknown operator: INTEGER % INTEGER"
+    )
+
+
+def test_no_syntax_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert run("let x = 3; !x == !5") is True
+
+
+@pytest.mark.parametrize(
+    "input",
+    [
+        "-" * 5000 + "1",
+        " + ".join(["1"] * 5000),
+        "let x = 2; " + "(" * 1000 + "x" + " * x)" * 1000,
+        # the deep right operand is spilled ahead of the left one, which still
+        # has to be evaluated first
+        "(1 / 0) + " + "-" * (3 * MAX_NESTING) + "(true / 0)",
+    ],
+)
+def test_deep_expressions(input: str):
+    try:
+        expected: object = Evaluator().eval_program(parse(input))
+    except EvaluationError as error:
+        expected = error.message
+    except RecursionError:
+        expected = None
+    try:
+        result: object = run(input)
+    except EvaluationError as error:
+        result = error.message
+    if expected is not None:
+        assert result == expected
+    assert result is not None
+
+
+def test_keeps_state_between_batches():
+    transpiler = Transpiler()
+    source = "let a = 0;" + "let a = a + 1;" * BATCH_SIZE + "a"
+    assert transpiler.execute(parse(source).statements) == BATCH_SIZE
+    assert transpiler.execute(parse("a * 2").statements) == 2 * BATCH_SIZE
+    # the type of a global carries over to later batches
+    assert transpiler.execute(parse("let a = a > 0; !a").statements) is False
+    with pytest.raises(EvaluationError, match="line 1, offset 2: type mismatch"):
+        transpiler.execute(parse("a + 1").statements)
+
+
+def test_lets_before_an_error_stay_bound():
+    transpiler = Transpiler()
+    with pytest.raises(EvaluationError, match="division by zero"):
+        transpiler.execute(parse("let a = 6; let b = a / 0;").statements)
+    assert transpiler.execute(parse("a + 1").statements) == 7
+
+
+def test_failed_let_binds_nothing():
+    transpiler = Transpiler()
+
+    def execute(input: str) -> Value:
+        return transpiler.execute(Parser(Lexer(input)).iter_statements())
+
+    assert execute("let a = 5;") is None
+    with pytest.raises(EvaluationError, match="division by zero"):
+        execute("let b = a; let a = 1 / 0; let c = 2;")
+    with pytest.raises(EvaluationError, match="division by zero"):
+        execute("let q = 1 / 0;")
+    with pytest.raises(EvaluationError, match="identifier not found: q"):
+        execute("q")
+    # a parse error is reported after the statements before it have run
+    with pytest.raises(EvaluationError, match="division by zero"):
+        execute("let c = 1 / 0; let;")
+    assert execute("return a + b; let;") == 10
+    assert transpiler.globals == [5, 5]
+
+
+def test_code_is_cached_by_shape():
+    CODE_CACHE.clear()
+    first = Transpiler()
+    batch = first.compile(parse("let n = 4; n * 3").statements)
+    assert len(CODE_CACHE) == 1
+    assert first.run(batch) == 12
+    # same shape, with errors reported at this program's positions
+    second = Transpiler()
+    again = second.compile(parse("let n = 4;\n\n  n * 3").statements)
+    assert again.function is batch.function
+    assert again.positions != batch.positions
+    different = second.compile(parse("n / 3").statements)
+    assert different.function is not batch.function
+    assert len(CODE_CACHE) == 2
+
+
+def test_main_engine(tmp_path, monkeypatch, capsys):  # type: ignore
+    path = tmp_path / "prog.mnk"
+    path.write_text("let a = 2;\na * 21")
+    argv = ["pymonkey", "--run", "--no-cache", "--engine", "py", str(path)]
+    monkeypatch.setattr(sys, "argv", argv)
+    main.main()
+    assert capsys.readouterr().out == "42\n"
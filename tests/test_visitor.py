@@ -0,0 +1,118 @@
+from src.ast import (
+    Expression,
+    Identifier,
+    InfixExpression,
+    IntegerLiteral,
+    LetStatement,
+    Node,
+    Program,
+)
+from src.lexer import Lexer
+from src.parser import Parser
+from src.token import Token, TokenType
+from src.visitor import SKIP, STOP, NodeTransformer, NodeVisitor, iter_nodes
+
+
+def parse(input: str) -> Program:
+    return Parser(Lexer(input)).parse_program()
+
+
+def names(nodes) -> list[str]:  # type: ignore
+    return [type(node).__name__ for node in nodes]
+
+
+class Recorder(NodeVisitor):
+    def __init__(self) -> None:
+        self.events: list[str] = []
+
+    def visit_Node(self, node: Node) -> None:
+        self.events.append(node.token.literal)
+
+    def leave_InfixExpression(self, node: InfixExpression) -> None:
+        self.events.append(f"/{node.operator}")
+
+
+def test_iter_nodes_is_pre_order():
+    program = parse("let x = -a + b * 2; return y;")
+    assert names(iter_nodes(program)) == [
+        "Program",
+        "LetStatement",
+        "Identifier",
+        "InfixExpression",
+        "PrefixExpression",
+        "Identifier",
+        "InfixExpression",
+        "Identifier",
+        "IntegerLiteral",
+        "ReturnStatement",
+        "Identifier",
+    ]
+
+
+def test_visit_and_leave():
+    visitor = Recorder()
+    assert visitor.walk(parse("a + b * c; d"))
+    assert visitor.events == ["a", "+", "a", "*", "b", "c", "/*", "/+", "d", "d"]
+
+
+def test_skip_and_stop():
+    class FirstLet(Recorder):
+        def visit_LetStatement(self, node: LetStatement):  # type: ignore
+            self.events.append(node.name.value)
+            return SKIP
+
+        def visit_Identifier(self, node: Identifier):  # type: ignore
+            self.events.append(node.value)
+            if node.value == "stop":
+                return STOP
+
+    visitor = FirstLet()
+    assert not visitor.walk(parse("let x = y + 1; 2; stop; z"))
+    # the expression statements are recorded too
+    assert visitor.events == ["x", "2", "2", "stop", "stop"]
+
+
+def test_handlers_of_base_classes():
+    class Expressions(NodeVisitor):
+        count = 0
+
+        def visit_Expression(self, node: Expression) -> None:
+            self.count += 1
+
+    visitor = Expressions()
+    visitor.walk(parse("let x = !(1 < y); x"))
+    assert visitor.count == 6
+
+
+def test_deep_trees():
+    visitor = Recorder()
+    assert visitor.walk(parse("-" * 50_000 + "a + b"))
+    assert len(visitor.events) == 50_005
+
+
+class Folder(NodeTransformer):
+    # folds `+` of two integer literals and renames identifiers
+    def visit_Identifier(self, node: Identifier) -> Identifier:
+        return Identifier(node.token, node.value.upper())
+
+    def leave_InfixExpression(self, node: InfixExpression) -> Expression:
+        left, right = node.left, node.right
+        if isinstance(left, IntegerLiteral) and isinstance(right, IntegerLiteral):
+            value = left.value + right.value
+            return IntegerLiteral(Token(TokenType.INT, str(value)), value)
+        return node
+
+
+def test_transformer_rewrites_in_place():
+    program = parse("let x = 1 + 2 + y; x * (3 + 4)")
+    statements = program.statements
+    assert Folder().walk(program) is program
+    assert program.statements is statements
+    assert str(program) == str(parse("let X = 3 + Y; X * 7"))
+
+
+def test_transformer_replaces_the_root():
+    program = parse("1 + " * 20_000 + "1")
+    (statement,) = program.statements
+    folded = Folder().walk(statement.expression)
+    assert isinstance(folded, IntegerLiteral) and folded.value == 20_001
@@ -0,0 +1,185 @@
+import pytest
+from src.compiler import Compiler, Opcode, disassemble, make
+from src.evaluator import EvaluationError, Evaluator, Value
+from src.lexer import Lexer
+from src.parser import Parser
+from src.symbols import SYMBOLS
+from src.vm import BATCH_SIZE, VM
+
+
+def parse(input: str):  # type: ignore
+    return Parser(Lexer(input)).parse_program()
+
+
+def run(input: str) -> Value:
+    return VM().execute(parse(input).statements)
+
+
+@pytest.mark.parametrize(
+    "opcode, operands, expected",
+    [
+        (Opcode.CONSTANT, [65534], bytes([Opcode.CONSTANT, 255, 254])),
+        (Opcode.ADD, [], bytes([Opcode.ADD])),
+        (Opcode.GET_GLOBAL, [1], bytes([Opcode.GET_GLOBAL, 0, 1])),
+    ],
+)
+def test_make(opcode: Opcode, operands: list[int], expected: bytes):
+    assert make(opcode, *operands) == expected
+
+
+def test_compile():
+    bytecode = Compiler().compile(parse("let a = 1 + 2; -a; 1 == true;").statements)
+    assert bytecode.constants == [1, 2]
+    assert disassemble(bytecode.instructions) == "\n".join(
+        [
+            "0000 CONSTANT 0",
+            "0003 CONSTANT 1",
+            "0006 ADD",
+            "0007 SET_GLOBAL 0",
+            "0010 GET_GLOBAL 0",
+            "0013 MINUS",
+            "0014 POP",
+            "0015 CONSTANT 0",
+            "0018 TRUE",
+            "0019 EQUAL",
+            "0020 POP",
+        ]
+    )
+    # positions of the instructions that can fail
+    assert sorted(bytecode.positions) == [6, 13, 19]
+
+
+@pytest.mark.parametrize(
+    "input",
+    [
+        "5",
+        "-50 + 100 + -50",
+        "(5 + 10 * 2 + 15 / 3) * 2 + -10",
+        "-7 / 2",
+        "7 / -2",
+        "!!5",
+        "!0",
+        "(1 < 2) == true",
+        "1 == true",
+        "1 != true",
+        "true == true",
+        "let a = 5; let b = a; let c = a + b + 5; c;",
+        "let a = 1; let a = a + 1; a;",
+        "let a = 1;",
+        "9; return 10; 9;",
+        "return 2 * 5; 9;",
+        "return 1; undefined_name;",
+        "-" * 5000 + "1",
+        " + ".join(["1"] * 5000),
+        "",
+    ],
+)
+def test_vm_matches_evaluator(input: str):
+    expected = Evaluator().eval_program(parse(input))
+    result = run(input)
+    assert result == expected and type(result) is type(expected)
+
+
+@pytest.mark.parametrize(
+    "input",
+    [
+        "5 + true;",
+        "-true",
+        "true + false;",
+        "foobar",
+        "let a = a;",
+        "let x = 1;\nx / (2 - 2)",
+        "5 < true",
+        # runtime errors come before those of later statements
+        "1 / 0; undefined_name;",
+        "let a = -true; let b = a;",
+    ],
+)
+def test_vm_errors_match_evaluator(input: str):
+    with pytest.raises(EvaluationError) as expected:
+        Evaluator().eval_program(parse(input))
+    with pytest.raises(EvaluationError) as error:
+        run(input)
+    assert error.value.message == expected.value.message
+
+
+@pytest.mark.parametrize(
+    "input, depth",
+    [
+        ("", 0),
+        ("let a = 1; a; -a", 1),
+        ("1 + 2 * (3 - 4)", 4),
+        ("(1 + 2) * 3 + 4", 2),
+    ],
+)
+def test_max_stack(input: str, depth: int):
+    assert Compiler().compile(parse(input).statements).max_stack == depth
+
+
+def test_nesting_past_initial_stack():
+    source = "1 + (" * 5000 + "1" + ")" * 5000
+    assert run(source) == 5001
+    assert run("-(" * 5000 + "1" + ")" * 5000) == 1
+
+
+def test_vm_keeps_state_between_batches():
+    vm = VM()
+    source = "let a = 0;" + "let a = a + 1;" * BATCH_SIZE + "a"
+    assert vm.execute(parse(source).statements) == BATCH_SIZE
+    assert vm.execute(parse("a * 2").statements) == 2 * BATCH_SIZE
+
+
+@pytest.mark.parametrize(
+    "input, expected",
+    [
+        ("return 1; let;", 1),
+        ("1 / 0; let;", "line 1, offset 2: division by zero"),
+        ("let x = 1;", None),
+    ],
+)
+def test_vm_reads_statements_like_evaluator(input: str, expected: Value | str):
+    for engine in (Evaluator(), VM()):
+        try:
+            result = engine.execute(Parser(Lexer(input)).iter_statements())
+        except EvaluationError as error:
+            result = error.message
+        assert result == expected
+
+
+def test_failed_let_binds_nothing():
+    vm = VM()
+
+    def execute(input: str) -> Value:
+        return vm.execute(parse(input).statements)
+
+    assert execute("let a = 5;") is None
+    with pytest.raises(EvaluationError, match="division by zero"):
+        execute("let b = a; let a = 1 / 0; let c = 2;")
+    with pytest.raises(EvaluationError, match="division by zero"):
+        execute("let q = 1 / 0;")
+    with pytest.raises(EvaluationError, match="identifier not found: q"):
+        execute("q")
+    assert execute("a + b") == 10
+    assert execute("let q = 2; q") == 2
+    assert vm.globals == [5, 5, 2]
+
+
+def letters(number: int) -> str:
+    # identifiers cannot hold digits
+    return "".join("abcdefghij"[int(digit)] for digit in str(number))
+
+
+def test_operands_past_16_bits():
+    count = 70_000
+    vm = VM()
+    scope = vm.compiler.resolver.scopes[0]
+    for slot in range(count):
+        scope[SYMBOLS.intern(f"v{letters(slot)}")] = slot
+    vm.globals += range(count)
+    source = f"let w = v{letters(count - 1)} - v{letters(1)}; w"
+    assert vm.execute(parse(source).statements) == count - 2
+    assert vm.globals[count] == count - 2
+    bytecode = Compiler().compile(parse(" + ".join(map(str, range(count)))).statements)
+    assert len(bytecode.constants) == count
+    assert Opcode.EXTENDED_ARG.name in disassemble(bytecode.instructions)
+    assert VM().run(bytecode) == count * (count - 1) // 2